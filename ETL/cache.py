@@ -0,0 +1,178 @@
+# ETL/cache.py
+"""
+Cache de build por hash de contenido.
+
+DW/_manifest.json registra, por cada tabla escrita, una clave calculada a
+partir del hash de sus archivos raw, del código de su builder y de las
+claves de las etapas de las que depende, junto con el hash del archivo de
+salida. Si en la próxima corrida la clave coincide y la salida no cambió,
+la tabla no se recalcula; si otra etapa la necesita, se lee desde el DW.
+
+Los nodos 'dates:<tabla>' del calendario entran a la clave con su rango de
+fechas, no con el hash del archivo: una tabla raw que cambia sin mover su
+primer o último día no invalida dim_calendar (ni la OBT y los rollups que
+dependen de él). El rango de cada archivo se recuerda en el manifiesto junto
+a su hash, así solo se relee (las columnas de fecha) si el archivo cambió.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+import hashlib
+import inspect
+import json
+import os
+
+from ETL.load.paths import table_path
+from ETL.transform import CALENDAR_SOURCES, DATES_PREFIX
+from ETL.validation_rules import referenced_tables
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MANIFEST_FILE = "_manifest.json"
+
+# entrada del manifiesto con {tabla raw: [hash del archivo, rango de fechas]}
+DATE_RANGES = "_date_ranges"
+
+# Código compartido que afecta a todas las etapas
+_SHARED_CODE = [
+    Path(__file__).parent / "extract" / "extract.py",
+    Path(__file__).parent / "extract" / "schema.py",
+    Path(__file__).parent / "transform" / "surrogate_keys.py",
+    Path(__file__).parent / "transform" / "date_keys.py",
+    Path(__file__).parent / "transform" / "sessionize.py",
+    Path(__file__).parent / "transform" / "dtypes.py",
+    Path(__file__).parent / "validation.py",
+    Path(__file__).parent / "validation_rules.py",
+    Path(__file__).parent / "transform" / "__init__.py",
+]
+
+
+def _hash_file(path: Path, h=None):
+    h = h or hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h
+
+
+def _source_file(fn) -> str:
+    # los builders del registro se hashean sin importarlos
+    return getattr(fn, "source_file", None) or inspect.getsourcefile(fn)
+
+
+def _hash_text(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class BuildCache:
+    def __init__(self, dw_dir: str = "DW", raw_dir: str = "raw", fmt: str = "csv",
+                 validate: bool = False, compression: str | None = None):
+        self.dw_dir = Path(dw_dir)
+        self.raw_dir = Path(raw_dir)
+        self.fmt = fmt
+        self.validate = validate
+        self.compression = compression
+        self.path = self.dw_dir / MANIFEST_FILE
+        self.manifest = (
+            json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+        )
+        self.keys: dict[str, str] = {}
+        self.entries: dict[str, dict] = {}
+        self._raw_hashes: dict[str, str] = {}
+        self._fresh: dict[str, bool] = {}
+        self._shared = _hash_text(f"validate={validate}", f"compression={compression}",
+                                  *[_hash_file(p).hexdigest() for p in _SHARED_CODE if p.exists()])
+
+    def raw_hash(self, table: str) -> str:
+        if table not in self._raw_hashes:
+            path = self.raw_dir / f"{table}.csv"
+            self._raw_hashes[table] = _hash_file(path).hexdigest() if path.exists() else "missing"
+        return self._raw_hashes[table]
+
+    def date_range(self, table: str) -> str:
+        """Rango de fechas de una tabla raw ('AAAA-MM-DD..AAAA-MM-DD' o 'none')."""
+        ranges = self.manifest.setdefault(DATE_RANGES, {})
+        file_hash = self.raw_hash(table)
+        if ranges.get(table, [None])[0] != file_hash:
+            from ETL.transform.date_keys import raw_date_range  # pandas solo si el archivo cambió
+            found = raw_date_range(str(self.raw_dir), table, CALENDAR_SOURCES[table])
+            span = "none" if found is None else f"{found[0]:%Y-%m-%d}..{found[1]:%Y-%m-%d}"
+            ranges[table] = [file_hash, span]
+        return ranges[table][1]
+
+    def compute_keys(self, stages: dict[str, tuple]) -> None:
+        """
+        Calcula la clave de cada etapa de 'stages' ({nombre: (builder, raw, deps)})
+        en orden de dependencias.
+        """
+        def key(name):
+            if name not in self.keys:
+                fn, raw_tables, deps = stages[name]
+                if self.validate:
+                    # con validación, la salida depende también de las tablas referenciadas
+                    raw_tables = sorted({*raw_tables, *[r for t in raw_tables for r in referenced_tables(t)]})
+                entry = {
+                    "code": _hash_file(Path(_source_file(fn))).hexdigest(),
+                    "inputs": {t: self.raw_hash(t) for t in raw_tables},
+                    # los rangos de fechas entran por su valor; las etapas, por su clave
+                    "upstream": {d: self.date_range(d[len(DATES_PREFIX):]) if d.startswith(DATES_PREFIX)
+                                 else key(d) for d in deps},
+                }
+                self.entries[name] = entry
+                self.keys[name] = _hash_text(
+                    name, self.fmt, self._shared, entry["code"],
+                    *[f"{t}={h}" for t, h in entry["inputs"].items()],
+                    *[f"{d}={k}" for d, k in entry["upstream"].items()],
+                )
+            return self.keys[name]
+
+        for name in stages:
+            key(name)
+
+    def _output_hash(self, table: str) -> str | None:
+        part_dir = self.dw_dir / table
+        if self.fmt != "csv" and part_dir.is_dir():
+            h = hashlib.sha256()
+            for f in sorted(part_dir.rglob("*")):
+                if f.is_file():
+                    h.update(str(f.relative_to(part_dir)).encode("utf-8"))
+                    _hash_file(f, h)
+            return h.hexdigest()
+        path = table_path(table, self.dw_dir, self.fmt, self.compression)
+        return _hash_file(path).hexdigest() if path.exists() else None
+
+    def is_fresh(self, table: str) -> bool:
+        if table not in self._fresh:
+            entry = self.manifest.get(table)
+            self._fresh[table] = (
+                entry is not None
+                and entry.get("key") == self.keys.get(table)
+                and entry.get("output") == self._output_hash(table)
+            )
+        return self._fresh[table]
+
+    def load(self, table: str) -> pd.DataFrame:
+        from ETL.load.formats import read_dw_table  # pandas solo al leer una tabla
+        print(f" -> Tabla '{table}' leída del DW (sin cambios).")
+        return read_dw_table(table, str(self.dw_dir), fmt=self.fmt)
+
+    def record(self, tables) -> None:
+        for table in tables:
+            self.manifest[table] = {
+                **self.entries[table],
+                "key": self.keys[table],
+                "format": self.fmt,
+                "output": self._output_hash(table),
+            }
+
+    def save(self) -> None:
+        self.dw_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -0,0 +1,213 @@
+# ETL/executor.py
+"""
+Ejecutor del pipeline como grafo de etapas.
+
+Cada nodo (tabla raw, dimensión, hecho u OBT) corre una sola vez por
+invocación y su resultado queda memoizado para las etapas que lo consumen.
+Los nodos cuyas dependencias ya están resueltas se ejecutan en paralelo
+dentro de un pool de threads.
+
+Contrato de las etapas: las tablas que recibe un builder (raw, validadas,
+dimensiones y hechos previos) se comparten entre etapas y son de solo
+lectura. Los builders no las copian a la defensiva ni les agregan o pisan
+columnas: arman su salida con selecciones, rename/merge/assign, que con
+copy-on-write de pandas no duplican datos hasta que alguien escribe.
+Con ETL_GUARD_INPUTS=1 cada builder se verifica contra ese contrato.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import os
+import pandas as pd
+
+from ETL.extract.extract import extract_raw_table, open_raw_table
+from ETL.planning import (
+    RAW_PREFIX, REF_PREFIX, STAGES, VALID_PREFIX,
+    input_node, is_input, plan_with_cache, resolve_stages, stage_kind,
+)
+from ETL.transform import (
+    CALENDAR_SOURCES, DATES_PREFIX, DIMENSIONS, FACTS, ROLLUPS, KEYED_DIMENSIONS, KEYED_FACTS,
+)
+from ETL.transform.date_keys import raw_date_range
+from ETL.transform.surrogate_keys import SurrogateKeyRegistry
+from ETL.transform.dtypes import apply_dtype_policy
+from ETL.cache import BuildCache
+from ETL.instrumentation import RunReport, measured, warn
+from ETL.validation import Quarantine, referenced_tables, reference_keys, validate_table
+from ETL.validation_rules import REF_KEYS
+
+# Las selecciones y derivaciones comparten memoria con su origen hasta que se
+# escriben (también en los procesos del modo sharded, que importan este módulo)
+pd.set_option("mode.copy_on_write", True)
+
+# Modo de prueba: falla si un builder modifica alguna de sus tablas de entrada
+GUARD_INPUTS = os.environ.get("ETL_GUARD_INPUTS", "") not in ("", "0")
+
+
+def _fingerprint(df: pd.DataFrame | None) -> tuple | None:
+    """Columnas, tipos y hash de filas de una tabla (para detectar cambios)."""
+    if not isinstance(df, pd.DataFrame):
+        return None
+    return (list(df.columns), [str(t) for t in df.dtypes], df.index.copy(),
+            pd.util.hash_pandas_object(df, index=False).to_numpy())
+
+
+def _changed(before: tuple | None, after: tuple | None) -> bool:
+    if before is None or after is None:
+        return before is not after
+    return (before[0] != after[0] or before[1] != after[1]
+            or not before[2].equals(after[2]) or not (before[3] == after[3]).all())
+
+
+def _call_builder(name: str, fn, inputs: dict[str, pd.DataFrame], *args, **kwargs) -> pd.DataFrame:
+    """
+    Llama al builder de 'name'. Con GUARD_INPUTS verifica que las tablas de
+    'inputs' (las que recibe el builder) salgan iguales a como entraron.
+    """
+    if not GUARD_INPUTS:
+        return fn(*args, **kwargs)
+    before = {t: _fingerprint(df) for t, df in inputs.items()}
+    out = fn(*args, **kwargs)
+    touched = sorted(t for t, df in inputs.items() if _changed(before[t], _fingerprint(df)))
+    if touched:
+        raise ValueError(f"La etapa '{name}' modificó sus tablas de entrada {touched}; "
+                         "los builders no deben escribir sobre raw, dimensiones ni hechos previos.")
+    return out
+
+
+def run_node(name: str, results: dict, raw_dir: str,
+             keys: SurrogateKeyRegistry | None = None,
+             quarantine: Quarantine | None = None) -> pd.DataFrame | None:
+    """
+    Construye un único nodo a partir de los resultados de sus dependencias
+    ('results' indexado por nombre de nodo, con las raw como 'raw:<tabla>').
+    Las tablas construidas salen con la política de tipos de
+    ETL/transform/dtypes.py.
+    """
+    if name.startswith(RAW_PREFIX):
+        return open_raw_table(raw_dir, name[len(RAW_PREFIX):])
+    if name.startswith(DATES_PREFIX):
+        table = name[len(DATES_PREFIX):]
+        return raw_date_range(raw_dir, table, CALENDAR_SOURCES[table])
+    if name.startswith(REF_PREFIX):
+        table = name[len(REF_PREFIX):]
+        if VALID_PREFIX + table in results:
+            # claves de la tabla ya validada: lo que quedó en cuarentena no se referencia
+            return reference_keys(table, results[VALID_PREFIX + table])
+        # de la tabla referenciada solo se lee la clave
+        return reference_keys(table, extract_raw_table(raw_dir, table, [REF_KEYS[table]]))
+    if name.startswith(VALID_PREFIX):
+        table = name[len(VALID_PREFIX):]
+        df = results[RAW_PREFIX + table]
+        if df is None:
+            return None
+        refs = {r: results[REF_PREFIX + r] for r in referenced_tables(table) if REF_PREFIX + r in results}
+        valid, rejected = validate_table(table, df, refs)
+        if quarantine is not None:
+            quarantine.add(table, rejected)
+        return valid
+
+    fn, raw_tables, deps = STAGES[name]
+    sources = {t: VALID_PREFIX + t if VALID_PREFIX + t in results else RAW_PREFIX + t for t in raw_tables}
+    raw = {t: results[src] for t, src in sources.items() if results[src] is not None}
+    upstream = {d: results[d] for d in deps}
+
+    inputs = {**raw, **upstream}
+    if name in DIMENSIONS:
+        if name in KEYED_DIMENSIONS and keys is not None:
+            return apply_dtype_policy(_call_builder(name, fn, inputs, raw, keys=keys))
+        if deps:
+            return apply_dtype_policy(_call_builder(name, fn, inputs, raw, upstream))
+        return apply_dtype_policy(_call_builder(name, fn, inputs, raw))
+    if name in FACTS or name in ROLLUPS:
+        if name in KEYED_FACTS and keys is not None:
+            return apply_dtype_policy(_call_builder(name, fn, inputs, raw, upstream, keys=keys))
+        return apply_dtype_policy(_call_builder(name, fn, inputs, raw, upstream))
+    dims = {d: df for d, df in upstream.items() if d in DIMENSIONS}
+    facts = {d: df for d, df in upstream.items() if d in FACTS}
+    return apply_dtype_policy(_call_builder(name, fn, inputs, raw, dims, facts))
+
+
+def _warn_missing_raw(name: str, inputs: dict, raw_dir: str, report: RunReport | None) -> None:
+    # una etapa sin ninguno de sus archivos raw corre igual (p.ej. fact_web_session
+    # queda vacío), pero se avisa
+    if is_input(name) or not STAGES[name][1]:
+        return
+    raw = [d for d in inputs if d.startswith((RAW_PREFIX, VALID_PREFIX))]
+    if raw and all(inputs[d] is None for d in raw):
+        files = " ni ".join(f"{raw_dir}/{t}.csv" for t in STAGES[name][1])
+        warn(report, name, f"no hay {files}; la tabla queda sin datos de raw.")
+
+
+def run_stages(targets: list[str], raw_dir: str = "raw",
+               max_workers: int | None = None,
+               raw: dict[str, pd.DataFrame] | None = None,
+               keys: SurrogateKeyRegistry | None = None,
+               cache: BuildCache | None = None,
+               report: RunReport | None = None,
+               quarantine: Quarantine | None = None,
+               refs: dict[str, pd.DataFrame] | None = None) -> dict[str, pd.DataFrame]:
+    """
+    Ejecuta el grafo necesario para 'targets' y devuelve el resultado de
+    cada etapa (dimensiones, hechos y/o OBT) indexado por nombre.
+    Las tablas de 'raw' se usan tal cual en lugar de leerse de 'raw_dir'.
+    'keys' es el registro de claves sustitutas que usan las dimensiones (y,
+    solo para leer, los hechos de KEYED_FACTS).
+    Los nodos de entrada pedidos como objetivo ('raw:'/'valid:') también se
+    devuelven. Con 'cache', los objetivos al día no se devuelven (no hace falta
+    reescribirlos) y las etapas al día que otras necesitan se leen del DW.
+    Con 'report', cada nodo queda medido en el reporte de la corrida.
+    Con 'quarantine', las tablas raw con reglas se validan antes de usarse y
+    las filas que fallan se acumulan ahí. 'refs' aporta tablas completas para
+    las claves de referencia (p.ej. cuando 'raw' trae solo deltas); para las
+    tablas que se validan, sus claves se suman a las de la tabla validada
+    (p.ej. las órdenes ya cargadas en el DW más las válidas del delta).
+    """
+    pending = resolve_stages(targets, validate=quarantine is not None)
+    loaded = set()
+    if cache is not None:
+        pending, loaded, skipped = plan_with_cache(pending, targets, cache)
+        for name in sorted(skipped):
+            print(f" -> Tabla '{name}' sin cambios, se omite.")
+    results = {}
+    running = {}
+
+    for table, df in (raw or {}).items():
+        if RAW_PREFIX + table in pending:
+            del pending[RAW_PREFIX + table]
+            results[RAW_PREFIX + table] = df
+    extra_keys = {}
+    for table, df in (refs or {}).items():
+        name = REF_PREFIX + table
+        if name in pending and pending[name]:
+            extra_keys[name] = reference_keys(table, df)
+        elif name in pending:
+            del pending[name]
+            results[name] = reference_keys(table, df)
+    # las raw que ya nadie necesita (p.ej. referencias provistas) no se leen
+    needed = {d for deps in pending.values() for d in deps}
+    for name in [n for n in pending if n.startswith(RAW_PREFIX) and n not in needed and n not in targets]:
+        del pending[name]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            ready = [n for n, deps in pending.items() if all(d in results for d in deps)]
+            for name in ready:
+                inputs = {d: results[d] for d in pending.pop(name)}
+                _warn_missing_raw(name, inputs, raw_dir, report)
+                if name in loaded:
+                    fut = pool.submit(measured, report, name, "dw_read", cache.load, name)
+                else:
+                    fut = pool.submit(measured, report, name, stage_kind(name),
+                                      run_node, name, results, raw_dir, keys, quarantine, inputs=inputs)
+                running[fut] = name
+            if not running and pending:
+                raise ValueError(f"Dependencias circulares entre etapas: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                results[name] = fut.result()
+                if name in extra_keys:
+                    results[name] = results[name].union(extra_keys[name])
+
+    return {n: df for n, df in results.items()
+            if (not is_input(n) or n in targets) and n not in loaded}
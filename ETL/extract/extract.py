@@ -1,20 +1,237 @@
-import pandas as pd
+from collections.abc import Mapping
 from pathlib import Path
+import threading
+import pandas as pd
+
+from ETL.extract.schema import RAW_SCHEMAS, STREAMED_TABLES
+
+# Filas por chunk al recorrer las tablas de STREAMED_TABLES
+STREAM_CHUNKSIZE = 500_000
+
+# df.attrs[INVALID_DATES]: {columna: índice de las filas con una fecha que no
+# respeta el formato}. Esas fechas quedan vacías (NaT); la validación manda
+# las filas a cuarentena con el motivo 'DATE:<columna>'.
+INVALID_DATES = "invalid_dates"
+
+# df.attrs[INVALID_VALUES]: lo mismo para los valores que no entran en su
+# columna numérica (p.ej. 'dos' en una cantidad): quedan vacíos y la
+# validación los manda a cuarentena con el motivo 'TYPE:<columna>'.
+INVALID_VALUES = "invalid_values"
+
+_NUMERIC = {"int64", "Int64", "float64"}
+
+
+def _schema_columns(file_path: Path, schema: dict, columns: list[str] | None) -> list[str]:
+    header = pd.read_csv(file_path, nrows=0).columns
+    return [c for c in schema["columns"] if c in header and (columns is None or c in columns)]
+
+
+def _coerce_numeric(df: pd.DataFrame, table: str, numeric: dict[str, str],
+                    quiet: bool = False) -> pd.DataFrame:
+    """
+    Convierte columnas numéricas leídas como texto. Los valores que no son un
+    número (o un entero, si la columna es entera) quedan vacíos y se marcan
+    en INVALID_VALUES; un entero con nulos pasa a Int64 (con aviso).
+    """
+    invalid = {}
+    for col, dtype in numeric.items():
+        text = df[col]
+        values = pd.to_numeric(text, errors="coerce")
+        wrong = text.notna() & values.isna()
+        if dtype != "float64":
+            wrong |= values.notna() & (values % 1 != 0)
+        if wrong.any():
+            invalid[col] = df.index[wrong.to_numpy()].to_numpy()
+            values = values.mask(wrong)
+            if not quiet:
+                print(f" -> ⚠️ {table}.{col}: {int(wrong.sum())} valores no son {dtype} "
+                      f"(p.ej. {text[wrong].iloc[0]!r}); quedan vacíos.")
+        if dtype == "int64" and values.isna().any():
+            missing = int(text.isna().sum())
+            if missing and not quiet:
+                print(f" -> ⚠️ {table}.{col}: {missing} filas sin valor en una columna "
+                      f"{dtype}; se lee como Int64.")
+            dtype = "Int64"
+        df[col] = values.astype(dtype)
+    if invalid:
+        df.attrs[INVALID_VALUES] = invalid
+    return df
+
+
+def _parse_dates(df: pd.DataFrame, table: str, schema: dict, quiet: bool = False) -> pd.DataFrame:
+    # fechas con su formato exacto; las que no lo respetan se cuentan y se marcan
+    invalid = {}
+    for col, fmt in schema["dates"].items():
+        if col not in df.columns:
+            continue
+        text = df[col]
+        df[col] = pd.to_datetime(text, format=fmt, errors="coerce")
+        wrong = text.notna() & df[col].isna()
+        if wrong.any():
+            invalid[col] = df.index[wrong.to_numpy()].to_numpy()
+            if not quiet:
+                print(f" -> ⚠️ {table}.{col}: {int(wrong.sum())} fechas no respetan el formato {fmt} "
+                      f"(p.ej. {text[wrong].iloc[0]!r}); quedan vacías.")
+    if invalid:
+        df.attrs[INVALID_DATES] = invalid
+    return df
+
+
+def _read_with_schema(file_path: Path, table: str, schema: dict,
+                      columns: list[str] | None = None) -> pd.DataFrame:
+    cols = _schema_columns(file_path, schema, columns)
+    dtypes = {c: t for c, t in schema["dtypes"].items() if c in cols}
+
+    try:
+        df = pd.read_csv(file_path, usecols=cols, dtype=dtypes)[cols]  # usecols no respeta el orden
+    except (ValueError, TypeError):
+        # p.ej. nulos en una columna declarada int64 o un valor que no es un
+        # número: las columnas numéricas se leen como texto y se convierten
+        numeric = {c: t for c, t in dtypes.items() if t in _NUMERIC}
+        df = pd.read_csv(file_path, usecols=cols, dtype={**dtypes, **{c: "str" for c in numeric}})[cols]
+        df = _coerce_numeric(df, table, numeric)
+    return _parse_dates(df, table, schema)
+
+def extract_raw_table(raw_dir: str, table_name: str, columns: list[str] | None = None) -> pd.DataFrame | None:
+    """
+    Lee un único CSV de la carpeta 'raw'. Devuelve None si el archivo no existe.
+    Si la tabla tiene esquema en ETL/extract/schema.py se leen solo sus columnas,
+    con los tipos y formatos de fecha declarados. Con 'columns' se leen solo
+    esas (p.ej. la clave de una tabla referenciada).
+    """
+    file_path = Path(raw_dir) / f"{table_name}.csv"
+    if not file_path.exists():
+        return None
+
+    schema = RAW_SCHEMAS.get(table_name)
+    if schema is None:
+        df = pd.read_csv(file_path, usecols=columns)
+    else:
+        df = _read_with_schema(file_path, table_name, schema, columns)
+    print(f" -> Archivo '{file_path.name}' cargado correctamente.")
+    return df
 
-def extract_raw_data(raw_dir: str = "raw") -> dict[str, pd.DataFrame]:
+def iter_raw_table(raw_dir: str, table_name: str, chunksize: int, columns: list[str] | None = None,
+                   quiet: bool = False):
     """
-    Lee todos los CSV dentro de la carpeta 'raw' y devuelve un diccionario
-    con los DataFrames.
+    Lee un CSV de 'raw' en chunks de 'chunksize' filas, aplicando el mismo
+    esquema que extract_raw_table. Las columnas enteras se leen como Int64
+    (nullable) para que todos los chunks tengan el mismo tipo aunque alguno
+    traiga nulos. Con 'columns' se leen solo esas columnas; con 'quiet' no se
+    avisan las fechas ni los valores inválidos (los marca igual en
+    INVALID_DATES e INVALID_VALUES).
     """
-    raw_path = Path(raw_dir)
-    raw_data = {}
+    file_path = Path(raw_dir) / f"{table_name}.csv"
+    if not file_path.exists():
+        raise FileNotFoundError(f"No se encontró '{file_path}'.")
 
-    for file_path in raw_path.glob("*.csv"):
-        table_name = file_path.stem
-        raw_data[table_name] = pd.read_csv(file_path)
-        print(f" -> Archivo '{file_path.name}' cargado correctamente.")
+    schema = RAW_SCHEMAS.get(table_name)
+    if schema is None:
+        yield from pd.read_csv(file_path, usecols=columns, chunksize=chunksize)
+        return
 
-    return raw_data
+    cols = _schema_columns(file_path, schema, columns)
+    dtypes = {c: ("Int64" if t == "int64" else t)
+              for c, t in schema["dtypes"].items() if c in cols}
+
+    done = 0
+    try:
+        for chunk in pd.read_csv(file_path, usecols=cols, dtype=dtypes, chunksize=chunksize):
+            done += len(chunk)
+            yield _parse_dates(chunk[cols], table_name, schema, quiet)
+        return
+    except (ValueError, TypeError):
+        pass
+
+    # un valor que no entra en su tipo: se vuelve a recorrer el archivo con las
+    # columnas numéricas como texto y se sigue desde la fila que faltaba
+    numeric = {c: t for c, t in dtypes.items() if t in _NUMERIC}
+    text = {**dtypes, **{c: "str" for c in numeric}}
+    for chunk in pd.read_csv(file_path, usecols=cols, dtype=text, chunksize=chunksize):
+        chunk = chunk[chunk.index >= done]
+        if chunk.empty:
+            continue
+        chunk = _coerce_numeric(chunk[cols], table_name, numeric, quiet)
+        yield _parse_dates(chunk, table_name, schema, quiet)
+
+class RawStream:
+    """
+    Tabla raw que no se carga entera (las de STREAMED_TABLES, p.ej. el log
+    de eventos web): cada vez que un builder la recorre se lee de nuevo del
+    CSV, de a 'chunksize' filas.
+    """
+    def __init__(self, raw_dir: str, table_name: str, chunksize: int = STREAM_CHUNKSIZE):
+        self.raw_dir = raw_dir
+        self.table_name = table_name
+        self.chunksize = chunksize
+        header = pd.read_csv(Path(raw_dir) / f"{table_name}.csv", nrows=0).columns
+        schema = RAW_SCHEMAS.get(table_name)
+        self.columns = pd.Index([c for c in schema["columns"] if c in header] if schema else header)
+
+    def chunks(self, columns: list[str] | None = None):
+        """Chunks de la tabla (solo 'columns' si se indican)."""
+        return iter_raw_table(self.raw_dir, self.table_name, self.chunksize, columns)
+
+    def __repr__(self) -> str:
+        return f"RawStream('{self.raw_dir}/{self.table_name}.csv')"
+
+def open_raw_table(raw_dir: str, table_name: str) -> pd.DataFrame | RawStream | None:
+    """
+    Entrada raw de una etapa: las tablas de STREAMED_TABLES como RawStream
+    (sin leerlas), el resto con extract_raw_table. None si el archivo no existe.
+    """
+    if table_name not in STREAMED_TABLES:
+        return extract_raw_table(raw_dir, table_name)
+    if not (Path(raw_dir) / f"{table_name}.csv").exists():
+        return None
+    print(f" -> Archivo '{table_name}.csv' se recorre en streaming.")
+    return RawStream(raw_dir, table_name)
+
+class RawCatalog(Mapping):
+    """
+    Catálogo perezoso de las tablas raw: se usa como un dict de solo lectura
+    ('raw_data["x"]', '.get', 'in'), pero cada CSV se parsea recién cuando
+    alguien lo pide y queda cacheado. Es seguro entre threads: si dos etapas
+    piden la misma tabla a la vez, se lee una sola vez. Las tablas de
+    STREAMED_TABLES se devuelven como RawStream.
+    """
+    def __init__(self, raw_dir: str = "raw", tables: list[str] | None = None):
+        self.raw_dir = raw_dir
+        raw_path = Path(raw_dir)
+        names = tables if tables is not None else sorted(p.stem for p in raw_path.glob("*.csv"))
+        self._names = [t for t in names if (raw_path / f"{t}.csv").exists()]
+        self._locks = {t: threading.Lock() for t in self._names}
+        self._frames: dict[str, pd.DataFrame] = {}
+
+    def __getitem__(self, table_name: str) -> pd.DataFrame | RawStream:
+        if table_name not in self._locks:
+            raise KeyError(table_name)
+        with self._locks[table_name]:
+            if table_name not in self._frames:
+                self._frames[table_name] = open_raw_table(self.raw_dir, table_name)
+        return self._frames[table_name]
+
+    def __contains__(self, table_name) -> bool:
+        # sin parsear el archivo
+        return table_name in self._locks
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def loaded(self) -> list[str]:
+        """Tablas ya parseadas."""
+        return [t for t in self._names if t in self._frames]
+
+def extract_raw_data(raw_dir: str = "raw", tables: list[str] | None = None) -> RawCatalog:
+    """
+    Devuelve el catálogo de los CSV de la carpeta 'raw' (o solo los de
+    'tables'). Cada tabla se lee recién la primera vez que se accede.
+    """
+    return RawCatalog(raw_dir, tables)
 
 if __name__ == "__main__":
     datos_extraidos = extract_raw_data()
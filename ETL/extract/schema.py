@@ -0,0 +1,134 @@
+# ETL/extract/schema.py
+"""
+Registro de esquemas de las tablas raw.
+
+Para cada tabla se declara:
+  - columns: columnas que consumen los builders de ETL/transform (el resto
+    del CSV no se lee; p.ej. event_id y event_type de web_event). Cada
+    etapa puede pedir menos: las claves de referencia de la validación y el
+    rango de fechas del calendario leen solo sus columnas.
+  - dtypes: tipo de cada columna, para no depender de la inferencia.
+  - dates: columnas de fecha con su formato exacto, que se parsean una sola
+    vez en la extracción (las que no lo respetan se marcan para la
+    validación, ver ETL/extract/extract.py:INVALID_DATES).
+Las tablas sin esquema se leen completas con tipos inferidos.
+Las de STREAMED_TABLES no se cargan en memoria: las etapas las recorren en
+chunks (ver ETL/extract/extract.py:RawStream).
+"""
+
+DATETIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+# Tablas raw más grandes que la memoria: se leen siempre en chunks
+STREAMED_TABLES = {"web_event"}
+
+RAW_SCHEMAS = {
+    # dim_address, dim_store
+    "address": {
+        "columns": ["address_id", "line1", "line2", "city", "province_id",
+                    "postal_code", "country_code", "created_at"],
+        "dtypes": {"address_id": "int64", "line1": "str", "line2": "str", "city": "str",
+                   "province_id": "int64", "postal_code": "int64",
+                   "country_code": "str", "created_at": "str"},
+        "dates": {},
+    },
+    # dim_channel
+    "channel": {
+        "columns": ["channel_id", "code", "name"],
+        "dtypes": {"channel_id": "int64", "code": "str", "name": "str"},
+        "dates": {},
+    },
+    # dim_customer
+    "customer": {
+        "columns": ["customer_id", "email", "first_name", "last_name",
+                    "phone", "status", "created_at"],
+        "dtypes": {"customer_id": "int64", "email": "str", "first_name": "str",
+                   "last_name": "str", "phone": "str", "status": "str", "created_at": "str"},
+        "dates": {},
+    },
+    # fact_nps_response
+    "nps_response": {
+        "columns": ["nps_id", "customer_id", "channel_id", "score", "comment", "responded_at"],
+        "dtypes": {"nps_id": "int64", "customer_id": "int64", "channel_id": "int64",
+                   "score": "int64", "comment": "str", "responded_at": "str"},
+        "dates": {"responded_at": DATETIME_FMT},
+    },
+    # fact_payment
+    "payment": {
+        "columns": ["payment_id", "order_id", "method", "status", "amount",
+                    "paid_at", "transaction_ref"],
+        "dtypes": {"payment_id": "int64", "order_id": "int64", "method": "str",
+                   "status": "str", "amount": "float64", "paid_at": "str",
+                   "transaction_ref": "str"},
+        "dates": {"paid_at": DATETIME_FMT},
+    },
+    # dim_product
+    "product": {
+        "columns": ["product_id", "sku", "name", "category_id", "list_price",
+                    "status", "created_at"],
+        "dtypes": {"product_id": "int64", "sku": "str", "name": "str", "category_id": "int64",
+                   "list_price": "float64", "status": "str", "created_at": "str"},
+        "dates": {},
+    },
+    # dim_product
+    "product_category": {
+        "columns": ["category_id", "name", "parent_id"],
+        "dtypes": {"category_id": "int64", "name": "str", "parent_id": "float64"},
+        "dates": {},
+    },
+    # dim_address, one_big_table
+    "province": {
+        "columns": ["province_id", "name", "code"],
+        "dtypes": {"province_id": "int64", "name": "str", "code": "str"},
+        "dates": {},
+    },
+    # dim_calendar, fact_sales_order, one_big_table
+    "sales_order": {
+        "columns": ["order_id", "customer_id", "channel_id", "store_id", "order_date",
+                    "billing_address_id", "shipping_address_id", "status", "currency_code",
+                    "subtotal", "tax_amount", "shipping_fee", "total_amount"],
+        "dtypes": {"order_id": "int64", "customer_id": "int64", "channel_id": "int64",
+                   "store_id": "float64", "order_date": "str",
+                   "billing_address_id": "float64", "shipping_address_id": "int64",
+                   "status": "str", "currency_code": "str", "subtotal": "float64",
+                   "tax_amount": "float64", "shipping_fee": "float64", "total_amount": "float64"},
+        "dates": {"order_date": DATETIME_FMT},
+    },
+    # fact_sales_order_item
+    "sales_order_item": {
+        "columns": ["order_item_id", "order_id", "product_id", "quantity",
+                    "unit_price", "discount_amount", "line_total"],
+        "dtypes": {"order_item_id": "int64", "order_id": "int64", "product_id": "int64",
+                   "quantity": "int64", "unit_price": "float64",
+                   "discount_amount": "float64", "line_total": "float64"},
+        "dates": {},
+    },
+    # fact_shipment
+    "shipment": {
+        "columns": ["shipment_id", "order_id", "carrier", "tracking_number", "status",
+                    "shipped_at", "delivered_at"],
+        "dtypes": {"shipment_id": "int64", "order_id": "int64", "carrier": "str",
+                   "tracking_number": "str", "status": "str",
+                   "shipped_at": "str", "delivered_at": "str"},
+        "dates": {"shipped_at": DATETIME_FMT, "delivered_at": DATETIME_FMT},
+    },
+    # dim_store
+    "store": {
+        "columns": ["store_id", "name", "address_id"],
+        "dtypes": {"store_id": "int64", "name": "str", "address_id": "int64"},
+        "dates": {},
+    },
+    # dim_calendar, fact_web_session (log de eventos, en orden de event_at)
+    "web_event": {
+        "columns": ["visitor_id", "customer_id", "event_at", "source", "device"],
+        "dtypes": {"visitor_id": "str", "customer_id": "float64", "event_at": "str",
+                   "source": "str", "device": "str"},
+        "dates": {"event_at": DATETIME_FMT},
+    },
+    # fact_web_session (sesiones ya armadas, si no hay log de eventos)
+    "web_session": {
+        "columns": ["session_id", "customer_id", "started_at", "ended_at", "source", "device"],
+        "dtypes": {"started_at": "str", "ended_at": "str",
+                   "source": "str", "device": "str"},
+        "dates": {"started_at": DATETIME_FMT, "ended_at": DATETIME_FMT},
+    },
+}
@@ -0,0 +1,163 @@
+# ETL/instrumentation.py
+"""
+Instrumentación por etapa y reporte de corrida.
+
+Cada etapa (lectura raw, dimensión, hecho, OBT, rollup, escritura al DW) se
+mide con 'measured': tiempo de reloj, tiempo de CPU del thread que la
+ejecuta, filas de entrada y salida y memoria de los DataFrames producidos.
+Al terminar, 'RunReport.write' deja la corrida en DW/_runs/<run_id>.json,
+con un resumen de filas y memoria por tabla, y actualiza DW/_published.json
+(la última corrida publicada), que la capa de consultas (ETL/serving.py)
+usa para saber cuándo recargar.
+Con 'profile' se vuelca además un perfil cProfile de la etapa elegida.
+Los avisos de las etapas (p.ej. una tabla que queda vacía por falta de
+archivos raw) se muestran y quedan en el reporte, en 'warnings'.
+"""
+from datetime import datetime
+from pathlib import Path
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import pandas as pd
+
+RUNS_DIR = "_runs"
+PUBLISH_MARKER = "_published.json"
+
+# Etapas que producen tablas (para el resumen de memoria por tabla)
+TABLE_KINDS = {"dimension", "fact", "obt", "rollup", "dw_read"}
+
+
+def _frames(obj) -> list[pd.DataFrame]:
+    if isinstance(obj, pd.DataFrame):
+        return [obj]
+    if isinstance(obj, dict):
+        return [df for v in obj.values() for df in _frames(v)]
+    return []
+
+
+def frame_rows(obj) -> int:
+    """Filas de un DataFrame o de un dict de DataFrames."""
+    return sum(len(df) for df in _frames(obj))
+
+
+def frame_memory_mb(obj) -> float:
+    """Memoria (deep) de un DataFrame o de un dict de DataFrames, en MB."""
+    return sum(int(df.memory_usage(deep=True).sum()) for df in _frames(obj)) / 2**20
+
+
+class RunReport:
+    def __init__(self, step: str, dw_dir: str = "DW", profile: str | None = None):
+        self.step = step
+        self.dw_dir = Path(dw_dir)
+        self.profile = profile
+        self.run_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.stages: list[dict] = []
+        self.warnings: list[dict] = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def measure(self, stage: str, kind: str, fn, *args, inputs=None, **kwargs):
+        """
+        Ejecuta fn(*args, **kwargs) registrando sus métricas como 'stage'.
+        Las filas/memoria de salida se toman del resultado si es un
+        DataFrame (o dict de DataFrames); si no, de 'inputs' (p.ej. escrituras).
+        Si fn devuelve un entero, se toma como la cantidad de filas escritas.
+        """
+        prof = cProfile.Profile() if stage == self.profile else None
+        wall, cpu = time.perf_counter(), time.thread_time()
+        if prof is not None:
+            prof.enable()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            if prof is not None:
+                prof.disable()
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+
+        output = result if _frames(result) else inputs
+        record = {
+            "stage": stage,
+            "kind": kind,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "rows_in": frame_rows(inputs),
+            "rows_out": result if type(result) is int else frame_rows(output),
+            "memory_mb": round(frame_memory_mb(output), 3),
+        }
+        with self._lock:
+            self.stages.append(record)
+        if prof is not None:
+            self._dump_profile(stage, kind, prof)
+        return result
+
+    def warn(self, stage: str, message: str) -> None:
+        with self._lock:
+            self.warnings.append({"stage": stage, "message": message})
+
+    def _dump_profile(self, stage: str, kind: str, prof: cProfile.Profile) -> None:
+        out_dir = self.dw_dir / RUNS_DIR
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / f"{self.run_id}_{kind}_{stage.replace(':', '_')}.prof"
+        prof.dump_stats(path)
+
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(25)
+        path.with_suffix(".txt").write_text(buf.getvalue(), encoding="utf-8")
+        print(f" -> Perfil de '{stage}' ({kind}) guardado en '{path}'.")
+
+    def memory_by_table(self) -> dict[str, dict]:
+        """Filas y memoria de cada tabla construida (o leída del DW), de mayor a menor."""
+        tables = {s["stage"]: {"rows": s["rows_out"], "memory_mb": s["memory_mb"]}
+                  for s in self.stages if s["kind"] in TABLE_KINDS}
+        return dict(sorted(tables.items(), key=lambda kv: -kv[1]["memory_mb"]))
+
+    def _publish(self, tables: dict) -> None:
+        # se escribe después de las tablas: quien lo ve cambiar ya puede releerlas
+        marker = {"run_id": self.run_id, "step": self.step,
+                  "published_at": datetime.now().isoformat(timespec="seconds"), "tables": sorted(tables)}
+        path = self.dw_dir / PUBLISH_MARKER
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(marker, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def write(self) -> Path:
+        """Escribe el reporte JSON de la corrida, la marca de publicación y devuelve su ruta."""
+        tables = self.memory_by_table()
+        report = {
+            "run_id": self.run_id,
+            "step": self.step,
+            "started_at": self.started_at,
+            "wall_s": round(time.perf_counter() - self._start, 4),
+            "memory_mb": round(sum(t["memory_mb"] for t in tables.values()), 3),
+            "tables": tables,
+            "stages": self.stages,
+            "warnings": self.warnings,
+        }
+        out_dir = self.dw_dir / RUNS_DIR
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / f"{self.run_id}.json"
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        self._publish(tables)
+        print(f" -> Reporte de corrida guardado en '{path}'.")
+        return path
+
+
+def measured(report: RunReport | None, stage: str, kind: str, fn, *args, inputs=None, **kwargs):
+    """Como report.measure, o una llamada directa si no hay reporte."""
+    if report is None:
+        return fn(*args, **kwargs)
+    return report.measure(stage, kind, fn, *args, inputs=inputs, **kwargs)
+
+
+def warn(report: RunReport | None, stage: str, message: str) -> None:
+    """Muestra un aviso de 'stage' y, si hay reporte, lo deja registrado."""
+    print(f" -> ⚠️ {stage}: {message}")
+    if report is not None:
+        report.warn(stage, message)
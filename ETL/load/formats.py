@@ -0,0 +1,231 @@
+# ETL/load/formats.py
+"""
+Escritura y lectura de tablas del DW en CSV o en formatos columnares
+(Parquet / Feather, vía pyarrow).
+
+En los formatos columnares la OBT y los hechos grandes se particionan por
+mes: DW/<tabla>/year_month=AAAA-MM/part-0.<ext>. 'read_dw_table' lee solo
+las columnas y particiones pedidas.
+
+Cada escritura va primero a un archivo temporal en el mismo directorio y se
+renombra al final (os.replace), así un lector nunca ve una tabla a medio
+escribir. Opcionalmente se comprime: en CSV el archivo pasa a <tabla>.csv.gz,
+en Parquet cambia el códec interno.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+from ETL.load.paths import COMPRESSIONS, FORMATS, table_path
+
+# Nivel 1: casi tan rápido como el CSV plano y ~5x más chico (9 tarda el doble
+# y gana poco más)
+GZIP_LEVEL = 1
+
+# tabla -> columna desde la que se deriva la partición year_month
+PARTITIONS = {
+    "one_big_table": "year_month",
+    "fact_sales_order": "order_date_id",
+    "fact_payment": "paid_date_id",
+    "fact_shipment": "shipped_date_id",
+}
+
+PARTITION_KEY = "year_month"
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _require_pyarrow(fmt: str) -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as exc:
+        raise ImportError(
+            f"El formato '{fmt}' requiere pyarrow (pip install pyarrow)."
+        ) from exc
+
+
+def year_month_labels(s: pd.Series) -> np.ndarray:
+    """
+    Etiqueta 'AAAA-MM' por fila a partir de un 'year_month', una clave
+    AAAAMMDD o un timestamp. Formatea una vez por mes distinto, no por fila.
+    """
+    if s.name == PARTITION_KEY:
+        codes, uniques = pd.factorize(s)
+        labels = np.asarray(uniques, dtype=object).astype(str)
+    elif pd.api.types.is_numeric_dtype(s):
+        codes, uniques = pd.factorize(s // 100)
+        labels = np.array([f"{int(v) // 100:04d}-{int(v) % 100:02d}" for v in uniques], dtype=object)
+    else:
+        months = pd.to_datetime(s, errors="coerce").values.astype("datetime64[M]")
+        codes, uniques = pd.factorize(months)
+        labels = np.asarray(pd.DatetimeIndex(uniques).strftime("%Y-%m"), dtype=object)
+
+    # los códigos -1 (nulos) toman la última posición
+    labels = np.append(labels, NULL_PARTITION)
+    return labels[codes]
+
+
+def _check_options(fmt: str, compression: str | None) -> None:
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconocido: '{fmt}'. Opciones: {list(FORMATS)}")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Compresión desconocida: '{compression}'. Opciones: {list(COMPRESSIONS)}")
+    if compression is not None and fmt == "feather":
+        raise ValueError("El formato 'feather' no admite compresión gzip.")
+
+
+def _temp_sibling(path: Path) -> Path:
+    # en el mismo directorio (mismo filesystem) para que el rename sea atómico
+    return path.with_name(f".{path.name}.tmp-{os.getpid()}-{threading.get_ident()}")
+
+
+@contextmanager
+def atomic_output(path: Path):
+    """
+    Entrega una ruta temporal junto a 'path' y, si el bloque termina sin
+    errores, la renombra a 'path'. Si falla, el temporal se borra y 'path'
+    queda como estaba.
+    """
+    tmp = _temp_sibling(path)
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _write_file(df: pd.DataFrame, path: Path, fmt: str, compression: str | None = None) -> None:
+    if fmt == "csv":
+        # mtime=0: el mismo contenido da el mismo archivo (hash estable para el cache)
+        comp = {"method": compression, "compresslevel": GZIP_LEVEL, "mtime": 0} if compression else None
+        df.to_csv(path, index=False, encoding="utf-8", compression=comp)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False, compression=compression or "snappy")
+    else:
+        df.reset_index(drop=True).to_feather(path)
+
+
+def _remove_stale(table_name: str, dw_path: Path, fmt: str, keep: Path) -> None:
+    # el mismo formato con otra compresión (tabla.csv vs tabla.csv.gz) se borra,
+    # así los lectores no toman la versión vieja
+    for c in [None, *COMPRESSIONS]:
+        path = table_path(table_name, dw_path, fmt, c)
+        if path != keep:
+            path.unlink(missing_ok=True)
+
+
+def _swap_dir(tmp_dir: Path, out_dir: Path) -> None:
+    # dos renames: el directorio final falta solo entre ambos, nunca queda a medias
+    old = out_dir.with_name(f".{out_dir.name}.old-{os.getpid()}-{threading.get_ident()}")
+    if out_dir.exists():
+        os.replace(out_dir, old)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def write_table(df: pd.DataFrame, table_name: str, dw_dir: str = "DW", fmt: str = "csv",
+                compression: str | None = None) -> Path:
+    """
+    Escribe una tabla del DW en el formato pedido (de forma atómica) y
+    devuelve la ruta generada.
+    """
+    _check_options(fmt, compression)
+    if fmt != "csv":
+        _require_pyarrow(fmt)
+
+    dw_path = Path(dw_dir)
+    dw_path.mkdir(parents=True, exist_ok=True)
+    ext = FORMATS[fmt]
+
+    part_col = PARTITIONS.get(table_name)
+    if fmt == "csv" or part_col not in df.columns:
+        out_path = table_path(table_name, dw_path, fmt, compression)
+        with atomic_output(out_path) as tmp:
+            _write_file(df, tmp, fmt, compression)
+        _remove_stale(table_name, dw_path, fmt, out_path)
+        return out_path
+
+    # las particiones se arman en un directorio temporal que reemplaza al anterior
+    out_dir = dw_path / table_name
+    tmp_dir = _temp_sibling(out_dir)
+    try:
+        labels = year_month_labels(df[part_col])
+        for label, idx in pd.Series(labels).groupby(labels, sort=True).indices.items():
+            part_dir = tmp_dir / f"{PARTITION_KEY}={label}"
+            part_dir.mkdir(parents=True)
+            _write_file(df.take(idx), part_dir / f"part-0{ext}", fmt, compression)
+        _swap_dir(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return out_dir
+
+
+def _read_file(path: Path, columns: list[str] | None) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    if path.suffix == ".feather":
+        return pd.read_feather(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def read_dw_table(table_name: str, dw_dir: str = "DW",
+                  columns: list[str] | None = None,
+                  partitions: list[str] | None = None,
+                  fmt: str | None = None) -> pd.DataFrame:
+    """
+    Lee una tabla del DW (particionada o no, en cualquiera de los formatos).
+
+    - columns: solo se leen esas columnas (None = todas).
+    - partitions: lista de 'AAAA-MM'; en tablas particionadas solo se abren
+      esos directorios, en el resto se filtran las filas.
+    - fmt: fuerza un formato; por defecto se prefiere el columnar.
+    """
+    dw_path = Path(dw_dir)
+    part_dir = dw_path / table_name
+
+    if part_dir.is_dir() and fmt != "csv":
+        dirs = sorted(part_dir.glob(f"{PARTITION_KEY}=*"))
+        if partitions is not None:
+            wanted = set(partitions)
+            dirs = [d for d in dirs if d.name.split("=", 1)[1] in wanted]
+        frames = [_read_file(f, columns) for d in dirs for f in sorted(d.glob("part-*"))]
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        return pd.concat(frames, ignore_index=True)
+
+    # si conviven varios formatos se prefiere el columnar
+    fmts = [fmt] if fmt is not None else ["parquet", "feather", "csv"]
+    paths = [table_path(table_name, dw_path, f, c) for f in fmts for c in [None, *COMPRESSIONS]]
+    for path in paths:
+        if not path.exists():
+            continue
+
+        part_col = PARTITIONS.get(table_name)
+        if partitions is None or part_col is None:
+            return _read_file(path, columns)
+
+        read_cols = None if columns is None else list(dict.fromkeys([*columns, part_col]))
+        df = _read_file(path, read_cols)
+        df = df[np.isin(year_month_labels(df[part_col]), list(partitions))]
+        return df[columns].reset_index(drop=True) if columns is not None else df.reset_index(drop=True)
+
+    raise FileNotFoundError(f"No se encontró la tabla '{table_name}' en {dw_path}.")
+
+
+def iter_dw_table(table_name: str, dw_dir: str = "DW", columns: list[str] | None = None,
+                  chunksize: int = 100_000):
+    """
+    Recorre una tabla CSV del DW (con o sin gzip) de a 'chunksize' filas, sin
+    cargarla entera. Con 'columns' se leen solo esas columnas.
+    """
+    for compression in [None, *COMPRESSIONS]:
+        path = table_path(table_name, Path(dw_dir), "csv", compression)
+        if path.exists():
+            yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+            return
+    raise FileNotFoundError(f"No se encontró la tabla '{table_name}' en {dw_dir}.")
@@ -0,0 +1,156 @@
+# ETL/load/incremental.py
+"""
+Carga incremental de hechos con marcas de agua (high-water marks).
+
+Para cada hecho se guarda en DW/_watermarks.json el timestamp más nuevo ya
+cargado de cada columna de marca. En la siguiente corrida se transforman las
+filas raw con algún timestamp posterior a su marca (p.ej. un pago que pasó a
+PAID) y las que todavía no están en el DW por clave primaria: las que no
+tienen fecha de marca (pagos PENDING, envíos CANCELLED) o llegan tarde, con
+fecha anterior a la marca. Se anexan (o reemplazan por clave) en el DW.
+"""
+import json
+from pathlib import Path
+import os
+import shutil
+import pandas as pd
+
+from ETL.load.formats import atomic_output
+from ETL.load.paths import COMPRESSIONS, FORMATS, table_path
+from ETL.transform.dtypes import apply_dtype_policy
+
+STATE_FILE = "_watermarks.json"
+
+# hecho -> (tabla raw, columnas de marca de agua, clave primaria)
+WATERMARKS = {
+    "fact_sales_order": ("sales_order", ["order_date"], "order_id"),
+    # los ítems no cambian después de cargados: solo el anti-join por clave
+    "fact_sales_order_item": ("sales_order_item", [], "order_item_id"),
+    "fact_payment": ("payment", ["paid_at"], "payment_id"),
+    "fact_shipment": ("shipment", ["shipped_at", "delivered_at"], "shipment_id"),
+    "fact_nps_response": ("nps_response", ["responded_at"], "nps_id"),
+}
+
+
+def read_watermarks(dw_dir: str = "DW") -> dict[str, dict[str, pd.Timestamp]]:
+    path = Path(dw_dir) / STATE_FILE
+    if not path.exists():
+        return {}
+    state = json.loads(path.read_text(encoding="utf-8"))
+    return {
+        table: {col: pd.Timestamp(mark) for col, mark in marks.items()}
+        for table, marks in state.items()
+    }
+
+
+def write_watermarks(marks: dict[str, dict[str, pd.Timestamp]], dw_dir: str = "DW") -> None:
+    path = Path(dw_dir) / STATE_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    state = {
+        table: {col: mark.strftime("%Y-%m-%d %H:%M:%S") for col, mark in cols.items()}
+        for table, cols in marks.items()
+    }
+    # se escribe aparte y se renombra: si se corta, quedan las marcas anteriores
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def dw_csv_path(table_name: str, dw_dir: str = "DW") -> Path:
+    """
+    CSV sin comprimir de una tabla del DW, el que lee y anexa la carga
+    incremental. Si la tabla solo está comprimida o en otro formato es un
+    error: se la trataría como vacía y quedaría una segunda copia al lado.
+    """
+    path = table_path(table_name, dw_dir)
+    if path.exists():
+        return path
+    variants = dict.fromkeys(table_path(table_name, dw_dir, f, c) for f in FORMATS for c in [None, *COMPRESSIONS])
+    others = [p.name for p in [*variants, Path(dw_dir) / table_name] if p.exists()]
+    if others:
+        raise ValueError(f"La tabla '{table_name}' está en el DW solo como {', '.join(others)}; la carga "
+                         "incremental anexa sobre CSV sin comprimir. Regenerá el DW con --step all "
+                         "en CSV y sin --compress antes de --step incremental.")
+    return path
+
+
+def dw_keys(table_name: str, key: str, dw_dir: str = "DW") -> pd.Index:
+    """Claves primarias ya cargadas en DW/<tabla>.csv (vacío si no existe)."""
+    path = dw_csv_path(table_name, dw_dir)
+    if not path.exists():
+        return pd.Index([])
+    return pd.Index(pd.read_csv(path, usecols=[key])[key])
+
+
+def filter_new_rows(df: pd.DataFrame, cols: list[str], marks: dict[str, pd.Timestamp] | None,
+                    key: str | None = None,
+                    existing_keys: pd.Index | None = None) -> tuple[pd.DataFrame, dict[str, pd.Timestamp]]:
+    """
+    Devuelve las filas nuevas y las marcas actualizadas por columna. Sin marcas
+    todas las filas son nuevas. Con marcas, son nuevas las filas con alguna
+    fecha de 'cols' posterior a su marca y las que no están en 'existing_keys'
+    (anti-join por 'key'), aunque no tengan fecha o lleguen tarde. Sin 'cols'
+    (tablas sin marca) solo cuenta el anti-join.
+    """
+    marks = marks or {}
+    new_marks = dict(marks)
+    is_new = pd.Series(not marks and (bool(cols) or existing_keys is None), index=df.index)
+
+    for c in cols:
+        if c not in df.columns:
+            continue
+        stamps = pd.to_datetime(df[c], errors="coerce")
+        if c in marks:
+            is_new |= stamps > marks[c]
+        newest = stamps.max()
+        if pd.notna(newest) and (c not in marks or newest > marks[c]):
+            new_marks[c] = newest
+
+    if key is not None and existing_keys is not None and key in df.columns:
+        is_new |= ~df[key].isin(existing_keys)
+
+    return df[is_new], new_marks
+
+
+def upsert_to_dw(df: pd.DataFrame, table_name: str, key: str, dw_dir: str = "DW") -> int:
+    """
+    Anexa 'df' al CSV del DW. Si alguna clave ya existía, reescribe la tabla
+    reemplazando esas filas por las nuevas. Devuelve cuántas filas del DW se
+    reemplazaron.
+    """
+    out_path = dw_csv_path(table_name, dw_dir)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if not out_path.exists():
+        with atomic_output(out_path) as tmp:
+            df.to_csv(tmp, index=False)
+        print(f" -> Tabla '{out_path.name}' creada ({len(df)} filas).")
+        return 0
+    if df.empty:
+        print(f" -> Tabla '{out_path.name}' sin novedades.")
+        return 0
+
+    header = pd.read_csv(out_path, nrows=0).columns.tolist()
+    new_cols = [c for c in df.columns if c not in header]
+    df = df.reindex(columns=[*header, *new_cols])
+    existing_keys = pd.read_csv(out_path, usecols=[key])[key]
+
+    # con columnas nuevas (p.ej. una clave agregada al hecho) no se puede anexar
+    replaced = int(existing_keys.isin(df[key]).sum())
+    if not new_cols and not replaced:
+        # se anexa sobre una copia: si la escritura se corta, la tabla queda como estaba
+        with atomic_output(out_path) as tmp:
+            shutil.copyfile(out_path, tmp)
+            df.to_csv(tmp, mode="a", header=False, index=False)
+        print(f" -> Tabla '{out_path.name}': {len(df)} filas anexadas.")
+        return 0
+
+    current = pd.read_csv(out_path)
+    current = current[~current[key].isin(df[key])]
+    # sin las tablas vacías: concat no decide tipos con ellas
+    parts = [t for t in (current, df) if not t.empty]
+    with atomic_output(out_path) as tmp:
+        # lo leído del CSV vuelve con tipos inferidos (claves con nulos como float)
+        apply_dtype_policy(pd.concat(parts, ignore_index=True)).to_csv(tmp, index=False)
+    print(f" -> Tabla '{out_path.name}': {len(df)} filas actualizadas/anexadas.")
+    return replaced
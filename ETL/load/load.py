@@ -1,24 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pandas as pd  # solo para tipado; no es obligatorio
 
-def load_data_to_dw(transformed_data: dict[str, pd.DataFrame], dw_dir: str = "DW") -> None:
+from ETL.load.formats import write_table
+from ETL.instrumentation import RunReport, measured
+
+def load_data_to_dw(transformed_data: dict[str, pd.DataFrame], dw_dir: str = "DW",
+                    fmt: str = "csv", report: RunReport | None = None,
+                    max_workers: int | None = None, compression: str | None = None) -> None:
     """
     Guarda cada DataFrame del diccionario 'transformed_data' en la carpeta DW,
-    usando como nombre de archivo la clave del diccionario + '.csv'.
+    usando como nombre de archivo la clave del diccionario + la extensión del
+    formato elegido ('csv', 'parquet' o 'feather'; '.gz' si se comprime).
+    Las tablas se escriben en paralelo y cada una aparece recién completa.
     """
     print("\n--- 🚚 Iniciando carga a DW ---")
-    dw_path = Path(dw_dir)
-    dw_path.mkdir(exist_ok=True)
+    Path(dw_dir).mkdir(exist_ok=True)
 
-    for table_name, df in transformed_data.items():
-        out_path = dw_path / f"{table_name}.csv"
-        df.to_csv(out_path, index=False)
+    def write(table_name, df):
+        out_path = measured(report, table_name, "load", write_table, df, table_name, dw_dir, fmt, compression,
+                            inputs=df)
         print(f" -> Tabla '{out_path.name}' guardada.")
 
+    # la compresión, Parquet/Feather y la E/S liberan el GIL; los threads se solapan
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(write, name, df) for name, df in transformed_data.items()]
+        for f in futures:
+            f.result()
+
     print("--- ✅ Carga completada ---\n")
 
-def save_one_big_table(df, output_dir):
-    out = Path(output_dir) / "one_big_table.csv"
-    out.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out, index=False, encoding="utf-8")
-    print("-> Tabla 'one_big_table.csv' guardada.")
+def save_one_big_table(df, output_dir, fmt: str = "csv", report: RunReport | None = None,
+                       compression: str | None = None):
+    load_data_to_dw({"one_big_table": df}, output_dir, fmt, report, compression=compression)
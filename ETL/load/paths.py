@@ -0,0 +1,20 @@
+# ETL/load/paths.py
+"""
+Rutas de las tablas del DW. No depende de pandas: lo usan también el cache
+de build y el plan (--plan), que no leen ni escriben tablas.
+"""
+from pathlib import Path
+
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+# compresión -> sufijo que agrega al CSV
+COMPRESSIONS = {"gzip": ".gz"}
+
+
+def table_path(table_name: str, dw_dir: str = "DW", fmt: str = "csv",
+               compression: str | None = None) -> Path:
+    """Ruta del archivo (no particionado) de una tabla del DW."""
+    ext = FORMATS[fmt]
+    if fmt == "csv" and compression is not None:
+        ext += COMPRESSIONS[compression]
+    return Path(dw_dir) / f"{table_name}{ext}"
@@ -0,0 +1,194 @@
+# ETL/load/sqlite_dw.py
+"""
+Carga del DW en una base SQLite local (DW/warehouse.sqlite).
+
+Cada tabla se crea con tipos declarados (las columnas *_id, *_sk y *_bk
+como INTEGER aunque en pandas sean float por los nulos) y clave primaria.
+Las filas se insertan en lotes dentro de una transacción por tabla con
+'INSERT ... ON CONFLICT DO UPDATE', así que la misma rutina sirve para la
+carga completa y para los upserts incrementales. Los índices sobre las
+claves de join se crean después de la carga masiva.
+"""
+from pathlib import Path
+import sqlite3
+import pandas as pd
+
+from ETL.extract.schema import DATETIME_FMT
+from ETL.instrumentation import RunReport, measured
+
+SQLITE_FILE = "warehouse.sqlite"
+BATCH_SIZE = 50_000
+
+# tabla -> clave primaria (clave de upsert). Las tablas sin clave se reemplazan.
+PRIMARY_KEYS = {
+    "dim_channel": "channel_id",
+    "dim_customer": "customer_sk",
+    "dim_product": "product_sk",
+    "dim_store": "store_sk",
+    "dim_address": "address_sk",
+    "dim_calendar": "date_sk",
+    "fact_sales_order": "order_id",
+    "fact_sales_order_item": "order_item_id",
+    "fact_payment": "payment_id",
+    "fact_shipment": "shipment_id",
+    "fact_nps_response": "nps_id",
+    "fact_web_session": "session_id",
+    "fact_order_snapshot": "order_id",
+    "customer_snapshot": "customer_id",
+    "one_big_table": "order_item_id",
+}
+
+# Columnas que se indexan en cualquier tabla que las tenga (salvo la clave primaria)
+INDEX_COLUMNS = [
+    "order_id", "customer_id", "product_id", "order_date_id",
+    "paid_date_id", "shipped_date_id", "delivered_date_id", "responded_date_id",
+    "started_date_id", "ended_date_id", "first_paid_date_id",
+    "customer_bk", "product_bk", "store_id", "store_bk", "address_bk",
+    "store_address_id", "billing_address_id", "shipping_address_id",
+]
+
+_KEY_SUFFIXES = ("_id", "_sk", "_bk")
+
+
+def _sql_type(col: str, s: pd.Series) -> str:
+    if col.endswith(_KEY_SUFFIXES) or pd.api.types.is_integer_dtype(s) or pd.api.types.is_bool_dtype(s):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(s):
+        return "REAL"
+    return "TEXT"
+
+
+def _column_values(s: pd.Series) -> list:
+    """Valores de una columna como tipos de Python que sqlite3 sabe enlazar."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.dt.strftime(DATETIME_FMT).astype(object).where(s.notna(), None).tolist()
+    if s.dtype == object or isinstance(s.dtype, pd.api.extensions.ExtensionDtype):
+        return s.astype(object).where(s.notna(), None).tolist()
+    # numpy: tolist() devuelve int/float de Python; los NaN se guardan como NULL
+    return s.to_numpy().tolist()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def connect(db_path: str | Path) -> sqlite3.Connection:
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    # isolation_level=None: las transacciones se abren explícitamente (BEGIN),
+    # así también el DROP/CREATE de una recarga queda dentro de la transacción
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def has_table(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    ).fetchone() is not None
+
+
+def _create_table(conn: sqlite3.Connection, table: str, df: pd.DataFrame, key: str | None) -> None:
+    cols = [f"{_quote(c)} {_sql_type(c, df[c])}" for c in df.columns]
+    if key is not None and key in df.columns:
+        cols.append(f"PRIMARY KEY ({_quote(key)})")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({', '.join(cols)})")
+
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> None:
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")}
+    for c in df.columns:
+        if c not in existing:
+            conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(c)} {_sql_type(c, df[c])}")
+
+
+def _create_indexes(conn: sqlite3.Connection, table: str, columns, key: str | None) -> None:
+    for c in INDEX_COLUMNS:
+        if c in columns and c != key:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_{c}')} ON {_quote(table)} ({_quote(c)})"
+            )
+
+
+def load_frames_to_sqlite(conn: sqlite3.Connection, table: str, frames, mode: str = "replace",
+                          batch_size: int = BATCH_SIZE) -> int:
+    """
+    Carga en 'table' los DataFrames de 'frames' (uno o un iterable de chunks)
+    en una sola transacción. mode='replace' recrea la tabla; 'upsert' inserta
+    o actualiza por clave primaria. Devuelve la cantidad de filas cargadas.
+    """
+    if mode not in {"replace", "upsert"}:
+        raise ValueError(f"Modo desconocido: '{mode}'. Opciones: ['replace', 'upsert']")
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+
+    key = PRIMARY_KEYS.get(table)
+    if key is None:
+        mode = "replace"  # sin clave no hay upsert posible
+
+    rows = 0
+    columns = None
+    conn.execute("BEGIN")
+    try:
+        for df in frames:
+            if columns is None:
+                columns = list(df.columns)
+                if mode == "replace":
+                    conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+                _create_table(conn, table, df, key if key in df.columns else None)
+                _add_missing_columns(conn, table, df)
+
+                col_sql = ", ".join(_quote(c) for c in columns)
+                params = ", ".join("?" * len(columns))
+                sql = f"INSERT INTO {_quote(table)} ({col_sql}) VALUES ({params})"
+                if key in columns:
+                    updates = ", ".join(f"{_quote(c)}=excluded.{_quote(c)}" for c in columns if c != key)
+                    sql += f" ON CONFLICT({_quote(key)}) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING")
+
+            for start in range(0, len(df), batch_size):
+                batch = df.iloc[start:start + batch_size]
+                conn.executemany(sql, zip(*[_column_values(batch[c]) for c in columns]))
+            rows += len(df)
+
+        if columns is not None:
+            # Índices después de la carga masiva
+            _create_indexes(conn, table, columns, key)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return rows
+
+
+def load_data_to_sqlite(transformed_data: dict[str, pd.DataFrame], db_path: str | Path,
+                        mode: str = "replace", report: RunReport | None = None) -> None:
+    """
+    Carga cada DataFrame de 'transformed_data' en la base SQLite 'db_path'.
+    """
+    if not transformed_data:
+        return
+    print("\n--- 🗄️ Iniciando carga a SQLite ---")
+    conn = connect(db_path)
+    try:
+        for table_name, df in transformed_data.items():
+            rows = measured(report, table_name, "sqlite", load_frames_to_sqlite, conn, table_name, df, mode,
+                            inputs=df)
+            print(f" -> Tabla '{table_name}' cargada en '{Path(db_path).name}' ({rows} filas).")
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    print("--- ✅ Carga a SQLite completada ---\n")
+
+
+def load_csv_to_sqlite(csv_path: str | Path, table: str, db_path: str | Path,
+                       chunksize: int = BATCH_SIZE, report: RunReport | None = None) -> None:
+    """
+    Carga un CSV del DW en SQLite leyéndolo por chunks (memoria acotada).
+    """
+    conn = connect(db_path)
+    try:
+        rows = measured(report, table, "sqlite", load_frames_to_sqlite, conn, table,
+                        pd.read_csv(csv_path, chunksize=chunksize))
+    finally:
+        conn.close()
+    print(f" -> Tabla '{table}' cargada en '{Path(db_path).name}' ({rows} filas).")
@@ -1,36 +1,368 @@
-# ETL/pipeline.py  (fragmento)
-from ETL.extract.extract import extract_raw_data
-from ETL.transform import transform_dimensions, transform_facts
-from ETL.load.load import load_data_to_dw, save_one_big_table
-from ETL.transform.build_obt import build_one_big_table  # <-- nuevo
+# ETL/pipeline.py
+from ETL.executor import RAW_PREFIX, REF_PREFIX, input_node, is_input, run_node, run_stages
+from ETL.cache import BuildCache
+from ETL.instrumentation import RunReport, measured
+from ETL.sharding import SHARDED_STAGES, SHARDED_TABLES, run_sharded, stage_inputs
+from ETL.streaming import STREAMING_FACTS, stream_fact_to_dw
+from ETL.extract.extract import extract_raw_table
+from ETL.transform import (
+    CALENDAR_SOURCES, CUSTOMER_SNAPSHOT_COLUMNS, DIMENSIONS, FACTS, OBT, ROLLUPS, SNAPSHOT_COLUMNS,
+)
+from ETL.transform.date_keys import date_range, raw_date_range
+from ETL.transform.build_dim_calendar import extend_calendar
+from ETL.transform.dtypes import apply_dtype_policy
+from ETL.transform.build_rollups import refresh_rollup
+from ETL.transform.build_fact_order_snapshot import PARTS as SNAPSHOT_PARTS, OrderSnapshot
+from ETL.transform.build_customer_snapshot import (
+    CustomerState, customer_snapshot, cutoff_date_id, merge_state, order_state, snapshot_stamp,
+)
+from ETL.transform.surrogate_keys import SurrogateKeyRegistry
+from ETL.load.load import load_data_to_dw
+from ETL.load.sqlite_dw import SQLITE_FILE, connect, has_table, load_data_to_sqlite, load_csv_to_sqlite
+from ETL.load.formats import iter_dw_table, read_dw_table, table_path, write_table
+from ETL.validation import QUARANTINE_TABLE, Quarantine
+from ETL.validation_rules import RULES, referenced_tables
+from ETL.load.incremental import (
+    WATERMARKS, dw_csv_path, dw_keys, read_watermarks, write_watermarks, filter_new_rows, upsert_to_dw,
+)
 
 RAW_DIR = "raw"
 DW_DIR  = "DW"
+KEYS_DIR = f"{DW_DIR}/_keys"
+SQLITE_PATH = f"{DW_DIR}/{SQLITE_FILE}"
+ORDER_SNAPSHOT = "fact_order_snapshot"
+CUSTOMER_SNAPSHOT = "customer_snapshot"
+CUSTOMER_STATE_DIR = f"{DW_DIR}/_customer_state"
+CALENDAR = "dim_calendar"
 
-def run_dimensions():
-    raw = extract_raw_data(RAW_DIR)
-    dims = transform_dimensions(raw)
-    load_data_to_dw(dims, DW_DIR)
+def _pick(results, names):
+    # con cache, las tablas al día no vienen en 'results' y no se reescriben
+    return {n: results[n] for n in names if n in results}
+
+def _cache(fmt, force, validate=False, compression=None):
+    return None if force else BuildCache(DW_DIR, RAW_DIR, fmt, validate, compression)
+
+def _save_quarantine(quarantine, fmt, report, replace=True, compression=None, loaded=None):
+    # filas rechazadas por la validación, con sus motivos
+    if quarantine is None or not quarantine.tables:
+        return
+    try:
+        previous = read_dw_table(QUARANTINE_TABLE, DW_DIR, fmt=fmt)
+    except FileNotFoundError:
+        previous = None
+    table = quarantine.merge_into(previous, replace, loaded)
+    measured(report, QUARANTINE_TABLE, "load", write_table, table, QUARANTINE_TABLE, DW_DIR, fmt, compression,
+             inputs=table)
+    print(f" -> Tabla '{QUARANTINE_TABLE}' guardada ({len(table)} filas).")
+
+def _commit(cache, written):
+    if cache is not None:
+        cache.record(written)
+        cache.save()
+
+def _add_dw_chunks(snapshot, fact, chunksize):
+    for chunk in iter_dw_table(fact, DW_DIR, SNAPSHOT_COLUMNS[fact], chunksize):
+        snapshot.add(fact, chunk)
+
+def _order_snapshot_from_dw(report, max_workers=None, compression=None, chunksize=100_000):
+    # en streaming e incremental los hechos no quedan en memoria: el snapshot se
+    # arma desde el DW con las órdenes y los otros hechos de a chunks, leyendo
+    # solo las columnas que usa
+    orders = measured(report, "fact_sales_order", "dw_read", read_dw_table, "fact_sales_order", DW_DIR,
+                      SNAPSHOT_COLUMNS["fact_sales_order"], fmt="csv")
+    snapshot = OrderSnapshot(orders)
+    for fact in SNAPSHOT_PARTS:
+        measured(report, fact, "dw_read", _add_dw_chunks, snapshot, fact, chunksize)
+    table = {ORDER_SNAPSHOT: apply_dtype_policy(measured(report, ORDER_SNAPSHOT, "fact", snapshot.finish))}
+    load_data_to_dw(table, DW_DIR, "csv", report, max_workers, compression)
+    return table
+
+def _extend_calendar(full, report):
+    # el calendario tiene que cubrir las fechas nuevas: las tablas ya leídas dan
+    # su rango y el resto se lee solo por sus columnas de fecha. Es chico, así
+    # que si el rango creció se rearma entero
+    try:
+        current = read_dw_table(CALENDAR, DW_DIR, ["date_sk"], fmt="csv")["date_sk"]
+    except FileNotFoundError:
+        return {}
+    ranges = [date_range([(full[t], cols)]) if t in full else raw_date_range(RAW_DIR, t, cols)
+              for t, cols in CALENDAR_SOURCES.items()]
+    cal = measured(report, CALENDAR, "dimension", extend_calendar, current, ranges)
+    if cal is None:
+        return {}
+    table = {CALENDAR: apply_dtype_policy(cal)}
+    load_data_to_dw(table, DW_DIR, "csv", report)
+    return table
+
+def _customer_snapshot_incremental(results, replaced, report):
+    # el estado guardado se actualiza con las órdenes y respuestas nuevas; se
+    # rearma desde el DW solo si falta, no corresponde al snapshot del DW o se
+    # reemplazaron filas ya sumadas
+    store = CustomerState(CUSTOMER_STATE_DIR)
+    saved = store.load()
+    try:
+        current = snapshot_stamp(read_dw_table(CUSTOMER_SNAPSHOT, DW_DIR, ["as_of_date_id", "frequency", "monetary"],
+                                               fmt="csv"))
+    except FileNotFoundError:
+        current = None
+    delta = {t: results[t][cols] if t in results else None for t, cols in CUSTOMER_SNAPSHOT_COLUMNS.items()}
+
+    if saved is not None and saved[1] == current and not replaced:
+        state, stamp = saved
+        cutoffs = [stamp["as_of_date_id"], cutoff_date_id(delta["fact_sales_order"])]
+        as_of = max((c for c in cutoffs if c is not None), default=None)
+        new = measured(report, CUSTOMER_SNAPSHOT, "fact", order_state,
+                       delta["fact_sales_order"], delta["fact_nps_response"], as_of)
+        state = merge_state(state, new, as_of)
+    else:
+        print(f" -> {CUSTOMER_SNAPSHOT}: estado incremental ausente o desactualizado, se rearma desde el DW.")
+        facts = {t: measured(report, t, "dw_read", read_dw_table, t, DW_DIR, cols, fmt="csv")
+                 for t, cols in CUSTOMER_SNAPSHOT_COLUMNS.items()}
+        as_of = cutoff_date_id(facts["fact_sales_order"])
+        state = measured(report, CUSTOMER_SNAPSHOT, "fact", order_state,
+                         facts["fact_sales_order"], facts["fact_nps_response"], as_of)
+
+    try:
+        customers = read_dw_table("dim_customer", DW_DIR, ["customer_bk"], fmt="csv")["customer_bk"]
+    except FileNotFoundError:
+        customers = None
+    keys = SurrogateKeyRegistry(KEYS_DIR)
+    snapshot = {CUSTOMER_SNAPSHOT: apply_dtype_policy(customer_snapshot(state, customers, as_of, keys))}
+    load_data_to_dw(snapshot, DW_DIR, "csv", report)
+    store.save(state, snapshot_stamp(snapshot[CUSTOMER_SNAPSHOT]))
+    return snapshot
+
+def _run_all_sharded(shards, max_workers, keys, report, quarantine):
+    # dimensiones, hechos que no son por orden y validación en este proceso;
+    # hechos por orden y OBT repartidos en 'shards' procesos; rollups al final
+    raw, _ = stage_inputs()
+    inputs = [input_node(t, quarantine is not None) for t in [*SHARDED_TABLES, *raw]]
+    local = [n for n in [*DIMENSIONS, *FACTS] if n not in SHARDED_STAGES and n != CUSTOMER_SNAPSHOT]
+    results = run_stages([*local, *inputs], RAW_DIR, max_workers, keys=keys, report=report,
+                         quarantine=quarantine)
+    results.update(measured(report, f"shards[{shards}]", "shards", run_sharded, results, shards, None, report))
+    # customer_snapshot necesita todas las órdenes: se arma al juntar los shards
+    results[CUSTOMER_SNAPSHOT] = measured(report, CUSTOMER_SNAPSHOT, "fact", run_node, CUSTOMER_SNAPSHOT, results,
+                                          RAW_DIR, keys, inputs={d: results[d] for d in FACTS[CUSTOMER_SNAPSHOT][2]})
+    for name in ROLLUPS:
+        results[name] = measured(report, name, "rollup", run_node, name, results, RAW_DIR,
+                                 inputs=results["one_big_table"])
+    return {n: df for n, df in results.items() if not is_input(n)}
+
+def _to_sqlite(tables, names, fmt, report, mode="replace"):
+    # las tablas omitidas por el cache se cargan desde el DW solo si faltan en la base
+    conn = connect(SQLITE_PATH)
+    try:
+        missing = [n for n in names if n not in tables and not has_table(conn, n)]
+    finally:
+        conn.close()
+    tables = {**tables, **{n: read_dw_table(n, DW_DIR, fmt=fmt) for n in missing}}
+    load_data_to_sqlite(tables, SQLITE_PATH, mode, report)
+
+def run_dimensions(max_workers=None, fmt="csv", force=False, profile=None, sqlite=False, validate=True,
+                   compression=None):
+    report = RunReport("dims", DW_DIR, profile)
+    keys = SurrogateKeyRegistry(KEYS_DIR)
+    quarantine = Quarantine() if validate else None
+    cache = _cache(fmt, force, validate, compression)
+    results = run_stages(list(DIMENSIONS), RAW_DIR, max_workers, keys=keys, cache=cache, report=report,
+                         quarantine=quarantine)
+    dims = _pick(results, DIMENSIONS)
+    load_data_to_dw(dims, DW_DIR, fmt, report, max_workers, compression)
+    keys.save()
+    _save_quarantine(quarantine, fmt, report, compression=compression)
+    _commit(cache, dims)
+    if sqlite:
+        _to_sqlite(dims, DIMENSIONS, fmt, report)
     print("✅ Dimensiones generadas.")
+    report.write()
+
+def run_facts(max_workers=None, fmt="csv", chunksize=None, force=False, profile=None, sqlite=False,
+              validate=True, compression=None):
+    report = RunReport("facts", DW_DIR, profile)
+    # los hechos solo leen el registro (lo dan de alta las dimensiones): no se guarda
+    keys = SurrogateKeyRegistry(KEYS_DIR)
+    quarantine = Quarantine() if validate else None
+    if chunksize is None:
+        cache = _cache(fmt, force, validate, compression)
+        results = run_stages(list(FACTS), RAW_DIR, max_workers, keys=keys, cache=cache, report=report,
+                             quarantine=quarantine)
+        facts = _pick(results, FACTS)
+        load_data_to_dw(facts, DW_DIR, fmt, report, max_workers, compression)
+        _save_quarantine(quarantine, fmt, report, compression=compression)
+        _commit(cache, facts)
+        if sqlite:
+            _to_sqlite(facts, FACTS, fmt, report)
+        print("✅ Hechos generados.")
+        report.write()
+        return
 
-def run_facts():
-    raw = extract_raw_data(RAW_DIR)
-    dims = transform_dimensions(raw)
-    facts = transform_facts(raw, dims)
-    load_data_to_dw(facts, DW_DIR)
+    # Streaming: los hechos grandes se escriben chunk a chunk, sin quedar en memoria
+    if fmt != "csv":
+        raise ValueError("El modo streaming solo está disponible para el formato CSV.")
+    in_memory = [f for f in FACTS if f not in STREAMING_FACTS and f != ORDER_SNAPSHOT]
+    # las claves de las tablas validadas (órdenes) salen de su versión validada
+    validated = sorted({REF_PREFIX + r for source, _ in STREAMING_FACTS.values()
+                        for r in referenced_tables(source) if r in RULES}) if validate else []
+    results = run_stages([*in_memory, *validated], RAW_DIR, max_workers, keys=keys, report=report,
+                         quarantine=quarantine)
+    load_data_to_dw(_pick(results, in_memory), DW_DIR, fmt, report, max_workers, compression)
+    refs = {n[len(REF_PREFIX):]: results[n] for n in validated}
+    for fact in STREAMING_FACTS:
+        measured(report, fact, "stream", stream_fact_to_dw, fact, RAW_DIR, DW_DIR, chunksize, quarantine,
+                 compression, refs)
+    snapshot = _order_snapshot_from_dw(report, max_workers, compression, chunksize)
+    _save_quarantine(quarantine, fmt, report, compression=compression)
+    if sqlite:
+        load_data_to_sqlite({**_pick(results, in_memory), **snapshot}, SQLITE_PATH, report=report)
+        for fact in STREAMING_FACTS:
+            load_csv_to_sqlite(table_path(fact, DW_DIR, fmt, compression), fact, SQLITE_PATH, chunksize, report)
     print("✅ Hechos generados.")
+    report.write()
 
 
-def run_obt():
-    raw = extract_raw_data(RAW_DIR)
-    dims = transform_dimensions(raw)
-    facts = transform_facts(raw, dims)
-    obt = build_one_big_table(raw, dims, facts)
-    save_one_big_table(obt, DW_DIR)
+def run_obt(max_workers=None, fmt="csv", force=False, profile=None, sqlite=False, validate=True,
+            compression=None):
+    report = RunReport("obt", DW_DIR, profile)
+    quarantine = Quarantine() if validate else None
+    cache = _cache(fmt, force, validate, compression)
+    results = run_stages([*OBT, *ROLLUPS], RAW_DIR, max_workers, cache=cache, report=report,
+                         quarantine=quarantine)
+    # la OBT y los rollups se escriben juntos, en paralelo
+    rollups = _pick(results, ROLLUPS)
+    load_data_to_dw({**_pick(results, OBT), **rollups}, DW_DIR, fmt, report, max_workers, compression)
+    print("✅ One Big Table generada.")
+    print("✅ Rollups generados.")
+    _save_quarantine(quarantine, fmt, report, compression=compression)
+    _commit(cache, [*_pick(results, OBT), *rollups])
+    if sqlite:
+        _to_sqlite({**_pick(results, OBT), **rollups}, [*OBT, *ROLLUPS], fmt, report)
+    report.write()
+
+def run_all(max_workers=None, fmt="csv", force=False, profile=None, sqlite=False, validate=True,
+            compression=None, shards=None):
+    # Un solo grafo: cada raw se parsea y cada dimensión se construye una única vez
+    report = RunReport("all", DW_DIR, profile)
+    keys = SurrogateKeyRegistry(KEYS_DIR)
+    quarantine = Quarantine() if validate else None
+    if shards:
+        # en procesos no hay cache de build: se recalcula todo
+        cache = None
+        results = _run_all_sharded(shards, max_workers, keys, report, quarantine)
+    else:
+        cache = _cache(fmt, force, validate, compression)
+        results = run_stages([*DIMENSIONS, *FACTS, *OBT, *ROLLUPS], RAW_DIR, max_workers,
+                             keys=keys, cache=cache, report=report, quarantine=quarantine)
+    dims = _pick(results, DIMENSIONS)
+    facts = _pick(results, FACTS)
+    rollups = _pick(results, ROLLUPS)
+    # todas las tablas en una sola carga: se escriben en paralelo
+    load_data_to_dw({**dims, **facts, **_pick(results, OBT), **rollups}, DW_DIR, fmt, report,
+                    max_workers, compression)
+    keys.save()
+    print("✅ Dimensiones generadas.")
+    print("✅ Hechos generados.")
     print("✅ One Big Table generada.")
+    print("✅ Rollups generados.")
+    _save_quarantine(quarantine, fmt, report, compression=compression)
+    _commit(cache, [*dims, *facts, *_pick(results, OBT), *rollups])
+    if sqlite:
+        _to_sqlite({**dims, **facts, **_pick(results, OBT), **rollups},
+                   [*DIMENSIONS, *FACTS, *OBT, *ROLLUPS], fmt, report)
+    report.write()
+
+def run_tables(tables, max_workers=None, fmt="csv", force=False, profile=None, sqlite=False, validate=True,
+               compression=None):
+    # Solo las tablas pedidas: sus dependencias se construyen (o se leen del DW) pero no se reescriben
+    report = RunReport("tables", DW_DIR, profile)
+    keys = SurrogateKeyRegistry(KEYS_DIR)
+    quarantine = Quarantine() if validate else None
+    cache = _cache(fmt, force, validate, compression)
+    results = run_stages(list(tables), RAW_DIR, max_workers, keys=keys, cache=cache, report=report,
+                         quarantine=quarantine)
+    built = _pick(results, tables)
+    load_data_to_dw(built, DW_DIR, fmt, report, max_workers, compression)
+    keys.save()
+    print(f"✅ Tablas generadas: {', '.join(built) or 'ninguna (todas al día)'}.")
+    _save_quarantine(quarantine, fmt, report, compression=compression)
+    _commit(cache, built)
+    if sqlite:
+        _to_sqlite(built, list(tables), fmt, report)
+    report.write()
+
+def run_rollups(months, fmt="csv", profile=None, sqlite=False, compression=None):
+    # Refresca solo los meses indicados, leyendo de la OBT únicamente esas particiones
+    report = RunReport("rollups", DW_DIR, profile)
+    obt = measured(report, "one_big_table", "dw_read", read_dw_table,
+                   "one_big_table", DW_DIR, partitions=months, fmt=fmt)
+    rollups = {}
+    for name in ROLLUPS:
+        try:
+            previous = read_dw_table(name, DW_DIR, fmt=fmt)
+        except FileNotFoundError:
+            previous = None
+        rollups[name] = measured(report, name, "rollup", refresh_rollup, previous, obt, name, months,
+                                 inputs={"previous": previous, "one_big_table": obt})
+    load_data_to_dw(rollups, DW_DIR, fmt, report, compression=compression)
+    if sqlite:
+        load_data_to_sqlite(rollups, SQLITE_PATH, report=report)
+    print(f"✅ Rollups actualizados para {', '.join(months)}.")
+    report.write()
+
+def run_incremental(max_workers=None, fmt="csv", profile=None, sqlite=False, validate=True):
+    # Solo transforma las filas raw posteriores a la marca de agua de cada hecho
+    # o que todavía no están en el DW
+    if fmt != "csv":
+        raise ValueError("La carga incremental solo está disponible para el formato CSV.")
+    # antes de leer o escribir nada: las tablas que se tocan tienen que estar en CSV sin comprimir
+    for table in [*WATERMARKS, ORDER_SNAPSHOT, CALENDAR, CUSTOMER_SNAPSHOT, QUARANTINE_TABLE]:
+        dw_csv_path(table, DW_DIR)
+    report = RunReport("incremental", DW_DIR, profile)
+    marks = read_watermarks(DW_DIR)
+    quarantine = Quarantine() if validate else None
+    full = {}
+    deltas = {}
+    new_marks = dict(marks)
+    for fact, (source, cols, key) in WATERMARKS.items():
+        df = measured(report, RAW_PREFIX + source, "extract", extract_raw_table, RAW_DIR, source)
+        if df is None:
+            continue
+        full[source] = df
+        deltas[source], new_marks[fact] = filter_new_rows(df, cols, marks.get(fact), key,
+                                                          dw_keys(fact, key, DW_DIR))
+        print(f" -> {fact}: {len(deltas[source])} filas nuevas.")
+
+    # primero se validan los deltas: las claves foráneas a órdenes contra las ya
+    # cargadas en el DW más las válidas del delta, no contra raw (una orden en
+    # cuarentena arrastra a sus ítems, pagos y envíos); las demás referencias
+    # se leen de raw
+    refs = {"sales_order": dw_keys("fact_sales_order", "order_id", DW_DIR).to_frame(name="order_id")}
+    sources = {input_node(source, validate): source for source in deltas if not deltas[source].empty}
+    checked = run_stages(list(sources), RAW_DIR, max_workers, raw=deltas, report=report,
+                         quarantine=quarantine, refs=refs)
+    valid = {source: checked[node] for node, source in sources.items()}
 
-def run_all():
-    run_dimensions()
-    run_facts()
-    run_obt()
+    # sin filas nuevas válidas no hay nada que transformar (y algunos builders no
+    # aceptan tablas vacías)
+    targets = [f for f, (source, _, _) in WATERMARKS.items() if source in valid and not valid[source].empty]
+    results = run_stages(targets, RAW_DIR, max_workers, raw=valid, report=report)
 
+    print("\n--- 🚚 Iniciando carga incremental a DW ---")
+    replaced = {}
+    for fact in targets:
+        replaced[fact] = measured(report, fact, "load", upsert_to_dw, results[fact], fact, WATERMARKS[fact][2],
+                                  DW_DIR, inputs=results[fact])
+    rebuilt = _extend_calendar(full, report)
+    if targets:
+        rebuilt.update(_order_snapshot_from_dw(report, max_workers))
+        rebuilt.update(_customer_snapshot_incremental(
+            results, any(replaced.get(t) for t in CUSTOMER_SNAPSHOT_COLUMNS), report))
+    if sqlite:
+        # en la base, las filas nuevas se insertan o actualizan por clave primaria
+        load_data_to_sqlite({**_pick(results, targets), **rebuilt}, SQLITE_PATH, mode="upsert", report=report)
+    # las filas que ahora entraron al DW dejan la cuarentena
+    loaded = {WATERMARKS[f][0]: results[f][WATERMARKS[f][2]] for f in targets}
+    _save_quarantine(quarantine, fmt, report, replace=False, loaded=loaded)
+    write_watermarks(new_marks, DW_DIR)
+    print("✅ Hechos incrementales cargados.")
+    report.write()
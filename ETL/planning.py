@@ -0,0 +1,190 @@
+# ETL/planning.py
+"""
+Grafo de etapas y plan de ejecución, sin dependencias pesadas.
+
+Resuelve qué nodos (tablas raw, validaciones, builders) hacen falta para
+unas tablas objetivo y, con el cache de build, cuáles se omiten o se leen
+del DW. Ni este módulo ni el registro de ETL/transform importan pandas ni
+los builders, así 'main.py --plan' responde sin cargarlos; el ejecutor
+(ETL/executor.py) usa las mismas funciones para correr el grafo.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ETL.transform import DATES_PREFIX, DIMENSIONS, FACTS, OBT, ROLLUPS
+from ETL.validation_rules import RULES, referenced_tables
+
+if TYPE_CHECKING:
+    from ETL.cache import BuildCache
+
+RAW_PREFIX = "raw:"
+VALID_PREFIX = "valid:"   # tabla raw ya validada (sin las filas en cuarentena)
+REF_PREFIX = "ref:"       # conjunto de claves de una tabla referenciada
+# DATES_PREFIX ("dates:"): primer y último día de una tabla raw (ETL/transform)
+
+STAGES = {**DIMENSIONS, **FACTS, **OBT, **ROLLUPS}
+
+
+def is_input(name: str) -> bool:
+    """True para los nodos de entrada (raw, validados, claves de referencia y rangos de fechas)."""
+    return name.startswith((RAW_PREFIX, VALID_PREFIX, REF_PREFIX, DATES_PREFIX))
+
+
+def input_node(table: str, validate: bool = False) -> str:
+    """Nodo por el que las etapas leen una tabla raw ('valid:' si se valida y tiene reglas)."""
+    return (VALID_PREFIX if validate and table in RULES else RAW_PREFIX) + table
+
+
+def resolve_stages(targets: list[str], validate: bool = False) -> dict[str, list[str]]:
+    """
+    Devuelve {nodo: dependencias} con todo lo necesario para construir 'targets'.
+    Las tablas raw aparecen como nodos 'raw:<tabla>'. Con 'validate', las
+    etapas consumen 'valid:<tabla>' para las tablas con reglas, que a su vez
+    dependen de la raw y de las claves 'ref:<tabla>' que referencian. Las
+    claves de una tabla con reglas salen de su versión validada (una orden en
+    cuarentena arrastra a sus ítems, pagos y envíos); las demás 'ref:<tabla>'
+    y las 'dates:<tabla>' leen su archivo raw por su cuenta (solo la clave o
+    las columnas de fecha), sin pasar por 'raw:'.
+    """
+    graph = {}
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name in graph:
+            continue
+        if name.startswith((RAW_PREFIX, DATES_PREFIX)):
+            graph[name] = []
+            continue
+        if name.startswith(REF_PREFIX):
+            table = name[len(REF_PREFIX):]
+            graph[name] = [VALID_PREFIX + table] if table in RULES else []
+        elif name.startswith(VALID_PREFIX):
+            table = name[len(VALID_PREFIX):]
+            graph[name] = [RAW_PREFIX + table] + [REF_PREFIX + r for r in referenced_tables(table)]
+        elif name not in STAGES:
+            raise ValueError(f"Etapa desconocida: '{name}'.")
+        else:
+            _, raw_tables, deps = STAGES[name]
+            graph[name] = [input_node(t, validate) for t in raw_tables] + list(deps)
+        stack.extend(graph[name])
+    return graph
+
+
+def plan_with_cache(graph: dict[str, list[str]], targets: list[str],
+                    cache: BuildCache) -> tuple[dict[str, list[str]], set[str], set[str]]:
+    """
+    Recorta el grafo usando el cache de build. Devuelve (grafo a ejecutar,
+    etapas que se leen del DW, objetivos que se saltean por estar al día).
+    """
+    cache.compute_keys({n: STAGES[n] for n in graph if not is_input(n)})
+
+    plan, loaded, skipped = {}, set(), set()
+
+    def visit(name):
+        if name in plan:
+            return
+        if not is_input(name) and cache.is_fresh(name):
+            plan[name] = []
+            loaded.add(name)
+            return
+        plan[name] = graph[name]
+        for dep in graph[name]:
+            visit(dep)
+
+    for name in targets:
+        if cache.is_fresh(name):
+            skipped.add(name)
+        else:
+            visit(name)
+    return plan, loaded, skipped
+
+
+def stage_kind(name: str) -> str:
+    if name.startswith((RAW_PREFIX, DATES_PREFIX)):
+        return "extract"
+    if name.startswith((VALID_PREFIX, REF_PREFIX)):
+        return "validate"
+    if name in DIMENSIONS:
+        return "dimension"
+    if name in FACTS:
+        return "fact"
+    if name in ROLLUPS:
+        return "rollup"
+    return "obt"
+
+
+# paso de main.py -> tablas objetivo
+STEP_TARGETS = {
+    "dims": list(DIMENSIONS),
+    "facts": list(FACTS),
+    "obt": [*OBT, *ROLLUPS],
+    "all": [*DIMENSIONS, *FACTS, *OBT, *ROLLUPS],
+}
+
+
+def execution_order(graph: dict[str, list[str]]) -> list[str]:
+    """Nodos de 'graph' en un orden válido de ejecución (por nivel, alfabético)."""
+    done, order = set(), []
+    pending = dict(graph)
+    while pending:
+        ready = sorted(n for n, deps in pending.items() if all(d in done or d not in graph for d in deps))
+        if not ready:
+            raise ValueError(f"Dependencias circulares entre etapas: {sorted(pending)}")
+        for name in ready:
+            del pending[name]
+        done.update(ready)
+        order += ready
+    return order
+
+
+def build_plan(targets: list[str], validate: bool = True, cache: BuildCache | None = None,
+               raw_dir: str = "raw") -> dict[str, list[str]]:
+    """
+    Qué haría una corrida para 'targets', sin ejecutar nada: archivos raw que
+    se leen (enteros o solo sus claves o fechas), tablas que se validan,
+    etapas que se construyen (en orden) y, con 'cache', las que se leen del
+    DW y los objetivos que se omiten. Los archivos que no están en 'raw_dir'
+    van aparte ('missing'): las etapas corren sin ellos.
+    """
+    graph = resolve_stages(targets, validate)
+    loaded, skipped = set(), set()
+    if cache is not None:
+        graph, loaded, skipped = plan_with_cache(graph, targets, cache)
+    order = execution_order(graph)
+
+    def tables(prefix):
+        return [n[len(prefix):] for n in order if n.startswith(prefix)]
+
+    read = {t for prefix in (RAW_PREFIX, REF_PREFIX, DATES_PREFIX) for t in tables(prefix)}
+    missing = {t for t in read if not (Path(raw_dir) / f"{t}.csv").exists()}
+    return {
+        "raw": [t for t in tables(RAW_PREFIX) if t not in missing],
+        "keys": [t for t in tables(REF_PREFIX) if t not in missing and not graph[REF_PREFIX + t]],
+        "dates": [t for t in tables(DATES_PREFIX) if t not in missing],
+        "validate": [t for t in tables(VALID_PREFIX) if t not in missing],
+        "missing": sorted(missing),
+        "build": [n for n in order if not is_input(n) and n not in loaded],
+        "from_dw": sorted(loaded),
+        "skip": sorted(skipped),
+    }
+
+
+def print_plan(targets: list[str], plan: dict[str, list[str]], raw_dir: str = "raw") -> None:
+    print(f"📋 Plan para: {', '.join(targets)}")
+    print(f" -> Archivos raw a leer: {', '.join(f'{raw_dir}/{t}.csv' for t in plan['raw']) or '-'}")
+    if plan["keys"]:
+        print(f" -> Solo claves (validación): {', '.join(f'{raw_dir}/{t}.csv' for t in plan['keys'])}")
+    if plan["dates"]:
+        print(f" -> Solo columnas de fecha (calendario): {', '.join(f'{raw_dir}/{t}.csv' for t in plan['dates'])}")
+    if plan["missing"]:
+        print(f" -> No existen (se sigue sin ellos): {', '.join(f'{raw_dir}/{t}.csv' for t in plan['missing'])}")
+    print(f" -> Tablas raw a validar: {', '.join(plan['validate']) or '-'}")
+    print(" -> Etapas a construir, en orden:" if plan["build"] else " -> Etapas a construir: -")
+    for i, name in enumerate(plan["build"], 1):
+        print(f"    {i:>2}. {name:<32} {stage_kind(name):<10} {STAGES[name][0]!r}")
+    if plan["from_dw"]:
+        print(f" -> Se leen del DW (sin cambios): {', '.join(plan['from_dw'])}")
+    if plan["skip"]:
+        print(f" -> Se omiten (al día): {', '.join(plan['skip'])}")
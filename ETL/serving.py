@@ -0,0 +1,347 @@
+# ETL/serving.py
+"""
+Capa de consultas sobre el DW para dashboards y consumidores ad-hoc.
+
+'Warehouse' lee cada tabla del DW una sola vez (con la política de tipos de
+ETL/transform/dtypes.py), arma índices sobre las columnas de filtro
+habituales (ordenados para las claves enteras, por valor para el texto) y
+responde agregados filtrados: se resuelven las filas con los índices y se
+agrupa solo ese subconjunto. Los resultados quedan en un cache LRU acotado
+que se vacía cuando el pipeline publica tablas nuevas (DW/_published.json).
+
+Uso:
+    wh = Warehouse("DW")
+    wh.sales_by_month(channel_id=1)
+    wh.nps_by_channel(20240101, 20240331)
+    wh.query("one_big_table", {"ventas": ("ventas_validas_line", "sum")},
+             group_by=["year_month"], filters={"channel_id": 1})
+
+También por HTTP (solo stdlib): python -m ETL.serving --port 8765
+    GET /sales_by_month?channel_id=1
+    GET /nps_by_channel?start=20240101&end=20240331
+    GET /query?table=one_big_table&measure=ventas:ventas_validas_line:sum
+              &group_by=year_month&channel_id=1&order_date_id=20240101..20240630
+"""
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import threading
+import numpy as np
+import pandas as pd
+
+from ETL.instrumentation import PUBLISH_MARKER
+from ETL.load.formats import read_dw_table
+from ETL.transform.dtypes import apply_dtype_policy
+
+CACHE_SIZE = 256
+
+# Columnas que se indexan en cada tabla que las tenga
+INDEX_COLUMNS = [
+    "order_date_id", "paid_date_id", "shipped_date_id", "delivered_date_id",
+    "responded_date_id", "started_date_id",
+    "channel_id", "store_id", "product_id", "customer_id",
+    "store_province_id", "billing_province_id", "shipping_province_id",
+    "store_province_name", "billing_province_name", "shipping_province_name",
+]
+
+
+def _nps(score: pd.Series) -> float:
+    """Net Promoter Score: % promotores (9-10) menos % detractores (0-6)."""
+    s = score.dropna()
+    if s.empty:
+        return float("nan")
+    return round(100 * ((s >= 9).mean() - (s <= 6).mean()), 2)
+
+
+# agregación -> función o nombre que entiende groupby.agg
+AGGREGATIONS = {
+    "sum": "sum", "mean": "mean", "min": "min", "max": "max",
+    "count": "count", "nunique": "nunique", "nps": _nps,
+}
+
+
+class SortedIndex:
+    """Posiciones ordenadas por valor: igualdad, listas y rangos con searchsorted."""
+    def __init__(self, s: pd.Series):
+        values = s.to_numpy(dtype="float64", na_value=np.nan)
+        valid = np.flatnonzero(~np.isnan(values))
+        order = valid[np.argsort(values[valid], kind="stable")]
+        self.order = order
+        self.values = values[order]
+
+    def _slice(self, lo, hi) -> np.ndarray:
+        start = np.searchsorted(self.values, lo, side="left") if lo is not None else 0
+        stop = np.searchsorted(self.values, hi, side="right") if hi is not None else len(self.values)
+        return self.order[start:stop]
+
+    def lookup(self, cond) -> np.ndarray:
+        if isinstance(cond, tuple):
+            return self._slice(*cond)
+        if isinstance(cond, list):
+            return np.concatenate([self._slice(v, v) for v in cond] or [np.empty(0, dtype=np.intp)])
+        return self._slice(cond, cond)
+
+
+class HashIndex:
+    """Posiciones por valor (texto/categorías): igualdad y listas."""
+    def __init__(self, s: pd.Series):
+        self.positions = {k: np.asarray(v) for k, v in s.groupby(s, observed=True, sort=False).indices.items()}
+
+    def lookup(self, cond) -> np.ndarray:
+        if isinstance(cond, tuple):
+            raise ValueError("Los rangos solo se pueden filtrar sobre columnas numéricas.")
+        values = cond if isinstance(cond, list) else [cond]
+        found = [self.positions[v] for v in values if v in self.positions]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+
+def _build_index(s: pd.Series):
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return SortedIndex(s)
+    return HashIndex(s)
+
+
+def _mask(s: pd.Series, cond) -> np.ndarray:
+    """Filtro sin índice (columnas no indexadas), sobre las filas candidatas."""
+    if isinstance(cond, tuple):
+        lo, hi = cond
+        m = s.notna()
+        if lo is not None:
+            m &= s >= lo
+        if hi is not None:
+            m &= s <= hi
+        return m.to_numpy(dtype=bool)
+    return s.isin(cond if isinstance(cond, list) else [cond]).to_numpy(dtype=bool)
+
+
+class Warehouse:
+    """
+    Tablas del DW en memoria con índices y cache de resultados. Es segura
+    entre threads (el servidor HTTP atiende cada pedido en un thread).
+    """
+    def __init__(self, dw_dir: str = "DW", fmt: str | None = None, cache_size: int = CACHE_SIZE):
+        self.dw_dir = Path(dw_dir)
+        self.fmt = fmt
+        self.cache_size = cache_size
+        self._tables: dict[str, pd.DataFrame] = {}
+        self._indexes: dict[str, dict] = {}
+        self._cache: OrderedDict = OrderedDict()
+        self._version = self._published()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- publicación / invalidación ----------
+    def _published(self):
+        marker = self.dw_dir / PUBLISH_MARKER
+        if not marker.exists():
+            return None
+        stat = marker.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> bool:
+        """
+        Si el pipeline publicó tablas nuevas desde la última consulta, descarta
+        tablas, índices y resultados cacheados. Devuelve True si hubo cambios.
+        """
+        version = self._published()
+        with self._lock:
+            if version == self._version:
+                return False
+            self._version = version
+            self._tables.clear()
+            self._indexes.clear()
+            self._cache.clear()
+        print(" -> DW republicado: se recargan las tablas.")
+        return True
+
+    # ---------- tablas e índices ----------
+    def table(self, name: str) -> pd.DataFrame:
+        with self._lock:
+            if name not in self._tables:
+                df = apply_dtype_policy(read_dw_table(name, str(self.dw_dir), fmt=self.fmt))
+                self._tables[name] = df
+                self._indexes[name] = {c: _build_index(df[c]) for c in INDEX_COLUMNS if c in df.columns}
+            return self._tables[name]
+
+    def _positions(self, name: str, filters: dict) -> np.ndarray:
+        """Filas de 'name' que cumplen 'filters' (índices primero, máscara después)."""
+        df = self.table(name)
+        indexes = self._indexes[name]
+        pos = None
+        for col, cond in filters.items():
+            if col in indexes:
+                found = np.sort(indexes[col].lookup(cond))
+                pos = found if pos is None else np.intersect1d(pos, found, assume_unique=True)
+        if pos is None:
+            pos = np.arange(len(df))
+        for col, cond in filters.items():
+            if col not in indexes:
+                if col not in df.columns:
+                    raise ValueError(f"La tabla '{name}' no tiene la columna '{col}'.")
+                pos = pos[_mask(df[col].take(pos), cond)]
+        return pos
+
+    # ---------- consultas ----------
+    def query(self, table: str, measures: dict[str, tuple[str, str]],
+              group_by: list[str] | None = None, filters: dict | None = None) -> pd.DataFrame:
+        """
+        Agrega 'table' filtrada. 'measures' es {nombre: (columna, agregación)}
+        con agregaciones de AGGREGATIONS; 'filters' es {columna: condición},
+        donde la condición es un valor, una lista de valores o un rango
+        (desde, hasta) inclusivo (None = abierto).
+        """
+        group_by = list(group_by or [])
+        filters = dict(filters or {})
+        for out, (col, agg) in measures.items():
+            if agg not in AGGREGATIONS:
+                raise ValueError(f"Agregación desconocida: '{agg}'. Opciones: {list(AGGREGATIONS)}")
+
+        self.refresh()
+        key = (table, tuple(sorted(measures.items())), tuple(group_by),
+               tuple(sorted((c, repr(v)) for c, v in filters.items())))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key].copy()
+            self.misses += 1
+
+        df = self.table(table)
+        pos = self._positions(table, filters)
+        needed = list(dict.fromkeys([*group_by, *[col for col, _ in measures.values()]]))
+        missing = [c for c in needed if c not in df.columns]
+        if missing:
+            raise ValueError(f"La tabla '{table}' no tiene las columnas {missing}.")
+        sub = df[needed].take(pos)
+
+        named = {out: (col, AGGREGATIONS[agg]) for out, (col, agg) in measures.items()}
+        if group_by:
+            result = sub.groupby(group_by, observed=True, sort=True, dropna=False).agg(**named).reset_index()
+        else:
+            result = pd.DataFrame([{out: sub[col].agg(fn) for out, (col, fn) in named.items()}])
+
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result.copy()
+
+    def sales_by_month(self, channel_id=None, store_id=None, product_id=None,
+                       start: int | None = None, end: int | None = None) -> pd.DataFrame:
+        """Ventas válidas, unidades y órdenes por mes desde la OBT."""
+        filters = {c: v for c, v in
+                   {"channel_id": channel_id, "store_id": store_id, "product_id": product_id}.items()
+                   if v is not None}
+        if start is not None or end is not None:
+            filters["order_date_id"] = (start, end)
+        return self.query("one_big_table", {
+            "ventas": ("ventas_validas_line", "sum"),
+            "unidades": ("quantity", "sum"),
+            "ordenes": ("order_id", "nunique"),
+        }, group_by=["year_month"], filters=filters)
+
+    def nps_by_channel(self, start: int | None = None, end: int | None = None) -> pd.DataFrame:
+        """NPS y cantidad de respuestas por canal en un rango de fechas (AAAAMMDD)."""
+        filters = {"responded_date_id": (start, end)} if start is not None or end is not None else {}
+        return self.query("fact_nps_response", {
+            "nps": ("score", "nps"),
+            "respuestas": ("nps_id", "count"),
+        }, group_by=["channel_id"], filters=filters)
+
+
+# ---------- HTTP ----------
+_RESERVED = {"table", "measure", "group_by"}
+
+
+def _parse_value(text: str):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _parse_filter(text: str):
+    """'a..b' -> rango (a, b), 'a,b' -> lista, 'a' -> valor."""
+    if ".." in text:
+        lo, hi = text.split("..", 1)
+        return (_parse_value(lo) if lo else None, _parse_value(hi) if hi else None)
+    if "," in text:
+        return [_parse_value(v) for v in text.split(",")]
+    return _parse_value(text)
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def make_handler(warehouse: Warehouse):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                if url.path == "/health":
+                    body = {"tables": sorted(warehouse._tables), "hits": warehouse.hits,
+                            "misses": warehouse.misses}
+                elif url.path == "/sales_by_month":
+                    body = _records(warehouse.sales_by_month(**{k: _parse_value(v) for k, v in params.items()}))
+                elif url.path == "/nps_by_channel":
+                    body = _records(warehouse.nps_by_channel(**{k: _parse_value(v) for k, v in params.items()}))
+                elif url.path == "/query":
+                    measures = {}
+                    for spec in parse_qs(url.query).get("measure", []):
+                        out, col, agg = spec.split(":")
+                        measures[out] = (col, agg)
+                    group_by = [c for c in params.get("group_by", "").split(",") if c]
+                    filters = {k: _parse_filter(v) for k, v in params.items() if k not in _RESERVED}
+                    body = _records(warehouse.query(params["table"], measures, group_by, filters))
+                else:
+                    self._send(404, {"error": f"Ruta desconocida: '{url.path}'."})
+                    return
+            except (KeyError, TypeError, ValueError, FileNotFoundError) as exc:
+                self._send(400, {"error": str(exc)})
+                return
+            self._send(200, body)
+
+        def log_message(self, format, *args):  # noqa: A002 - firma de BaseHTTPRequestHandler
+            pass
+
+    return Handler
+
+
+def serve(dw_dir: str = "DW", host: str = "127.0.0.1", port: int = 8765,
+          cache_size: int = CACHE_SIZE) -> None:
+    warehouse = Warehouse(dw_dir, cache_size=cache_size)
+    server = ThreadingHTTPServer((host, port), make_handler(warehouse))
+    print(f"🌐 Sirviendo el DW '{dw_dir}' en http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dw", default="DW")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+    serve(args.dw, args.host, args.port, args.cache_size)
@@ -0,0 +1,134 @@
+# ETL/sharding.py
+"""
+Ejecución de hechos y OBT repartida en procesos, por order_id.
+
+Las tablas de órdenes ('SHARDED_TABLES') se parten por hash de order_id en
+N shards: todo lo de una orden (cabecera, líneas, pagos, envíos) cae en el
+mismo shard. Las dimensiones y las demás tablas raw que usan esas etapas
+(p.ej. province) se mandan completas a cada proceso una sola vez. Cada
+shard corre los builders de 'SHARDED_STAGES' con el mismo 'run_node' que
+el ejecutor en un solo proceso.
+
+Al juntar los shards cada fila vuelve a la posición que tenía su fila de
+origen en la tabla raw (vía la clave de 'ROW_KEYS'), así que el resultado es
+idéntico al del modo normal.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from ETL.executor import RAW_PREFIX, STAGES, VALID_PREFIX, run_node, stage_kind
+from ETL.instrumentation import RunReport, measured
+from ETL.transform.dtypes import apply_dtype_policy
+
+# tablas raw que se parten por order_id
+SHARDED_TABLES = ["sales_order", "sales_order_item", "payment", "shipment"]
+
+# etapas que corre cada shard, en orden de dependencias
+SHARDED_STAGES = ["fact_sales_order", "fact_sales_order_item", "fact_payment", "fact_shipment",
+                  "fact_order_snapshot", "one_big_table"]
+
+# etapa -> (tabla raw de la que sale cada fila, clave única que las une)
+ROW_KEYS = {
+    "fact_sales_order": ("sales_order", "order_id"),
+    "fact_sales_order_item": ("sales_order_item", "order_item_id"),
+    "fact_payment": ("payment", "payment_id"),
+    "fact_shipment": ("shipment", "shipment_id"),
+    "fact_order_snapshot": ("sales_order", "order_id"),
+    "one_big_table": ("sales_order_item", "order_item_id"),
+}
+
+# datos comunes a todos los shards (se cargan una vez por proceso)
+_broadcast: dict[str, pd.DataFrame] = {}
+
+
+def _table(inputs: dict[str, pd.DataFrame], table: str) -> pd.DataFrame | None:
+    # la versión validada si existe, si no la raw
+    return inputs.get(VALID_PREFIX + table, inputs.get(RAW_PREFIX + table))
+
+
+def shard_of(order_id: pd.Series, n_shards: int) -> np.ndarray:
+    """Shard de cada order_id (mismo valor -> mismo shard en todas las tablas)."""
+    if pd.api.types.is_numeric_dtype(order_id):
+        # como float: 5 (int64) y 5.0 (columna con nulos) caen en el mismo shard
+        values = order_id.to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        values = order_id.astype(str).to_numpy(dtype=object)
+    return (pd.util.hash_array(values) % np.uint64(n_shards)).astype(np.int64)
+
+
+def stage_inputs() -> tuple[list[str], list[str]]:
+    """
+    Tablas raw y etapas previas que necesitan las etapas repartidas, sin
+    contar las que se reparten ni las que se arman dentro del shard.
+    """
+    raw, deps = [], []
+    for name in SHARDED_STAGES:
+        _, raw_tables, stage_deps = STAGES[name]
+        raw += [t for t in raw_tables if t not in SHARDED_TABLES and t not in raw]
+        deps += [d for d in stage_deps if d not in SHARDED_STAGES and d not in deps]
+    return raw, deps
+
+
+def _init_worker(broadcast: dict[str, pd.DataFrame]) -> None:
+    global _broadcast
+    _broadcast = broadcast
+
+
+def _run_shard(shard: dict[str, pd.DataFrame], positions: dict[str, np.ndarray]) -> dict:
+    """
+    Corre las etapas repartidas sobre un shard. Devuelve, por etapa, la tabla
+    y la posición global (en la raw de origen) de cada una de sus filas.
+    """
+    results = {**_broadcast, **{RAW_PREFIX + t: df for t, df in shard.items()}}
+    out = {}
+    for name in SHARDED_STAGES:
+        results[name] = run_node(name, results, raw_dir="")
+        source, key = ROW_KEYS[name]
+        local = pd.Index(shard[source][key]).get_indexer(results[name][key])
+        out[name] = (results[name], positions[source][local])
+    return out
+
+
+def _merge(parts: list[tuple[pd.DataFrame, np.ndarray]]) -> pd.DataFrame:
+    """Une los shards de una etapa en el orden de sus filas de origen."""
+    df = pd.concat([p for p, _ in parts], ignore_index=True)
+    order = np.argsort(np.concatenate([pos for _, pos in parts]), kind="stable")
+    # las columnas category de cada shard tienen sus propias categorías: la
+    # política de tipos las vuelve a armar sobre la tabla completa
+    return apply_dtype_policy(df.take(order).reset_index(drop=True))
+
+
+def run_sharded(inputs: dict[str, pd.DataFrame], n_shards: int,
+                max_workers: int | None = None, report: RunReport | None = None) -> dict[str, pd.DataFrame]:
+    """
+    Construye 'SHARDED_STAGES' en 'n_shards' procesos. 'inputs' trae, con
+    los nombres de nodo del ejecutor, las tablas raw (o 'valid:') de
+    'SHARDED_TABLES' y de 'stage_inputs', y las etapas de las que dependen.
+    Con 'report', el armado final de cada tabla queda medido con su tipo.
+    """
+    for source, key in set(ROW_KEYS.values()):
+        if _table(inputs, source)[key].dropna().duplicated().any():
+            raise ValueError(f"'{key}' está duplicado en '{source}': el modo sharded necesita "
+                             "claves únicas para devolver cada fila a su posición.")
+
+    raw, deps = stage_inputs()
+    broadcast = {RAW_PREFIX + t: _table(inputs, t) for t in raw if _table(inputs, t) is not None}
+    broadcast.update({d: inputs[d] for d in deps})
+
+    shards = [({}, {}) for _ in range(n_shards)]
+    for t in SHARDED_TABLES:
+        df = _table(inputs, t)
+        ids = shard_of(df["order_id"], n_shards)
+        for s, (tables, positions) in enumerate(shards):
+            pos = np.flatnonzero(ids == s)
+            tables[t] = df.take(pos).reset_index(drop=True)
+            positions[t] = pos
+
+    with ProcessPoolExecutor(max_workers=max_workers or n_shards,
+                             initializer=_init_worker, initargs=(broadcast,)) as pool:
+        outputs = list(pool.map(_run_shard, *zip(*shards)))
+
+    return {name: measured(report, name, stage_kind(name), _merge, [out[name] for out in outputs])
+            for name in SHARDED_STAGES}
+
@@ -0,0 +1,67 @@
+# ETL/streaming.py
+"""
+Modo streaming para los hechos grandes.
+
+Lee el CSV raw en chunks de tamaño fijo, aplica a cada chunk la misma
+limpieza que el builder en memoria y lo anexa directamente al archivo del
+DW. El pico de memoria depende del tamaño de chunk, no del de la tabla.
+El archivo se arma en un temporal y reemplaza al anterior solo al terminar.
+"""
+import gzip
+import pandas as pd
+
+from ETL.extract.extract import extract_raw_table, iter_raw_table
+from ETL.load.formats import GZIP_LEVEL, atomic_output, table_path
+from ETL.validation import Quarantine, referenced_tables, reference_keys, validate_table
+from ETL.validation_rules import REF_KEYS
+from ETL.transform.build_fact_sales_order_item import clean_sales_order_item
+from ETL.transform.build_fact_payment import clean_payment
+from ETL.transform.build_fact_shipment import clean_shipment
+
+# hecho -> (tabla raw, limpieza por chunk)
+STREAMING_FACTS = {
+    "fact_sales_order_item": ("sales_order_item", clean_sales_order_item),
+    "fact_payment": ("payment", clean_payment),
+    "fact_shipment": ("shipment", clean_shipment),
+}
+
+
+def stream_fact_to_dw(fact: str, raw_dir: str = "raw", dw_dir: str = "DW",
+                      chunksize: int = 100_000, quarantine: Quarantine | None = None,
+                      compression: str | None = None, refs: dict[str, pd.Index] | None = None) -> int:
+    """
+    Construye 'fact' chunk a chunk y lo escribe en DW/<fact>.csv (o .csv.gz).
+    Con 'quarantine', cada chunk se valida antes de limpiarse (las claves de
+    referencia se leen una sola vez, sólo la columna clave). 'refs' trae claves ya calculadas (p.ej.
+    las de las órdenes validadas); las que falten se leen de raw. Devuelve la
+    cantidad de filas escritas.
+    """
+    source, clean = STREAMING_FACTS[fact]
+    if quarantine is not None:
+        refs = {r: refs[r] if refs and r in refs else reference_keys(r, extract_raw_table(raw_dir, r, [REF_KEYS[r]]))
+                for r in referenced_tables(source)}
+    else:
+        refs = None
+    out_path = table_path(fact, dw_dir, "csv", compression)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    rows = 0
+    with atomic_output(out_path) as tmp:
+        fh = gzip.open(tmp, "wt", compresslevel=GZIP_LEVEL, encoding="utf-8", newline="") if compression else \
+            open(tmp, "w", encoding="utf-8", newline="")
+        with fh:
+            for i, chunk in enumerate(iter_raw_table(raw_dir, source, chunksize)):
+                if refs is not None:
+                    chunk, rejected = validate_table(source, chunk, refs)
+                    quarantine.add(source, rejected)
+                out = clean(chunk)
+                out.to_csv(fh, index=False, header=(i == 0))
+                rows += len(out)
+    # la otra variante (con/sin compresión) quedaría vieja
+    table_path(fact, dw_dir, "csv", None if compression else "gzip").unlink(missing_ok=True)
+
+    if rows == 0 and fact == "fact_sales_order_item":
+        raise ValueError("fact_sales_order_item quedó vacío luego de limpiar; revisá los datos de raw/sales_order_item.csv.")
+
+    print(f" -> Tabla '{out_path.name}' guardada en streaming ({rows} filas).")
+    return rows
@@ -1,42 +1,132 @@
-import pandas as pd
+from __future__ import annotations
 
-# DIMS
-from .build_dim_channel import build_dim_channel
-from .build_dim_customer import transform_dim_customer
-from .build_dim_product import transform_dim_product
-from .build_dim_store import transform_dim_store
-from .build_dim_address import build_dim_address
-from .build_dim_calendar import transform_dim_calendar
+import importlib
+import importlib.util
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-# FACTS
-from .build_fact_sales_order import transform_fact_sales_order
-from .build_fact_sales_order_item import transform_fact_sales_order_item
-from .build_fact_payment import transform_fact_payment
-from .build_fact_shipment import transform_fact_shipment
-from .build_fact_web_session import transform_fact_web_session
-from .build_fact_nps_response import transform_fact_nps_response
 
-def transform_dimensions(raw_data: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
-    return {
-        "dim_channel": build_dim_channel(raw_data),
-        "dim_customer": transform_dim_customer(raw_data),
-        "dim_product": transform_dim_product(raw_data),
-        "dim_store": transform_dim_store(raw_data),
-        "dim_address": build_dim_address(raw_data),      
-        "dim_calendar": transform_dim_calendar(raw_data), 
-    }
+class LazyBuilder:
+    """
+    Builder que importa su módulo (y con él pandas) recién la primera vez que
+    se llama: resolver el grafo o mostrar el plan no carga ningún builder.
+    """
+    def __init__(self, module: str, name: str):
+        self.module = f"{__name__}.{module}"
+        self.name = name
+        self._fn = None
 
-def transform_facts(raw_data: dict[str, pd.DataFrame], dims: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
-    return {
-        "fact_sales_order": transform_fact_sales_order(raw_data, dims),
-        "fact_sales_order_item": transform_fact_sales_order_item(raw_data, dims),
-        "fact_payment": transform_fact_payment(raw_data, dims),
-        "fact_shipment": transform_fact_shipment(raw_data, dims),
-        "fact_web_session": transform_fact_web_session(raw_data, dims),
-        "fact_nps_response": transform_fact_nps_response(raw_data, dims),
-    }
+    def __call__(self, *args, **kwargs):
+        if self._fn is None:
+            self._fn = getattr(importlib.import_module(self.module), self.name)
+        return self._fn(*args, **kwargs)
+
+    @property
+    def source_file(self) -> str:
+        """Archivo del builder, sin importarlo (para el hash del cache)."""
+        return importlib.util.find_spec(self.module).origin
+
+    def __repr__(self) -> str:
+        return f"{self.module}.{self.name}"
+
+
+# tabla raw -> columnas de fecha de los hechos: el calendario cubre el rango
+# de todas, así cada *_date_id de los hechos tiene su día en la dimensión.
+# dim_calendar no lee las tablas: depende de un nodo 'dates:<tabla>' por cada
+# una, que lee solo estas columnas y devuelve su primer y último día.
+DATES_PREFIX = "dates:"
+CALENDAR_SOURCES = {
+    "sales_order": ["order_date"],
+    "payment": ["paid_at"],
+    "shipment": ["shipped_at", "delivered_at"],
+    "nps_response": ["responded_at"],
+    "web_session": ["started_at", "ended_at"],
+    "web_event": ["event_at"],
+}
+
+# hecho -> columnas que lee fact_order_snapshot
+SNAPSHOT_COLUMNS = {
+    "fact_sales_order": ["order_id", "customer_id", "channel_id", "store_id", "order_date_id",
+                         "status", "total_amount"],
+    "fact_sales_order_item": ["order_id", "quantity", "line_total"],
+    "fact_payment": ["order_id", "status", "amount", "paid_at"],
+    "fact_shipment": ["order_id", "shipped_at", "delivered_at"],
+}
+
+# hecho -> columnas que lee customer_snapshot
+CUSTOMER_SNAPSHOT_COLUMNS = {
+    "fact_sales_order": ["order_id", "customer_id", "channel_id", "store_id", "order_date_id",
+                         "status", "total_amount"],
+    "fact_nps_response": ["customer_id", "score", "responded_at"],
+}
 
 
+# Registro de etapas: nombre -> (builder, tablas raw que lee, etapas de las que depende).
+# El ejecutor del pipeline (ETL/executor.py) arma el grafo a partir de estas declaraciones;
+# cada builder se importa recién cuando su etapa corre.
+DIMENSIONS = {
+    "dim_channel": (LazyBuilder("build_dim_channel", "build_dim_channel"), ["channel"], []),
+    "dim_customer": (LazyBuilder("build_dim_customer", "transform_dim_customer"), ["customer"], []),
+    "dim_product": (LazyBuilder("build_dim_product", "transform_dim_product"), ["product", "product_category"], []),
+    "dim_store": (LazyBuilder("build_dim_store", "transform_dim_store"), ["store", "address"], []),
+    "dim_address": (LazyBuilder("build_dim_address", "build_dim_address"), ["address", "province"], []),
+    "dim_calendar": (LazyBuilder("build_dim_calendar", "transform_dim_calendar"),
+                     [], [DATES_PREFIX + t for t in CALENDAR_SOURCES]),
+}
 
+FACTS = {
+    "fact_sales_order": (LazyBuilder("build_fact_sales_order", "transform_fact_sales_order"),
+                         ["sales_order"], []),
+    "fact_sales_order_item": (LazyBuilder("build_fact_sales_order_item", "transform_fact_sales_order_item"),
+                              ["sales_order_item"], []),
+    "fact_payment": (LazyBuilder("build_fact_payment", "transform_fact_payment"), ["payment"], []),
+    "fact_shipment": (LazyBuilder("build_fact_shipment", "transform_fact_shipment"), ["shipment"], []),
+    "fact_web_session": (LazyBuilder("build_fact_web_session", "transform_fact_web_session"),
+                         ["web_event", "web_session"], []),
+    "fact_nps_response": (LazyBuilder("build_fact_nps_response", "transform_fact_nps_response"),
+                          ["nps_response"], []),
+    # snapshot acumulativo por orden: se arma desde los otros hechos
+    "fact_order_snapshot": (LazyBuilder("build_fact_order_snapshot", "transform_fact_order_snapshot"),
+                            [], list(SNAPSHOT_COLUMNS)),
+    # RFM / customer-360: una fila por cliente, se mantiene incremental (ETL/pipeline.py)
+    "customer_snapshot": (LazyBuilder("build_customer_snapshot", "transform_customer_snapshot"),
+                          [], ["dim_customer", *CUSTOMER_SNAPSHOT_COLUMNS]),
+}
 
+# Dimensiones con clave sustituta persistente (reciben el registro en 'keys')
+KEYED_DIMENSIONS = {"dim_customer", "dim_product", "dim_store", "dim_address"}
+
+# Hechos que resuelven claves sustitutas con el registro (solo lectura, 'keys.lookup')
+KEYED_FACTS = {"customer_snapshot"}
+
+OBT = {
+    "one_big_table": (
+        LazyBuilder("build_obt", "build_one_big_table"),
+        ["sales_order", "province"],
+        ["dim_product", "dim_customer", "dim_channel", "dim_store", "dim_address", "dim_calendar",
+         "fact_sales_order_item", "fact_sales_order"],
+    ),
+}
+
+ROLLUPS = {
+    "rollup_day_channel_store": (
+        LazyBuilder("build_rollups", "transform_rollup_day_channel_store"), [], ["one_big_table"]),
+    "rollup_month_province_category": (
+        LazyBuilder("build_rollups", "transform_rollup_month_province_category"), [], ["one_big_table"]),
+    "rollup_month_product": (
+        LazyBuilder("build_rollups", "transform_rollup_month_product"), [], ["one_big_table"]),
+}
+
+
+def transform_dimensions(raw_data: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    return {name: fn(raw_data) for name, (fn, _, _) in DIMENSIONS.items()}
+
+def transform_facts(raw_data: dict[str, pd.DataFrame], dims: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    # los hechos que se arman desde otros hechos (snapshots) van después de los base
+    facts = {name: fn(raw_data, dims) for name, (fn, _, deps) in FACTS.items() if not deps}
+    for name, (fn, _, deps) in FACTS.items():
+        if deps:
+            facts[name] = fn(raw_data, {**dims, **facts})
+    return facts
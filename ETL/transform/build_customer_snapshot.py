@@ -0,0 +1,232 @@
+# ETL/transform/build_customer_snapshot.py
+"""
+customer_snapshot: una fila por cliente con RFM (recencia, frecuencia y
+monto sobre órdenes válidas), primera y última orden, canal y tienda
+preferidos, último NPS y gasto de los últimos ROLLING_DAYS días. La clave
+sustituta del cliente se resuelve con el registro de claves (lookup de solo
+lectura: un cliente que no está en dim_customer queda sin customer_sk).
+
+La tabla sale de un estado acumulable ('state'): totales por cliente,
+órdenes por cliente y canal / tienda y gasto por cliente y día (solo los
+días de la ventana). El estado de un lote de órdenes y respuestas se arma
+con group-bys y dos estados se combinan con otro group-by, así que la carga
+incremental suma las órdenes y respuestas nuevas al estado anterior
+(guardado en DW/_customer_state/) sin recorrer la historia. Su tamaño
+depende de los clientes, no de las órdenes.
+"""
+import json
+from pathlib import Path
+import os
+import pandas as pd
+
+from ETL.transform import CUSTOMER_SNAPSHOT_COLUMNS
+from ETL.transform.date_keys import add_date_keys, date_key
+from ETL.transform.surrogate_keys import SurrogateKeyRegistry
+
+# Mismo criterio que ventas_validas_line en la OBT
+VALID_ORDER_STATUSES = ["PAID", "FULFILLED"]
+
+# Ventana del gasto reciente (días, incluido el de corte)
+ROLLING_DAYS = 90
+
+OUTPUT_COLUMNS = [
+    "customer_id", "customer_sk", "recency_days", "frequency", "monetary",
+    "first_order_date_id", "last_order_date_id",
+    "preferred_channel_id", "preferred_store_id",
+    "last_nps_score", "last_nps_at", "spend_90d", "as_of_date_id",
+]
+
+# tablas del estado -> (claves, columnas que se suman)
+_COUNTS = {
+    "channels": (["customer_id", "channel_id"], ["orders"]),
+    "stores": (["customer_id", "store_id"], ["orders"]),
+    "daily": (["customer_id", "order_date_id"], ["amount"]),
+}
+
+
+def cutoff_date_id(orders: pd.DataFrame) -> int | None:
+    """Fecha de corte (AAAAMMDD): el día de la última orden cargada."""
+    if orders is None or orders.empty or orders["order_date_id"].isna().all():
+        return None
+    return int(orders["order_date_id"].max())
+
+
+def _window_start(as_of: int) -> int:
+    """Último día que ya queda fuera de la ventana de ROLLING_DAYS."""
+    day = pd.to_datetime(str(as_of), format="%Y%m%d") - pd.Timedelta(days=ROLLING_DAYS)
+    return int(date_key([day])[0])
+
+
+def order_state(orders: pd.DataFrame | None, nps: pd.DataFrame | None,
+                as_of: int | None) -> dict[str, pd.DataFrame]:
+    """Estado de un lote de órdenes ('fact_sales_order') y respuestas ('fact_nps_response')."""
+    so_cols = CUSTOMER_SNAPSHOT_COLUMNS["fact_sales_order"]
+    if orders is None:
+        orders = pd.DataFrame(columns=so_cols)
+    valid = orders[orders["status"].astype(str).isin(VALID_ORDER_STATUSES) & orders["customer_id"].notna()]
+    valid = valid.assign(orders=1, amount=pd.to_numeric(valid["total_amount"], errors="coerce").fillna(0.0))
+
+    by_customer = valid.groupby("customer_id", sort=False)
+    customers = pd.DataFrame({
+        "frequency": by_customer["orders"].sum(),
+        "monetary": by_customer["amount"].sum(),
+        "first_order_date_id": by_customer["order_date_id"].min(),
+        "last_order_date_id": by_customer["order_date_id"].max(),
+    })
+
+    # última respuesta NPS de cada cliente (las fechas nulas quedan primero)
+    if nps is not None and not nps.empty:
+        last = (nps[nps["customer_id"].notna()]
+                .sort_values("responded_at", kind="stable", na_position="first")
+                .drop_duplicates("customer_id", keep="last")
+                .set_index("customer_id"))
+        customers = customers.join(
+            last[["score", "responded_at"]].rename(columns={"score": "last_nps_score", "responded_at": "last_nps_at"}),
+            how="outer")
+    state = {"customers": _customer_columns(customers.rename_axis("customer_id").reset_index())}
+    for name, (keys, sums) in _COUNTS.items():
+        state[name] = valid.dropna(subset=keys).groupby(keys, as_index=False)[sums].sum()
+    return _trim(state, as_of)
+
+
+def _customer_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # mismas columnas y tipos con o sin respuestas NPS en el lote (el puntaje
+    # queda float, como sale del join)
+    if "last_nps_score" not in df.columns:
+        df = df.assign(last_nps_score=float("nan"), last_nps_at=pd.NaT)
+    # un lote solo de respuestas deja las columnas de órdenes vacías y como object
+    orders = ["frequency", "monetary", "first_order_date_id", "last_order_date_id"]
+    df = df.assign(**{c: pd.to_numeric(df[c]) for c in orders})
+    return df.assign(last_nps_at=pd.to_datetime(df["last_nps_at"], errors="coerce"))[
+        ["customer_id", *orders, "last_nps_score", "last_nps_at"]]
+
+
+def _trim(state: dict[str, pd.DataFrame], as_of: int | None) -> dict[str, pd.DataFrame]:
+    # el gasto diario solo hace falta para los días de la ventana
+    if as_of is None:
+        return state
+    daily = state["daily"]
+    return {**state, "daily": daily[daily["order_date_id"] > _window_start(as_of)].reset_index(drop=True)}
+
+
+def _concat(previous: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    # los vacíos quedan afuera: no aportan filas y sus tipos (object, si se
+    # leyeron de un CSV vacío) no deben decidir los del resultado
+    parts = [df for df in (previous, delta) if not df.empty]
+    return pd.concat(parts, ignore_index=True) if parts else delta
+
+
+def merge_state(previous: dict[str, pd.DataFrame], delta: dict[str, pd.DataFrame],
+                as_of: int | None) -> dict[str, pd.DataFrame]:
+    """Combina el estado anterior con el de las órdenes y respuestas nuevas."""
+    both = _concat(previous["customers"], delta["customers"])
+    g = both.groupby("customer_id", sort=False)
+    customers = pd.DataFrame({
+        "frequency": g["frequency"].sum(min_count=1),
+        "monetary": g["monetary"].sum(min_count=1),
+        "first_order_date_id": g["first_order_date_id"].min(),
+        "last_order_date_id": g["last_order_date_id"].max(),
+    })
+    # NPS: la respuesta más reciente; a igual fecha gana la del lote nuevo
+    last = (both[both["last_nps_score"].notna() | both["last_nps_at"].notna()]
+            .sort_values("last_nps_at", kind="stable", na_position="first")
+            .drop_duplicates("customer_id", keep="last")
+            .set_index("customer_id")[["last_nps_score", "last_nps_at"]])
+    state = {"customers": _customer_columns(customers.join(last, how="left").reset_index())}
+    for name, (keys, sums) in _COUNTS.items():
+        state[name] = (_concat(previous[name], delta[name])
+                       .groupby(keys, as_index=False)[sums].sum())
+    return _trim(state, as_of)
+
+
+def _preferred(counts: pd.DataFrame, key: str) -> pd.Series:
+    """Valor de 'key' con más órdenes por cliente (a igualdad, el menor)."""
+    top = counts.sort_values(["customer_id", "orders", key], ascending=[True, False, True], kind="stable")
+    return top.drop_duplicates("customer_id").set_index("customer_id")[key]
+
+
+def customer_snapshot(state: dict[str, pd.DataFrame], customers: pd.Series | None,
+                      as_of: int | None, keys: SurrogateKeyRegistry | None = None) -> pd.DataFrame:
+    """
+    La tabla final: una fila por cliente de 'customers' (claves de negocio de
+    dim_customer) o del estado, ordenada por customer_id. 'customer_sk' sale
+    del registro 'keys' (vacía si no hay registro o el cliente no está).
+    """
+    agg = state["customers"].set_index("customer_id")
+    ids = agg.index if customers is None else agg.index.union(pd.Index(customers.dropna().unique()))
+    out = agg.reindex(ids.sort_values()).rename_axis("customer_id")
+
+    out["frequency"] = out["frequency"].fillna(0).astype("int64")
+    out["monetary"] = out["monetary"].fillna(0.0).round(2)
+    out["last_nps_score"] = pd.to_numeric(out["last_nps_score"], errors="coerce").astype("Int64")
+    out["preferred_channel_id"] = _preferred(state["channels"], "channel_id")
+    out["preferred_store_id"] = _preferred(state["stores"], "store_id")
+    out["spend_90d"] = state["daily"].groupby("customer_id")["amount"].sum()
+    out["spend_90d"] = out["spend_90d"].fillna(0.0).round(2)
+
+    last = pd.to_datetime(out["last_order_date_id"].astype("Int64").astype(str), format="%Y%m%d", errors="coerce")
+    if as_of is not None:
+        out["recency_days"] = (pd.to_datetime(str(as_of), format="%Y%m%d") - last).dt.days.astype("Int64")
+    else:
+        out["recency_days"] = pd.array([pd.NA] * len(out), dtype="Int64")
+    out["as_of_date_id"] = pd.array([as_of] * len(out), dtype="Int64")
+    keys = keys or SurrogateKeyRegistry()
+    out["customer_sk"] = keys.lookup("dim_customer", out.index)
+
+    # last_nps_date_id (AAAAMMDD) junto a last_nps_at
+    return add_date_keys(out.reset_index()[OUTPUT_COLUMNS], ["last_nps_at"])
+
+
+def snapshot_stamp(snapshot: pd.DataFrame) -> dict:
+    """Huella de un snapshot, para saber si el estado guardado le corresponde."""
+    as_of = snapshot["as_of_date_id"].dropna()
+    return {
+        "as_of_date_id": int(as_of.iloc[0]) if len(as_of) else None,
+        "frequency": int(snapshot["frequency"].sum()),
+        "monetary": round(float(snapshot["monetary"].sum()), 2),
+    }
+
+
+def transform_customer_snapshot(raw_data: dict, upstream: dict,
+                                keys: SurrogateKeyRegistry | None = None) -> pd.DataFrame:
+    orders = upstream.get("fact_sales_order")
+    nps = upstream.get("fact_nps_response")
+    customers = upstream.get("dim_customer")
+    orders = None if orders is None else orders[CUSTOMER_SNAPSHOT_COLUMNS["fact_sales_order"]]
+    nps = None if nps is None else nps[CUSTOMER_SNAPSHOT_COLUMNS["fact_nps_response"]]
+    as_of = cutoff_date_id(orders)
+    state = order_state(orders, nps, as_of)
+    return customer_snapshot(state, None if customers is None else customers["customer_bk"], as_of, keys)
+
+
+class CustomerState:
+    """
+    Estado de customer_snapshot entre corridas incrementales: una tabla CSV
+    por parte del estado en 'state_dir' y la huella del snapshot que le
+    corresponde en stamp.json.
+    """
+    PARTS = ["customers", *_COUNTS]
+
+    def __init__(self, state_dir: str | Path):
+        self.state_dir = Path(state_dir)
+
+    def load(self) -> tuple[dict[str, pd.DataFrame], dict] | None:
+        stamp_path = self.state_dir / "stamp.json"
+        if not stamp_path.exists() or not all((self.state_dir / f"{p}.csv").exists() for p in self.PARTS):
+            return None
+        state = {p: pd.read_csv(self.state_dir / f"{p}.csv") for p in self.PARTS}
+        state["customers"] = _customer_columns(state["customers"])
+        return state, json.loads(stamp_path.read_text(encoding="utf-8"))
+
+    def save(self, state: dict[str, pd.DataFrame], stamp: dict) -> None:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        for p in self.PARTS:
+            path = self.state_dir / f"{p}.csv"
+            tmp = path.with_suffix(".csv.tmp")
+            state[p].to_csv(tmp, index=False)
+            os.replace(tmp, path)
+        # la huella va última: si la corrida se corta antes, el estado no se usa
+        path = self.state_dir / "stamp.json"
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(stamp, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
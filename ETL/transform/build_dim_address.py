@@ -1,9 +1,14 @@
 import pandas as pd
 
-def build_dim_address(raw_data: dict[str, pd.DataFrame]) -> pd.DataFrame:
+from .surrogate_keys import SurrogateKeyRegistry
+
+def build_dim_address(raw_data: dict[str, pd.DataFrame],
+                      keys: SurrogateKeyRegistry | None = None) -> pd.DataFrame:
+    keys = keys or SurrogateKeyRegistry()
+
     # Cargamos address y province
-    addr = raw_data["address"].copy()
-    prov = raw_data["province"].copy()
+    addr = raw_data["address"]
+    prov = raw_data["province"]
 
     # Unimos para traer el nombre y código de provincia
     prov = prov.rename(columns={
@@ -14,8 +19,8 @@ def build_dim_address(raw_data: dict[str, pd.DataFrame]) -> pd.DataFrame:
     addr = addr.merge(prov[["province_id", "province_name", "province_code"]],
                       how="left", on="province_id")
 
-    # Clave sustituta
-    addr.insert(0, "address_sk", range(1, len(addr) + 1))
+    # Clave sustituta (estable entre corridas vía registro)
+    addr.insert(0, "address_sk", keys.assign("dim_address", addr["address_id"]))
 
     # Renombrar clave natural
     addr = addr.rename(columns={
@@ -1,28 +1,26 @@
+import numpy as np
 import pandas as pd
 
-# Calendario desde el rango de fechas real de ventas
-def transform_dim_calendar(raw_data: dict[str, pd.DataFrame]) -> pd.DataFrame:
-    so = raw_data.get("sales_order", pd.DataFrame()).copy()
+from ETL.transform import CALENDAR_SOURCES
+from ETL.transform.date_keys import date_key, date_range
 
-    # Detectamos rango de fechas; fallback si viniera vacío
-    if "order_date" in so.columns and not so.empty:
-        so["order_date"] = pd.to_datetime(so["order_date"], errors="coerce")
-        start = so["order_date"].min()
-        end = so["order_date"].max()
-    else:
-        # fallback seguro
-        start = pd.Timestamp("2021-01-01")
-        end = pd.Timestamp("2021-12-31")
+MESES_ES = [
+    "Enero","Febrero","Marzo","Abril","Mayo","Junio",
+    "Julio","Agosto","Septiembre","Octubre","Noviembre","Diciembre"
+]
 
-    # Normalizamos (por si vienen timestamps)
-    start = pd.to_datetime(start).normalize()
-    end = pd.to_datetime(end).normalize()
+CALENDAR_COLS = [
+    "date_sk","date","day","month","year","month_name",
+    "quarter","week_number","is_weekend","year_month","month_date"
+]
 
-    dates = pd.date_range(start=start, end=end, freq="D")
+
+def calendar_attributes(dates: pd.DatetimeIndex) -> pd.DataFrame:
+    """Atributos de calendario para un conjunto de días (uno por fila)."""
     cal = pd.DataFrame({"date": dates})
 
     # Clave surrogate estilo AAAAMMDD
-    cal["date_sk"] = cal["date"].dt.strftime("%Y%m%d").astype(int)
+    cal["date_sk"] = np.asarray(date_key(cal["date"]), dtype="int64")
 
     cal["day"] = cal["date"].dt.day
     cal["month"] = cal["date"].dt.month
@@ -31,21 +29,48 @@ def transform_dim_calendar(raw_data: dict[str, pd.DataFrame]) -> pd.DataFrame:
     cal["week_number"] = cal["date"].dt.isocalendar().week.astype(int)
     cal["is_weekend"] = cal["date"].dt.dayofweek >= 5
 
-    meses_es = [
-        "Enero","Febrero","Marzo","Abril","Mayo","Junio",
-        "Julio","Agosto","Septiembre","Octubre","Noviembre","Diciembre"
-    ]
-    cal["month_name"] = cal["month"].map(lambda m: meses_es[m-1])
+    cal["month_name"] = cal["month"].map(lambda m: MESES_ES[m-1])
 
     # Para filtros y series
     cal["year_month"] = cal["date"].dt.strftime("%Y-%m")
     cal["month_date"] = cal["date"].values.astype("datetime64[M]")  # primer día del mes
 
-    cols = [
-        "date_sk","date","day","month","year","month_name",
-        "quarter","week_number","is_weekend","year_month","month_date"
-    ]
-    return cal[cols].sort_values("date_sk").reset_index(drop=True)
+    return cal[CALENDAR_COLS]
+
+
+def calendar_span(ranges) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Primer y último día entre los rangos (None = tabla sin fechas)."""
+    found = [r for r in ranges if r is not None]
+    if not found:
+        # fallback seguro
+        return pd.Timestamp("2021-01-01"), pd.Timestamp("2021-12-31")
+    return min(lo for lo, _ in found), max(hi for _, hi in found)
+
+
+def build_calendar(start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    dates = pd.date_range(start=start, end=end, freq="D")
+    cal = calendar_attributes(dates)
+    return cal.sort_values("date_sk").reset_index(drop=True)
+
 
+# Calendario desde el rango de fechas real de todos los hechos
+def transform_dim_calendar(raw_data: dict[str, pd.DataFrame], ranges: dict | None = None) -> pd.DataFrame:
+    # 'ranges': primer y último día de cada nodo 'dates:<tabla>' (el ejecutor
+    # lee solo las columnas de fecha); sin ellos se calculan desde 'raw_data'
+    if ranges is None:
+        found = [date_range([(raw_data.get(t), cols)]) for t, cols in CALENDAR_SOURCES.items()]
+    else:
+        found = list(ranges.values())
+    return build_calendar(*calendar_span(found))
 
 
+def extend_calendar(date_sk: pd.Series, ranges) -> pd.DataFrame | None:
+    """
+    Calendario que cubre el actual (sus 'date_sk') y los rangos nuevos, o None
+    si el actual ya los cubre. Los días siguen siendo contiguos.
+    """
+    current = pd.to_datetime(date_sk.astype(str), format="%Y%m%d")
+    start, end = calendar_span([*ranges, (current.min(), current.max())])
+    if start >= current.min() and end <= current.max():
+        return None
+    return build_calendar(start, end)
@@ -1,11 +1,15 @@
 import pandas as pd
 
-def transform_dim_customer(raw_data: dict[str, pd.DataFrame]) -> pd.DataFrame:
-    cust = raw_data["customer"].copy()
+from .surrogate_keys import SurrogateKeyRegistry
 
-    # Renombrar BK y crear surrogate key
+def transform_dim_customer(raw_data: dict[str, pd.DataFrame],
+                           keys: SurrogateKeyRegistry | None = None) -> pd.DataFrame:
+    cust = raw_data["customer"]
+    keys = keys or SurrogateKeyRegistry()
+
+    # Renombrar BK y crear surrogate key (estable entre corridas vía registro)
     cust = cust.rename(columns={"customer_id": "customer_bk"})
-    cust.insert(0, "customer_sk", range(1, len(cust) + 1))
+    cust.insert(0, "customer_sk", keys.assign("dim_customer", cust["customer_bk"]))
 
     # Orden final alineado al PDF
     desired = [
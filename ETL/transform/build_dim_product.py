@@ -1,9 +1,13 @@
 import pandas as pd
 
-def transform_dim_product(raw_data: dict[str, pd.DataFrame]) -> pd.DataFrame:
+from .surrogate_keys import SurrogateKeyRegistry
+
+def transform_dim_product(raw_data: dict[str, pd.DataFrame],
+                          keys: SurrogateKeyRegistry | None = None) -> pd.DataFrame:
     # Bases
-    prod = raw_data["product"].copy()
-    cat  = raw_data.get("product_category", pd.DataFrame()).copy()
+    prod = raw_data["product"]
+    keys = keys or SurrogateKeyRegistry()
+    cat  = raw_data.get("product_category", pd.DataFrame())
 
     # Renombres a BK (business keys) y campos base
     prod = prod.rename(columns={
@@ -11,8 +15,8 @@ def transform_dim_product(raw_data: dict[str, pd.DataFrame]) -> pd.DataFrame:
         "category_id": "category_bk",
     })
 
-    # Surrogate key
-    prod.insert(0, "product_sk", range(1, len(prod) + 1))
+    # Surrogate key (estable entre corridas vía registro)
+    prod.insert(0, "product_sk", keys.assign("dim_product", prod["product_bk"]))
 
     # Traemos metadata de categoría si existe
     if not cat.empty:
@@ -1,14 +1,18 @@
 import pandas as pd
 
-def transform_dim_store(raw_data: dict[str, pd.DataFrame]) -> pd.DataFrame:
+from .surrogate_keys import SurrogateKeyRegistry
+
+def transform_dim_store(raw_data: dict[str, pd.DataFrame],
+                        keys: SurrogateKeyRegistry | None = None) -> pd.DataFrame:
     # Base store
-    st = raw_data["store"].copy()
+    st = raw_data["store"]
+    keys = keys or SurrogateKeyRegistry()
     st = st.rename(columns={
         "store_id": "store_bk",
         "address_id": "address_bk",
     })
-    # Surrogate key
-    st.insert(0, "store_sk", range(1, len(st) + 1))
+    # Surrogate key (estable entre corridas vía registro)
+    st.insert(0, "store_sk", keys.assign("dim_store", st["store_bk"]))
 
     # Enriquecemos con datos de address (opcional pero útil)
     addr = raw_data.get("address")
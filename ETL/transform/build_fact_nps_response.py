@@ -1,10 +1,14 @@
 import pandas as pd
 
+from ETL.transform.date_keys import add_date_keys
+
 def transform_fact_nps_response(raw_data: dict, dims: dict) -> pd.DataFrame:
-    nps = raw_data["nps_response"].copy()
+    nps = raw_data["nps_response"]
 
+    # Columnas agregadas/normalizadas (la raw no se modifica)
+    changes = {}
     if "comment" not in nps.columns:
-        nps["comment"] = pd.NA
+        changes["comment"] = pd.NA
 
     out_cols = [
         "nps_id",
@@ -14,11 +18,10 @@ def transform_fact_nps_response(raw_data: dict, dims: dict) -> pd.DataFrame:
         "comment",
         "responded_at",
     ]
-    out_cols = [c for c in out_cols if c in nps.columns]
+    out_cols = [c for c in out_cols if c in nps.columns or c in changes]
 
     if "responded_at" in nps.columns:
-        nps["responded_at"] = pd.to_datetime(nps["responded_at"], errors="coerce")
-
-    return nps[out_cols].copy()
-
+        changes["responded_at"] = pd.to_datetime(nps["responded_at"], errors="coerce")
 
+    # responded_date_id (AAAAMMDD) junto a responded_at
+    return add_date_keys(nps.assign(**changes)[out_cols], ["responded_at"])
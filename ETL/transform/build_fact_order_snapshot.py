@@ -0,0 +1,149 @@
+# ETL/transform/build_fact_order_snapshot.py
+"""
+Fact: fact_order_snapshot (snapshot acumulativo, una fila por orden).
+
+Resume en una sola tabla lo que hoy exige cruzar cuatro hechos: ítems y
+unidades, importe pagado y estado del pago, primer pago, envío y entrega y
+los tiempos entre ellos. Cada hecho se agrupa sobre la posición de su
+order_id en fact_sales_order (sumas y conteos acumulados por posición,
+primeras fechas con un mínimo) y el resultado se asigna por posición, sin
+merges. Los hechos pueden llegar por chunks (OrderSnapshot.add), así que el
+snapshot se arma desde el DW sin cargar los hechos enteros.
+"""
+import numpy as np
+import pandas as pd
+
+from ETL.transform import SNAPSHOT_COLUMNS
+from ETL.transform.date_keys import add_date_keys
+
+# Tolerancia (en moneda) para considerar una orden totalmente pagada
+PAID_TOLERANCE = 0.01
+
+# hechos que se agregan por orden (fact_sales_order fija las filas)
+PARTS = [t for t in SNAPSHOT_COLUMNS if t != "fact_sales_order"]
+
+_DAY = np.timedelta64(1, "D")
+
+
+def _order_positions(order_index: pd.Index, df: pd.DataFrame | None) -> tuple[pd.DataFrame, np.ndarray]:
+    """Filas de 'df' con orden conocida y la posición de su orden en el snapshot."""
+    if df is None or df.empty or "order_id" not in df.columns:
+        return pd.DataFrame(), np.empty(0, dtype=np.intp)
+    pos = order_index.get_indexer(df["order_id"])
+    keep = pos >= 0
+    return df[keep], pos[keep]
+
+
+def _days(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Días (con decimales) entre dos timestamps; NaN si falta alguno."""
+    return np.round((end - start) / _DAY, 4)
+
+
+class OrderSnapshot:
+    """
+    Acumulador del snapshot: las órdenes se fijan al crearlo y los ítems,
+    pagos y envíos se suman con add(), de a un chunk por vez. Las sumas se
+    hacen fila a fila en el orden de llegada, así que el resultado no depende
+    del tamaño de los chunks. finish() arma la tabla.
+    """
+
+    def __init__(self, orders: pd.DataFrame):
+        cols = [c for c in SNAPSHOT_COLUMNS["fact_sales_order"] if c in orders.columns]
+        self.orders = orders[cols].reset_index(drop=True)
+        self.order_index = pd.Index(self.orders["order_id"])
+        if not self.order_index.is_unique:
+            raise ValueError("order_id está duplicado en fact_sales_order; no se puede armar el snapshot.")
+        n = len(self.orders)
+        self.counts = {c: np.zeros(n, dtype="int64") for c in ["item_count", "payment_count"]}
+        self.sums = {c: np.zeros(n) for c in ["units", "items_total", "paid_amount", "refunded_amount"]}
+        self.firsts = {c: np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+                       for c in ["first_paid_at", "shipped_at", "delivered_at"]}
+
+    def _count(self, col: str, pos: np.ndarray) -> None:
+        self.counts[col] += np.bincount(pos, minlength=len(self.counts[col]))
+
+    def _sum(self, col: str, pos: np.ndarray, values: pd.Series | None) -> None:
+        # sin la columna no suma nada
+        if values is None:
+            return
+        w = pd.to_numeric(values, errors="coerce").fillna(0).to_numpy(dtype="float64")
+        np.add.at(self.sums[col], pos, w)
+
+    def _first(self, col: str, pos: np.ndarray, values: pd.Series | None) -> None:
+        # primer timestamp (mínimo) por orden; NaT si no tiene
+        if values is None or not len(pos):
+            return
+        ts = pd.to_datetime(values.reset_index(drop=True), errors="coerce")
+        first = ts.groupby(pos).min()
+        at = first.index.to_numpy()
+        out = self.firsts[col]
+        out[at] = np.fmin(out[at], first.to_numpy(dtype="datetime64[ns]"))
+
+    def add(self, fact: str, chunk: pd.DataFrame | None) -> None:
+        """Suma al snapshot un chunk de 'fact' (uno de PARTS)."""
+        rows, pos = _order_positions(self.order_index, chunk)
+        if fact == "fact_sales_order_item":
+            self._count("item_count", pos)
+            self._sum("units", pos, rows.get("quantity"))
+            self._sum("items_total", pos, rows.get("line_total"))
+        elif fact == "fact_payment":
+            # importe cobrado y devuelto según el estado del pago
+            status = rows["status"].astype(str).to_numpy() if "status" in rows.columns else np.full(len(pos), "")
+            amount = rows.get("amount")
+            is_paid, is_refunded = status == "PAID", status == "REFUNDED"
+            self._count("payment_count", pos)
+            self._sum("paid_amount", pos[is_paid], None if amount is None else amount[is_paid])
+            self._sum("refunded_amount", pos[is_refunded], None if amount is None else amount[is_refunded])
+            self._first("first_paid_at", pos, rows.get("paid_at"))
+        elif fact == "fact_shipment":
+            self._first("shipped_at", pos, rows.get("shipped_at"))
+            self._first("delivered_at", pos, rows.get("delivered_at"))
+        else:
+            raise ValueError(f"fact_order_snapshot no se arma desde '{fact}'.")
+
+    def finish(self) -> pd.DataFrame:
+        out = self.orders.copy()
+        n = len(out)
+
+        # ---- Ítems ----
+        out["item_count"] = self.counts["item_count"]
+        out["units"] = self.sums["units"].astype("int64")
+        out["items_total"] = self.sums["items_total"]
+
+        # ---- Pagos: importe cobrado y devuelto, estado frente al total ----
+        out["payment_count"] = self.counts["payment_count"]
+        out["paid_amount"] = self.sums["paid_amount"]
+        out["refunded_amount"] = self.sums["refunded_amount"]
+        total = pd.to_numeric(out["total_amount"], errors="coerce").fillna(0).to_numpy(dtype="float64") \
+            if "total_amount" in out.columns else np.zeros(n)
+        paid, refunded = out["paid_amount"].to_numpy(), out["refunded_amount"].to_numpy()
+        out["payment_status"] = np.select(
+            [out["payment_count"].to_numpy() == 0, paid >= total - PAID_TOLERANCE, paid > 0, refunded > 0],
+            ["NO_PAYMENT", "PAID", "PARTIAL", "REFUNDED"],
+            default="UNPAID",
+        )
+
+        # ---- Primer pago, envío y entrega ----
+        paid_at = self.firsts["first_paid_at"]
+        shipped_at, delivered_at = self.firsts["shipped_at"], self.firsts["delivered_at"]
+        out["first_paid_at"] = paid_at
+        out["shipped_at"] = shipped_at
+        out["delivered_at"] = delivered_at
+
+        # ---- Tiempos entre hitos (días) ----
+        out["days_paid_to_shipped"] = _days(paid_at, shipped_at)
+        out["days_shipped_to_delivered"] = _days(shipped_at, delivered_at)
+        out["days_paid_to_delivered"] = _days(paid_at, delivered_at)
+
+        # first_paid_date_id / shipped_date_id / delivered_date_id junto a cada fecha
+        return add_date_keys(out, ["first_paid_at", "shipped_at", "delivered_at"])
+
+
+def transform_fact_order_snapshot(raw_data: dict, facts: dict) -> pd.DataFrame:
+    so = facts.get("fact_sales_order")
+    if so is None or so.empty:
+        raise ValueError("fact_sales_order está vacío. Generá los facts primero.")
+    snapshot = OrderSnapshot(so)
+    for fact in PARTS:
+        snapshot.add(fact, facts.get(fact))
+    return snapshot.finish()
@@ -1,7 +1,8 @@
 import pandas as pd
 
-def transform_fact_payment(raw_data: dict, dims: dict) -> pd.DataFrame:
-    pay = raw_data["payment"].copy()
+from ETL.transform.date_keys import add_date_keys
+
+def clean_payment(pay: pd.DataFrame) -> pd.DataFrame:
     out_cols = [
         "payment_id",
         "order_id",
@@ -13,5 +14,8 @@ def transform_fact_payment(raw_data: dict, dims: dict) -> pd.DataFrame:
     ]
     out_cols = [c for c in out_cols if c in pay.columns]
 
-    return pay[out_cols].copy()
+    # paid_date_id (AAAAMMDD) junto a paid_at
+    return add_date_keys(pay[out_cols], ["paid_at"])
 
+def transform_fact_payment(raw_data: dict, dims: dict) -> pd.DataFrame:
+    return clean_payment(raw_data["payment"])
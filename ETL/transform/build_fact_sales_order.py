@@ -1,26 +1,16 @@
 # ETL/transform/build_fact_sales_order.py
 import pandas as pd
 
+from ETL.transform.date_keys import date_key
+
 def transform_fact_sales_order(raw_data: dict, dims: dict) -> pd.DataFrame:
     """
     Fact: fact_sales_order (según PDF del profe)
-    - order_date_id referencia a dim_date.date_sk
+    - order_date_id referencia a dim_date.date_sk (AAAAMMDD, calculada
+      directamente desde order_date, sin cruzar contra el calendario)
     - El resto de columnas salen directo de raw.sales_order
     """
-    so = raw_data["sales_order"].copy()
-
-    # Asegurar tipos de fecha
-    so["order_date"] = pd.to_datetime(so["order_date"])
-
-    dd = dims["dim_calendar"][["date_sk", "date"]].copy()
-    dd["date"] = pd.to_datetime(dd["date"])
-
-    # Mapear order_date -> order_date_id (date_sk)
-    so = so.merge(
-        dd.rename(columns={"date": "order_date", "date_sk": "order_date_id"}),
-        how="left",
-        on="order_date",
-    )
+    so = raw_data["sales_order"]
 
     # Columnas según el enunciado del profe
     out_cols = [
@@ -39,12 +29,8 @@ def transform_fact_sales_order(raw_data: dict, dims: dict) -> pd.DataFrame:
         "total_amount",
     ]
 
-    return so[out_cols].copy()
-
-
-
-
-
-
-
-
+    # order_date -> order_date_id (date_sk); la raw no se toca, la columna
+    # nueva va sobre la selección
+    out = so[[c for c in out_cols if c != "order_date_id"]]
+    out.insert(out_cols.index("order_date_id"), "order_date_id", date_key(pd.to_datetime(so["order_date"])))
+    return out
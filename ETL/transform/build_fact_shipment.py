@@ -1,7 +1,8 @@
 import pandas as pd
 
-def transform_fact_shipment(raw_data: dict, dims: dict) -> pd.DataFrame:
-    sh = raw_data["shipment"].copy()
+from ETL.transform.date_keys import add_date_keys
+
+def clean_shipment(sh: pd.DataFrame) -> pd.DataFrame:
     out_cols = [
         "shipment_id",
         "order_id",
@@ -13,5 +14,8 @@ def transform_fact_shipment(raw_data: dict, dims: dict) -> pd.DataFrame:
     ]
     out_cols = [c for c in out_cols if c in sh.columns]
 
-    return sh[out_cols].copy()
+    # shipped_date_id / delivered_date_id (AAAAMMDD) junto a cada timestamp
+    return add_date_keys(sh[out_cols], ["shipped_at", "delivered_at"])
 
+def transform_fact_shipment(raw_data: dict, dims: dict) -> pd.DataFrame:
+    return clean_shipment(raw_data["shipment"])
@@ -1,16 +1,43 @@
+# ETL/transform/build_fact_web_session.py
+"""
+Fact: fact_web_session, una fila por sesión web.
+
+Sale del log de eventos (raw/web_event.csv), sesionizado en streaming con
+ETL/transform/sessionize.py, o de las sesiones ya armadas de
+raw/web_session.csv cuando no hay log.
+"""
 import pandas as pd
 
+from ETL.extract.extract import RawStream
+from ETL.transform.date_keys import add_date_keys
+from ETL.transform.sessionize import SESSION_COLUMNS, empty_sessions, sessionize
+
+
 def transform_fact_web_session(raw_data: dict, dims: dict) -> pd.DataFrame:
-    ws = raw_data["web_session"].copy()
-    out_cols = [
-        "session_id",
-        "customer_id",
-        "started_at",
-        "ended_at",
-        "source",
-        "device",
-    ]
-    out_cols = [c for c in out_cols if c in ws.columns]  # tolerante a columnas faltantes
+    """
+    Fact: fact_web_session, una fila por sesión.
+    - Desde raw/web_event.csv (log de eventos): se sesioniza en streaming,
+      sin cargar el log en memoria (ETL/transform/sessionize.py).
+    - Si no hay log pero sí raw/web_session.csv, se toman esas sesiones
+      (sin event_count).
+    - Sin ninguna de las dos fuentes el hecho queda vacío (el ejecutor lo
+      avisa en el reporte de la corrida).
+    """
+    events = raw_data.get("web_event")
+    if events is not None:
+        chunks = events.chunks() if isinstance(events, RawStream) else [events]
+        parts = list(sessionize(chunks))
+        ws = pd.concat(parts, ignore_index=True) if parts else empty_sessions()
+        # las sesiones salen a medida que se cierran: orden estable por inicio
+        ws = ws.sort_values(["started_at", "session_id"], kind="stable", ignore_index=True)
+    elif raw_data.get("web_session") is not None:
+        ws = raw_data["web_session"]
+        if "event_count" not in ws.columns:
+            ws = ws.assign(event_count=pd.array([pd.NA] * len(ws), dtype="Int64"))
+    else:
+        ws = empty_sessions()
 
-    return ws[out_cols].copy()
+    out_cols = [c for c in SESSION_COLUMNS if c in ws.columns]  # tolerante a columnas faltantes
 
+    # started_date_id / ended_date_id (AAAAMMDD) junto a cada timestamp
+    return add_date_keys(ws[out_cols], ["started_at", "ended_at"])
@@ -1,106 +1,194 @@
+import numpy as np
 import pandas as pd
+from pandas.api.extensions import take
+
+from ETL.transform.build_dim_calendar import calendar_attributes
+from ETL.transform.date_keys import date_key
+from ETL.transform.dtypes import MAX_CATEGORY_RATIO
+
+# Orden final de columnas de la OBT
+FINAL_COLS = [
+    "order_item_id","order_id","product_id",
+    "quantity","unit_price","discount_amount","line_total","ventas_validas_line",
+    "customer_id","channel_id","channel_code","channel_name",
+    "store_id","store_name","store_address_id","store_city",
+    "store_province_id","store_province_name","store_province_code","store_postal_code","store_country_code",
+    "billing_address_id","billing_line1","billing_line2","billing_city",
+    "billing_province_id","billing_province_name","billing_province_code","billing_postal_code","billing_country_code",
+    "shipping_address_id","shipping_line1","shipping_line2","shipping_city",
+    "shipping_province_id","shipping_province_name","shipping_province_code","shipping_postal_code","shipping_country_code",
+    "status","currency_code","subtotal","tax_amount","shipping_fee","total_amount",
+    # fechas (desde dim_calendar)
+    "order_date_id","order_date","day","month","year","year_month","quarter","week_number","is_weekend",
+    # producto/cliente
+    "sku","name","category_bk","category_name","category_parent_bk","list_price",
+    "email","first_name","last_name","phone",
+]
+
+# Atributos que la OBT toma de dim_calendar
+DATE_ATTRS = ["day", "month", "year", "year_month", "quarter", "week_number", "is_weekend"]
+
+
+def _values(s: pd.Series):
+    """Valores de una columna aptos para 'take' (numpy o ExtensionArray)."""
+    if isinstance(s.dtype, pd.api.extensions.ExtensionDtype):
+        return s.array
+    return s.to_numpy()
+
+
+def _positions(keys, dim: pd.DataFrame, key: str) -> np.ndarray | None:
+    """
+    Índice por clave de negocio: para cada valor de 'keys' devuelve la fila de
+    'dim' con esa clave (-1 si no existe). None si no se puede resolver.
+    """
+    if keys is None or dim is None or dim.empty or key not in dim.columns:
+        return None
+    index = pd.Index(dim[key])
+    if not index.is_unique:
+        raise ValueError(f"La clave '{key}' está duplicada en la dimensión; no se puede armar la OBT.")
+    return index.get_indexer(keys)
+
+
+def _take_column(s: pd.Series, pos: np.ndarray):
+    """
+    Toma posicional de una columna de dimensión. El texto de una dimensión
+    chica frente a la OBT sale como category: se factoriza la dimensión (no
+    las filas de la OBT) y se toman los códigos.
+    """
+    if pd.api.types.is_object_dtype(s) and len(s) <= MAX_CATEGORY_RATIO * len(pos):
+        codes, uniques = pd.factorize(s)
+        return pd.Categorical.from_codes(take(codes, pos, allow_fill=True, fill_value=-1),
+                                         dtype=pd.CategoricalDtype(uniques))
+    return take(_values(s), pos, allow_fill=True)
+
+
+def _gather(cols: dict, dim: pd.DataFrame, pos: np.ndarray | None, mapping: dict[str, str]) -> None:
+    """
+    Trae de 'dim' las columnas de 'mapping' (origen -> destino) con una única
+    toma posicional por columna. Igual que un left join: las claves sin match
+    quedan en nulo y, si el destino ya existe, se conserva el valor previo.
+    Solo se materializan las columnas que llegan a la OBT final.
+    """
+    if pos is None:
+        return
+    for src, dst in mapping.items():
+        if src in dim.columns and dst not in cols and dst in FINAL_COLS:
+            cols[dst] = _take_column(dim[src], pos)
+
+
+def _calendar_for(keys, cal: pd.DataFrame | None) -> pd.DataFrame:
+    """
+    dim_calendar (con 'date' como fecha) más los días de 'keys' que no cubre,
+    p.ej. si la dimensión no vino o es de un rango menor.
+    """
+    if cal is None or cal.empty:
+        cal = calendar_attributes(pd.DatetimeIndex([]))
+    else:
+        cal = cal.assign(date=pd.to_datetime(cal["date"]))
+
+    present = pd.unique(pd.Series(keys).dropna().to_numpy(dtype="int64"))
+    missing = present[~np.isin(present, cal["date_sk"].to_numpy())]
+    if len(missing):
+        extra = calendar_attributes(pd.DatetimeIndex(pd.to_datetime(missing.astype(str), format="%Y%m%d")))
+        cal = pd.concat([cal, extra], ignore_index=True)
+    return cal
 
-def _safe_merge(left: pd.DataFrame, right: pd.DataFrame, on, how="left", suffixes=("", "_r")) -> pd.DataFrame:
-    if left is None or right is None or len(right) == 0:
-        return left
-    keys = [on] if isinstance(on, str) else list(on)
-    for k in keys:
-        if k not in left.columns or k not in right.columns:
-            return left
-    return left.merge(right, how=how, on=on, suffixes=suffixes)
 
 def build_one_big_table(raw: dict[str, pd.DataFrame],
                         dims: dict[str, pd.DataFrame],
                         facts: dict[str, pd.DataFrame]) -> pd.DataFrame:
     # ========= 1) Base: línea de pedido =========
-    soi = facts.get("fact_sales_order_item", pd.DataFrame()).copy()
+    soi = facts.get("fact_sales_order_item", pd.DataFrame())
     if soi.empty:
         raise ValueError("fact_order_item está vacío. Generá los facts primero.")
 
+    # Columnas de la OBT como arrays posicionales (una fila por línea de pedido);
+    # el DataFrame se arma una sola vez al final.
+    cols = {c: _values(soi[c]) for c in soi.columns}
+    n = len(soi)
     for c in ["discount_amount", "line_total"]:
-        if c not in soi.columns:
-            soi[c] = 0
+        if c not in cols:
+            cols[c] = np.zeros(n, dtype="int64")
 
     # ========= 2) Cabecera de pedido =========
-    so = facts.get("fact_sales_order", pd.DataFrame()).copy()
+    so = facts.get("fact_sales_order", pd.DataFrame())
     if so.empty:
         raise ValueError("fact_sales_order está vacío. Generá los facts primero.")
 
-    obt = _safe_merge(soi, so, on="order_id")
+    order_pos = _positions(cols.get("order_id"), so, "order_id")
+    if order_pos is not None:
+        for c in so.columns:
+            if c not in cols:
+                cols[c] = take(_values(so[c]), order_pos, allow_fill=True)
 
-        # ========= 3) Derivados de fecha DESDE order_date (sin dim nueva) =========
-    # 3.a) Asegurar que exista order_date: si no está en el merge con fact_sales_order,
+        # ========= 3) Derivados de fecha DESDE order_date (vía dim_calendar) =========
+    # 3.a) Asegurar que exista order_date: si no está en fact_sales_order,
     #      lo traemos directo del RAW 'sales_order.csv' por order_id.
-    if "order_date" not in obt.columns or obt["order_date"].isna().all():
-        so_raw = raw.get("sales_order", pd.DataFrame()).copy()
+    if "order_date" not in cols or pd.isna(cols["order_date"]).all():
+        so_raw = raw.get("sales_order", pd.DataFrame())
         if not so_raw.empty and "order_id" in so_raw.columns:
             # normalizamos posible nombre de fecha en el raw
             # intenta detectar 'order_date' o variantes comunes
             cand = [c for c in so_raw.columns if c.lower() in {"order_date", "orderdate", "date"}]
             if cand:
-                so_raw = so_raw[["order_id", cand[0]]].rename(columns={cand[0]: "order_date"})
-                obt = _safe_merge(obt, so_raw, on="order_id")
+                raw_pos = _positions(cols.get("order_id"), so_raw, "order_id")
+                if raw_pos is not None:
+                    cols["order_date"] = take(_values(so_raw[cand[0]]), raw_pos, allow_fill=True)
 
     # 3.b) Si aún no hay order_date pero existen year/month/day, la construimos
-    if ("order_date" not in obt.columns or obt["order_date"].isna().all()) and \
-       {"year", "month", "day"}.issubset(obt.columns):
-        obt["order_date"] = pd.to_datetime(
-            obt[["year","month","day"]].rename(columns={"year":"Y","month":"M","day":"D"})
-            .assign(Y=lambda x: x["Y"].astype("Int64"),
-                    M=lambda x: x["M"].astype("Int64"),
-                    D=lambda x: x["D"].astype("Int64")),
+    if ("order_date" not in cols or pd.isna(cols["order_date"]).all()) and \
+       {"year", "month", "day"}.issubset(cols):
+        cols["order_date"] = pd.to_datetime(
+            pd.DataFrame({"Y": cols["year"], "M": cols["month"], "D": cols["day"]})
+            .astype("Int64"),
             errors="coerce"
         )
 
-    if "order_date" in obt.columns:
-        d = pd.to_datetime(obt["order_date"], errors="coerce")
-        if d.notna().any():
-            # derivadas ANTES de formatear
-            obt["day"]        = d.dt.day
-            obt["month"]      = d.dt.month
-            obt["year"]       = d.dt.year
-            obt["year_month"] = d.dt.strftime("%Y-%m")
-            obt["quarter"]    = d.dt.quarter
-            try:
-                obt["week_number"] = d.dt.isocalendar().week.astype("Int64")
-            except Exception:
-                obt["week_number"] = d.dt.week
-            obt["is_weekend"] = (d.dt.dayofweek >= 5)
-
-            # normalización FINAL para Looker: YYYY-MM-DD (tipo fecha reconocible)
-            obt["order_date"] = d.dt.strftime("%Y-%m-%d")
+    # 3.c) Clave entera AAAAMMDD y atributos de fecha desde dim_calendar: se
+    #      calculan una vez por día distinto y se traen por posición.
+    key = cols.get("order_date_id")
+    if (key is None or pd.isna(key).all()) and "order_date" in cols:
+        key = date_key(cols["order_date"])
+    if key is not None and not pd.isna(key).all():
+        key = pd.array(key, dtype="Int64")
+        cols["order_date_id"] = key
+        cal = _calendar_for(key, dims.get("dim_calendar"))
+        pos = _positions(key, cal, "date_sk")
+        # normalización FINAL para Looker: YYYY-MM-DD (formateado por día, no por fila)
+        cols["order_date"] = _take_column(cal["date"].dt.strftime("%Y-%m-%d"), pos)
+        for c in DATE_ATTRS:
+            cols[c] = _take_column(cal[c], pos)
 
 
     # ========= 4) Producto =========
-    dp = dims.get("dim_product", pd.DataFrame()).copy()
+    dp = dims.get("dim_product", pd.DataFrame())
     if not dp.empty:
         if "product_bk" in dp.columns and "product_id" not in dp.columns:
             dp = dp.rename(columns={"product_bk": "product_id"})
-        keep_prod = [c for c in ["product_id","sku","name","category_bk","category_name","category_parent_bk","list_price","status"] if c in dp.columns]
-        obt = _safe_merge(obt, dp[keep_prod], on="product_id")
+        pos = _positions(cols.get("product_id"), dp, "product_id")
+        _gather(cols, dp, pos, {c: c for c in ["sku","name","category_bk","category_name","category_parent_bk","list_price","status"]})
 
     # ========= 5) Cliente =========
-    dc = dims.get("dim_customer", pd.DataFrame()).copy()
+    dc = dims.get("dim_customer", pd.DataFrame())
     if not dc.empty:
         if "customer_bk" in dc.columns and "customer_id" not in dc.columns:
             dc = dc.rename(columns={"customer_bk": "customer_id"})
-        keep_cust = [c for c in ["customer_id","email","first_name","last_name","phone","status","created_at"] if c in dc.columns]
-        obt = _safe_merge(obt, dc[keep_cust], on="customer_id")
+        pos = _positions(cols.get("customer_id"), dc, "customer_id")
+        _gather(cols, dc, pos, {c: c for c in ["email","first_name","last_name","phone","status","created_at"]})
 
     # ========= 6) Canal =========
-    ch = dims.get("dim_channel", pd.DataFrame()).copy()
+    ch = dims.get("dim_channel", pd.DataFrame())
     if not ch.empty and "channel_id" in ch.columns:
-        keep_ch = [c for c in ["channel_id","code","name"] if c in ch.columns]
-        ch = ch[keep_ch].rename(columns={"name":"channel_name","code":"channel_code"})
-        obt = _safe_merge(obt, ch, on="channel_id")
+        pos = _positions(cols.get("channel_id"), ch, "channel_id")
+        _gather(cols, ch, pos, {"code": "channel_code", "name": "channel_name"})
 
     # ========= 7) Tienda =========
-    ds = dims.get("dim_store", pd.DataFrame()).copy()
+    ds = dims.get("dim_store", pd.DataFrame())
     if not ds.empty:
         if "store_bk" in ds.columns and "store_id" not in ds.columns:
             ds = ds.rename(columns={"store_bk": "store_id"})
-        keep_store = [c for c in ["store_id","name","address_bk","city","province_id","postal_code","country_code"] if c in ds.columns]
-        ds = ds[keep_store].rename(columns={
+        pos = _positions(cols.get("store_id"), ds, "store_id")
+        _gather(cols, ds, pos, {
             "name":"store_name",
             "address_bk":"store_address_id",
             "city":"store_city",
@@ -108,97 +196,38 @@ def build_one_big_table(raw: dict[str, pd.DataFrame],
             "postal_code":"store_postal_code",
             "country_code":"store_country_code",
         })
-        obt = _safe_merge(obt, ds, on="store_id")
 
     # ========= 8) Direcciones (billing/shipping) =========
-    da = dims.get("dim_address", pd.DataFrame()).copy()
+    da = dims.get("dim_address", pd.DataFrame())
     if not da.empty:
-        keep_addr = [c for c in ["address_bk","line1","line2","city","province_id","postal_code","country_code"] if c in da.columns]
-
-        billing = da[keep_addr].rename(columns={
-            "address_bk":"billing_address_id",
-            "line1":"billing_line1",
-            "line2":"billing_line2",
-            "city":"billing_city",
-            "province_id":"billing_province_id",
-            "postal_code":"billing_postal_code",
-            "country_code":"billing_country_code",
-        })
-        obt = _safe_merge(obt, billing, on="billing_address_id")
-
-        shipping = da[keep_addr].rename(columns={
-            "address_bk":"shipping_address_id",
-            "line1":"shipping_line1",
-            "line2":"shipping_line2",
-            "city":"shipping_city",
-            "province_id":"shipping_province_id",
-            "postal_code":"shipping_postal_code",
-            "country_code":"shipping_country_code",
-        })
-        obt = _safe_merge(obt, shipping, on="shipping_address_id")
+        for role in ["billing", "shipping"]:
+            pos = _positions(cols.get(f"{role}_address_id"), da, "address_bk")
+            _gather(cols, da, pos, {
+                "line1": f"{role}_line1",
+                "line2": f"{role}_line2",
+                "city": f"{role}_city",
+                "province_id": f"{role}_province_id",
+                "postal_code": f"{role}_postal_code",
+                "country_code": f"{role}_country_code",
+            })
 
     # ========= 9) Provincias: tomar DIRECTO de raw['province'] (sin dim nueva) =========
-    prov = raw.get("province", pd.DataFrame()).copy()
+    prov = raw.get("province", pd.DataFrame())
     if not prov.empty:
-        base = [c for c in ["province_id","name","code"] if c in prov.columns]
-        if base:
-            # store
-            sprov = prov[base].rename(columns={
-                "province_id":"store_province_id",
-                "name":"store_province_name",
-                "code":"store_province_code",
-            })
-            obt = _safe_merge(obt, sprov, on="store_province_id")
-            # billing
-            bprov = prov[base].rename(columns={
-                "province_id":"billing_province_id",
-                "name":"billing_province_name",
-                "code":"billing_province_code",
+        for role in ["store", "billing", "shipping"]:
+            pos = _positions(cols.get(f"{role}_province_id"), prov, "province_id")
+            _gather(cols, prov, pos, {
+                "name": f"{role}_province_name",
+                "code": f"{role}_province_code",
             })
-            obt = _safe_merge(obt, bprov, on="billing_province_id")
-            # shipping
-            shprov = prov[base].rename(columns={
-                "province_id":"shipping_province_id",
-                "name":"shipping_province_name",
-                "code":"shipping_province_code",
-            })
-            obt = _safe_merge(obt, shprov, on="shipping_province_id")
 
     # ========= 10) Métrica de línea por si faltara =========
-    if "line_total" not in obt.columns and {"quantity","unit_price","discount_amount"}.issubset(obt.columns):
-        obt["line_total"] = obt["quantity"] * obt["unit_price"] - obt["discount_amount"]
-    
-    if "ventas_validas_line" not in obt.columns:
-        cond = obt.get("status").isin(["PAID", "FULFILLED"]) if "status" in obt.columns else False
-        obt["ventas_validas_line"] = obt["line_total"].where(cond, 0)
-
-    # ========= 11) Orden final =========
-    final_cols_order = [
-        "order_item_id","order_id","product_id",
-        "quantity","unit_price","discount_amount","line_total","ventas_validas_line",
-        "customer_id","channel_id","channel_code","channel_name",
-        "store_id","store_name","store_address_id","store_city",
-        "store_province_id","store_province_name","store_province_code","store_postal_code","store_country_code",
-        "billing_address_id","billing_line1","billing_line2","billing_city",
-        "billing_province_id","billing_province_name","billing_province_code","billing_postal_code","billing_country_code",
-        "shipping_address_id","shipping_line1","shipping_line2","shipping_city",
-        "shipping_province_id","shipping_province_name","shipping_province_code","shipping_postal_code","shipping_country_code",
-        "status","currency_code","subtotal","tax_amount","shipping_fee","total_amount",
-        # fechas derivadas (sin dim)
-        "order_date","day","month","year","year_month","quarter","week_number","is_weekend",
-        # producto/cliente
-        "sku","name","category_bk","category_name","category_parent_bk","list_price",
-        "email","first_name","last_name","phone",
-    ]
-    final_cols = [c for c in final_cols_order if c in obt.columns]
-    return obt[final_cols].copy()
-
-
-
-
-
-
-
-
+    if "line_total" not in cols and {"quantity","unit_price","discount_amount"}.issubset(cols):
+        cols["line_total"] = cols["quantity"] * cols["unit_price"] - cols["discount_amount"]
 
+    if "ventas_validas_line" not in cols:
+        cond = pd.Series(cols["status"]).isin(["PAID", "FULFILLED"]).to_numpy() if "status" in cols else False
+        cols["ventas_validas_line"] = pd.Series(cols["line_total"]).where(cond, 0).to_numpy()
 
+    # ========= 11) Orden final: se materializa una sola vez =========
+    return pd.DataFrame({c: cols[c] for c in FINAL_COLS if c in cols})
@@ -0,0 +1,142 @@
+# ETL/transform/build_rollups.py
+"""
+Rollups pre-agregados para el dashboard, calculados desde la OBT.
+
+Cada rollup se arma con una sola pasada agrupada y lleva medidas aditivas
+(sumas y conteos) más un sketch HyperLogLog de órdenes distintas, que se
+puede combinar entre celdas (p.ej. sumar canales de un mes) y estimar con
+'estimate_distinct'. 'refresh_rollup' recalcula solo los meses afectados.
+"""
+import numpy as np
+import pandas as pd
+
+from ETL.transform.dtypes import apply_dtype_policy
+
+# rollup -> columnas de grano
+ROLLUP_GRAINS = {
+    "rollup_day_channel_store": ["order_date", "year_month", "channel_id", "channel_name",
+                                 "store_id", "store_name"],
+    "rollup_month_province_category": ["year_month", "shipping_province_name", "category_name"],
+    "rollup_month_product": ["year_month", "product_id", "sku", "name"],
+}
+
+# HyperLogLog: 2^HLL_P registros por sketch (error típico ~3%)
+HLL_P = 10
+_HLL_M = 1 << HLL_P
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Cantidad de bits significativos de cada uint64 (vectorizado, exacto)."""
+    x = x.copy()
+    n = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= (np.uint64(1) << np.uint64(shift))
+        n[big] += shift
+        x[big] >>= np.uint64(shift)
+    return n + (x > 0)
+
+
+def _hll_registers(values) -> tuple[np.ndarray, np.ndarray]:
+    """Registro y rango HLL de cada valor."""
+    h = pd.util.hash_array(np.asarray(values)).astype(np.uint64)
+    idx = (h >> np.uint64(64 - HLL_P)).astype(np.int64)
+    rest = h & np.uint64((1 << (64 - HLL_P)) - 1)
+    rank = (64 - HLL_P) - _bit_length(rest) + 1
+    return idx, rank
+
+
+def _sketches(cell: np.ndarray, values, n_cells: int) -> np.ndarray:
+    """
+    Un sketch por celda, serializado en forma rala como 'registro:rango,...'.
+    """
+    idx, rank = _hll_registers(values)
+    per_reg = pd.Series(rank).groupby(cell.astype(np.int64) * _HLL_M + idx).max()
+
+    reg_cell = per_reg.index.to_numpy() // _HLL_M
+    pairs = pd.Series(
+        (per_reg.index.to_numpy() % _HLL_M).astype(str).astype(object)
+        + ":" + per_reg.to_numpy().astype(str).astype(object)
+    )
+    joined = pairs.groupby(reg_cell).agg(",".join)
+
+    out = np.full(n_cells, "", dtype=object)
+    out[joined.index.to_numpy()] = joined.to_numpy()
+    return out
+
+
+def _parse_sketch(sketch: str) -> np.ndarray:
+    regs = np.zeros(_HLL_M, dtype=np.int64)
+    if isinstance(sketch, str) and sketch:
+        for pair in sketch.split(","):
+            i, r = pair.split(":")
+            regs[int(i)] = max(regs[int(i)], int(r))
+    return regs
+
+
+def merge_sketches(sketches) -> str:
+    """Une varios sketches (máximo por registro)."""
+    regs = np.zeros(_HLL_M, dtype=np.int64)
+    for s in sketches:
+        regs = np.maximum(regs, _parse_sketch(s))
+    nz = np.flatnonzero(regs)
+    return ",".join(f"{i}:{regs[i]}" for i in nz)
+
+
+def estimate_distinct(sketches) -> float:
+    """
+    Estima la cantidad de órdenes distintas de uno o varios sketches
+    (por ejemplo, todas las celdas de un mes).
+    """
+    if isinstance(sketches, str):
+        sketches = [sketches]
+    regs = _parse_sketch(merge_sketches(sketches))
+    alpha = 0.7213 / (1 + 1.079 / _HLL_M)
+    est = alpha * _HLL_M ** 2 / np.sum(2.0 ** -regs)
+    zeros = int((regs == 0).sum())
+    if est <= 2.5 * _HLL_M and zeros > 0:
+        est = _HLL_M * np.log(_HLL_M / zeros)
+    return float(est)
+
+
+def build_rollup(obt: pd.DataFrame, rollup: str) -> pd.DataFrame:
+    """
+    Agrega la OBT al grano de 'rollup' en una sola pasada agrupada.
+    """
+    keys = [c for c in ROLLUP_GRAINS[rollup] if c in obt.columns]
+    g = obt.groupby(keys, dropna=False, sort=True, observed=True)
+
+    out = g.agg(
+        lines=("order_item_id", "size"),
+        quantity=("quantity", "sum"),
+        line_total=("line_total", "sum"),
+        ventas_validas=("ventas_validas_line", "sum"),
+        orders=("order_id", "nunique"),
+    ).reset_index()
+    out["orders_sketch"] = _sketches(g.ngroup().to_numpy(), obt["order_id"], len(out))
+    return out
+
+
+def refresh_rollup(previous: pd.DataFrame | None, obt: pd.DataFrame, rollup: str,
+                   months: list[str]) -> pd.DataFrame:
+    """
+    Recalcula solo los meses 'months' de un rollup existente. 'obt' puede
+    traer únicamente las filas de esos meses.
+    """
+    fresh = build_rollup(obt[obt["year_month"].isin(months)], rollup)
+    if previous is None or previous.empty:
+        return fresh
+    keep = previous[~previous["year_month"].isin(months)]
+    keys = [c for c in ROLLUP_GRAINS[rollup] if c in fresh.columns]
+    # lo leído del DW vuelve con tipos inferidos: se reaplica la política de tipos
+    merged = apply_dtype_policy(pd.concat([keep, fresh], ignore_index=True))
+    return merged.sort_values(keys, na_position="last", kind="stable").reset_index(drop=True)
+
+
+def transform_rollup_day_channel_store(raw_data: dict, tables: dict) -> pd.DataFrame:
+    return build_rollup(tables["one_big_table"], "rollup_day_channel_store")
+
+def transform_rollup_month_province_category(raw_data: dict, tables: dict) -> pd.DataFrame:
+    return build_rollup(tables["one_big_table"], "rollup_month_province_category")
+
+def transform_rollup_month_product(raw_data: dict, tables: dict) -> pd.DataFrame:
+    return build_rollup(tables["one_big_table"], "rollup_month_product")
@@ -0,0 +1,136 @@
+# ETL/transform/dtypes.py
+"""
+Política de tipos para las tablas que produce la capa de transformación.
+
+- Columnas de texto de baja cardinalidad -> category: siempre las de
+  dominios conocidos (estado, método, carrier, moneda, país, provincia,
+  canal, categoría, source, device...) y el resto si tienen pocos valores
+  distintos por fila (p.ej. los atributos de dimensión repetidos en la OBT).
+  Las columnas del mismo dominio en una tabla (p.ej. store_/billing_/
+  shipping_province_name) comparten las mismas categorías.
+- Claves (*_id, *_sk, *_bk) y enteros chicos -> el entero más angosto que
+  alcanza; Int8/16/32/64 (nullable) si hay nulos.
+- Importes -> float64 en todas las tablas.
+El texto que se escribe en CSV no cambia salvo en las claves con nulos, que
+dejan de salir como float ('2910.0' -> '2910').
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype, is_float_dtype, is_integer_dtype, is_numeric_dtype, is_object_dtype, is_string_dtype,
+)
+
+# Dominios (nombre sin prefijo de rol) que pasan siempre a category
+CATEGORY_DOMAINS = {
+    "status", "method", "carrier", "currency_code", "country_code",
+    "province_name", "province_code", "channel_code", "channel_name",
+    "category_name", "source", "device", "month_name", "year_month",
+}
+ROLE_PREFIXES = ("store_", "billing_", "shipping_")
+
+# El resto del texto pasa a category si tiene a lo sumo esta proporción de
+# valores distintos por fila
+MAX_CATEGORY_RATIO = 0.5
+
+KEY_SUFFIXES = ("_id", "_sk", "_bk")
+SMALL_INT_COLUMNS = {"quantity", "score", "day", "month", "year", "quarter", "week_number"}
+
+MONEY_COLUMNS = {
+    "unit_price", "discount_amount", "line_total", "ventas_validas_line", "list_price",
+    "subtotal", "tax_amount", "shipping_fee", "total_amount", "amount",
+}
+MONEY_DTYPE = "float64"
+
+_INT_WIDTHS = [np.int8, np.int16, np.int32, np.int64]
+
+
+def category_domain(col: str) -> str:
+    """Dominio de categorías de una columna: su nombre sin prefijo de rol."""
+    for prefix in ROLE_PREFIXES:
+        if col.startswith(prefix):
+            return col[len(prefix):]
+    return col
+
+
+def narrowest_int(s: pd.Series) -> str | None:
+    """
+    El tipo entero más angosto para 's' ('int16', 'Int32'...), o None si
+    tiene decimales o no es numérica.
+    """
+    if is_bool_dtype(s) or not is_numeric_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+        return None
+    values = s.dropna()
+    if values.empty:
+        return None
+    if is_float_dtype(s) and not (np.mod(values.to_numpy(), 1) == 0).all():
+        return None
+    lo, hi = values.min(), values.max()
+    width = next((t for t in _INT_WIDTHS if np.iinfo(t).min <= lo and hi <= np.iinfo(t).max), None)
+    if width is None:
+        return None
+    name = np.dtype(width).name
+    nullable = s.hasnans or isinstance(s.dtype, pd.api.extensions.ExtensionDtype)
+    return name.capitalize() if nullable else name
+
+
+def _as_int(s: pd.Series, dtype: str) -> pd.Series:
+    if dtype[0] == "I" and is_float_dtype(s) and not isinstance(s.dtype, pd.api.extensions.ExtensionDtype):
+        # float con NaN -> Int: se arma el arreglo con su máscara (astype va fila a fila)
+        values = s.to_numpy()
+        mask = np.isnan(values)
+        data = np.where(mask, 0, values).astype(dtype.lower())
+        return pd.Series(pd.arrays.IntegerArray(data, mask), index=s.index, name=s.name)
+    return s.astype(dtype)
+
+
+def _to_categories(df: pd.DataFrame, domain: str, cols: list[str]) -> dict[str, pd.Series]:
+    """
+    Convierte 'cols' a category con categorías compartidas (una sola
+    factorización por columna). Devuelve {} si no son de baja cardinalidad.
+    """
+    limit = MAX_CATEGORY_RATIO * len(df)
+    out = {}
+    for c in cols:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            out[c] = df[c].array
+            continue
+        codes, uniques = pd.factorize(df[c])
+        if domain not in CATEGORY_DOMAINS and len(uniques) > limit:
+            return {}
+        out[c] = pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(uniques))
+    categories = sorted(set().union(*[cat.categories for cat in out.values()]), key=str)
+    if domain not in CATEGORY_DOMAINS and len(categories) > limit:
+        return {}
+    # recodificar a las categorías comunes opera sobre las categorías, no sobre las filas
+    return {c: pd.Series(cat.set_categories(categories), index=df.index) for c, cat in out.items()}
+
+
+def apply_dtype_policy(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Devuelve 'df' con la política de tipos aplicada (solo se reemplazan las
+    columnas que cambian de tipo).
+    """
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return df
+    changes = {}
+
+    domains: dict[str, list[str]] = {}
+    for c in df.columns:
+        if is_object_dtype(df[c]) or is_string_dtype(df[c]) or isinstance(df[c].dtype, pd.CategoricalDtype):
+            domains.setdefault(category_domain(c), []).append(c)
+    for domain, cols in domains.items():
+        changes.update(_to_categories(df, domain, cols))
+
+    for c in df.columns:
+        s = df[c]
+        if c in MONEY_COLUMNS:
+            if s.dtype != MONEY_DTYPE:
+                changes[c] = pd.to_numeric(s, errors="coerce").astype(MONEY_DTYPE)
+        elif c.endswith(KEY_SUFFIXES) or (c in SMALL_INT_COLUMNS and is_integer_dtype(s)):
+            dtype = narrowest_int(s)
+            if dtype is not None and dtype != s.dtype:
+                changes[c] = _as_int(s, dtype)
+
+    if not changes:
+        return df
+    return df.assign(**changes)
@@ -0,0 +1,155 @@
+# ETL/transform/sessionize.py
+"""
+Sesionización en streaming del log de eventos web (raw/web_event.csv).
+
+Los eventos llegan en chunks en el orden en que se escribe el log (por
+event_at, con hasta MAX_LATENESS de desorden). Cada chunk se ordena por
+visitante y hora junto con las sesiones que quedaron abiertas, y una sesión
+se corta cuando el visitante pasa más de SESSION_GAP sin eventos.
+
+El único estado entre chunks son las sesiones abiertas de los visitantes
+activos: una sesión se cierra (y se emite) cuando el log ya avanzó más de
+SESSION_GAP (+ MAX_LATENESS) desde su último evento, porque ningún evento
+posterior puede extenderla. La memoria depende de los visitantes activos
+en esa ventana, no del volumen de eventos.
+"""
+import numpy as np
+import pandas as pd
+
+# Inactividad que corta una sesión
+SESSION_GAP = pd.Timedelta(minutes=30)
+
+# Desorden tolerado entre chunks (eventos que llegan tarde al log)
+MAX_LATENESS = pd.Timedelta(minutes=5)
+
+SESSION_COLUMNS = ["session_id", "customer_id", "started_at", "ended_at", "source", "device", "event_count"]
+
+# sesiones (abiertas o por emitir) antes de asignarles session_id
+_STATE_COLUMNS = ["visitor", "started_at", "ended_at", "customer_id", "source", "device", "event_count"]
+
+
+def empty_sessions() -> pd.DataFrame:
+    """Tabla de sesiones sin filas, con los tipos de las columnas."""
+    return pd.DataFrame({
+        "session_id": pd.Series(dtype="int64"),
+        "customer_id": pd.Series(dtype="Int64"),
+        "started_at": pd.Series(dtype="datetime64[ns]"),
+        "ended_at": pd.Series(dtype="datetime64[ns]"),
+        "source": pd.Series(dtype=object),
+        "device": pd.Series(dtype=object),
+        "event_count": pd.Series(dtype="int64"),
+    })
+
+
+def _column(chunk: pd.DataFrame, col: str, dtype=object) -> pd.Series:
+    if col in chunk.columns:
+        return chunk[col]
+    return pd.Series(None, index=chunk.index, dtype=dtype)
+
+
+def _events(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Cada evento como una sesión de un solo evento (sin visitante ni hora se descarta)."""
+    customer = pd.to_numeric(_column(chunk, "customer_id", "float64"), errors="coerce").astype("Int64")
+    # sin visitor_id se usa el cliente como visitante
+    visitor = _column(chunk, "visitor_id").astype(object)
+    anonymous = visitor.isna() & customer.notna()
+    if anonymous.any():
+        visitor = visitor.mask(anonymous, "customer:" + customer[anonymous].astype(str))
+    at = pd.to_datetime(_column(chunk, "event_at"), errors="coerce")
+    ev = pd.DataFrame({
+        "visitor": visitor.astype(object),
+        "started_at": at,
+        "ended_at": at,
+        "customer_id": customer,
+        "source": _column(chunk, "source").astype(object),
+        "device": _column(chunk, "device").astype(object),
+        "event_count": np.ones(len(chunk), dtype="int64"),
+    })
+    return ev.dropna(subset=["visitor", "started_at"])
+
+
+def _merge_sessions(df: pd.DataFrame, gap: pd.Timedelta) -> pd.DataFrame:
+    """
+    Une eventos y sesiones del mismo visitante que estén a menos de 'gap'
+    entre sí. Devuelve una fila por sesión, ordenadas por visitante y hora.
+    """
+    codes, _ = pd.factorize(df["visitor"])
+    order = np.lexsort((df["started_at"].to_numpy(), codes))
+    df = df.take(order).reset_index(drop=True)
+    codes = codes[order]
+
+    # una sesión nueva empieza al cambiar de visitante o si el evento llega
+    # más de 'gap' después del último evento visto de ese visitante
+    reach = df["ended_at"].groupby(codes, sort=False).cummax().shift()
+    new = np.r_[True, codes[1:] != codes[:-1]] | ((df["started_at"] - reach) > gap).to_numpy()
+    g = df.groupby(np.cumsum(new), sort=False)
+    return pd.DataFrame({
+        "visitor": g["visitor"].first(),
+        "started_at": g["started_at"].first(),
+        "ended_at": g["ended_at"].max(),
+        # primer cliente identificado y primera fuente/dispositivo de la sesión
+        "customer_id": g["customer_id"].first(),
+        "source": g["source"].first(),
+        "device": g["device"].first(),
+        "event_count": g["event_count"].sum(),
+    }).reset_index(drop=True)
+
+
+def _finish(sessions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sesiones cerradas con su session_id: un hash de visitante e inicio, así
+    no depende del tamaño de chunk ni del orden en que se cierran.
+    """
+    if sessions.empty:
+        return empty_sessions()
+    h = pd.util.hash_pandas_object(sessions[["visitor", "started_at"]], index=False).to_numpy()
+    out = sessions.drop(columns="visitor")
+    out.insert(0, "session_id", (h & np.uint64(2**63 - 1)).astype("int64"))
+    return out[SESSION_COLUMNS].reset_index(drop=True)
+
+
+class Sessionizer:
+    """
+    Arma sesiones a partir de chunks de eventos. 'feed' devuelve las
+    sesiones que ese chunk permite cerrar y 'flush' las que quedan abiertas
+    al final del log.
+    """
+    def __init__(self, gap: pd.Timedelta = SESSION_GAP, lateness: pd.Timedelta = MAX_LATENESS):
+        self.gap = gap
+        self.lateness = lateness
+        self._open: pd.DataFrame | None = None
+        self._watermark: pd.Timestamp | None = None
+
+    def feed(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        ev = _events(chunk)
+        if ev.empty:
+            return empty_sessions()
+        low, high = ev["started_at"].min(), ev["started_at"].max()
+        if self._watermark is not None and low < self._watermark - self.lateness:
+            raise ValueError(f"web_event no viene ordenado por event_at: hay un evento de {low} después "
+                             f"de uno de {self._watermark} (se toleran {self.lateness} de desorden).")
+        self._watermark = high if self._watermark is None else max(self._watermark, high)
+
+        pending = ev if self._open is None else pd.concat([self._open, ev], ignore_index=True)
+        sessions = _merge_sessions(pending, self.gap)
+        # ningún evento futuro llega antes de este horizonte: las sesiones que
+        # terminaron más de 'gap' antes ya no pueden crecer
+        closed = (sessions["ended_at"] + self.gap < self._watermark - self.lateness).to_numpy()
+        self._open = sessions[~closed][_STATE_COLUMNS] if not closed.all() else None
+        return _finish(sessions[closed])
+
+    def flush(self) -> pd.DataFrame:
+        sessions, self._open = self._open, None
+        return empty_sessions() if sessions is None else _finish(sessions)
+
+
+def sessionize(chunks, gap: pd.Timedelta = SESSION_GAP, lateness: pd.Timedelta = MAX_LATENESS):
+    """Genera las sesiones cerradas de una secuencia de chunks de eventos."""
+    sessionizer = Sessionizer(gap, lateness)
+    for chunk in chunks:
+        out = sessionizer.feed(chunk)
+        if not out.empty:
+            yield out
+    out = sessionizer.flush()
+    if not out.empty:
+        yield out
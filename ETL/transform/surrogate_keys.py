@@ -0,0 +1,77 @@
+# ETL/transform/surrogate_keys.py
+"""
+Registro persistente de claves sustitutas.
+
+Por cada dimensión se guarda el mapa clave de negocio -> clave sustituta en
+DW/_keys/<dim>.csv. Las claves ya asignadas nunca se renumeran; las claves
+de negocio nuevas reciben el siguiente entero disponible.
+"""
+from pathlib import Path
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+
+class SurrogateKeyRegistry:
+    def __init__(self, keys_dir: str | Path | None = None):
+        # keys_dir=None: registro en memoria (claves 1..n en orden de aparición)
+        self.keys_dir = Path(keys_dir) if keys_dir is not None else None
+        self._maps: dict[str, tuple[pd.Index, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, dim: str) -> tuple[pd.Index, np.ndarray]:
+        if dim not in self._maps:
+            path = self.keys_dir / f"{dim}.csv" if self.keys_dir is not None else None
+            if path is not None and path.exists():
+                df = pd.read_csv(path)
+                self._maps[dim] = (pd.Index(df["bk"]), df["sk"].to_numpy(dtype="int64"))
+            else:
+                self._maps[dim] = (pd.Index([]), np.array([], dtype="int64"))
+        return self._maps[dim]
+
+    def assign(self, dim: str, business_keys) -> np.ndarray:
+        """
+        Devuelve la clave sustituta de cada clave de negocio, dando de alta las
+        que no existían (en orden de primera aparición). Costo O(filas nuevas)
+        sobre el mapa existente.
+        """
+        with self._lock:
+            index, sks = self._load(dim)
+            pos = index.get_indexer(business_keys)
+
+            missing = pos == -1
+            if missing.any():
+                new_bks = pd.unique(np.asarray(business_keys)[missing])
+                start = int(sks.max()) + 1 if len(sks) else 1
+                index = index.append(pd.Index(new_bks)) if len(index) else pd.Index(new_bks)
+                sks = np.concatenate([sks, np.arange(start, start + len(new_bks), dtype="int64")])
+                self._maps[dim] = (index, sks)
+                pos = index.get_indexer(business_keys)
+
+            return sks[pos]
+
+    def lookup(self, dim: str, business_keys) -> pd.array:
+        """
+        Resuelve claves de negocio a sustitutas sin dar de alta nuevas (las
+        desconocidas quedan en <NA>). Es lo que usan los hechos: el registro
+        solo crece al construir la dimensión.
+        """
+        with self._lock:
+            index, sks = self._load(dim)
+        pos = index.get_indexer(business_keys)
+        out = pd.array(sks.take(pos) if len(sks) else np.zeros(len(pos), dtype="int64"), dtype="Int64")
+        out[pos == -1] = pd.NA
+        return out
+
+    def save(self) -> None:
+        if self.keys_dir is None:
+            return
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        for dim, (index, sks) in self._maps.items():
+            if not len(index):
+                continue  # solo consultada (lookup), sin claves dadas de alta
+            path = self.keys_dir / f"{dim}.csv"
+            tmp = path.with_suffix(".csv.tmp")
+            pd.DataFrame({"bk": index, "sk": sks}).to_csv(tmp, index=False)
+            os.replace(tmp, path)
@@ -0,0 +1,162 @@
+# ETL/validation.py
+"""
+Validación de integridad referencial y calidad de datos sobre las tablas raw.
+
+Las reglas son declarativas (RULES, en ETL/validation_rules.py) y se
+evalúan en bloque, una máscara por regla y una pasada por tabla: claves no
+nulas, pertenencia de claves foráneas al conjunto de claves de la tabla
+referenciada, rangos de valores y consistencia de line_total. También
+fallan las filas con una fecha o un número que la extracción no pudo leer
+('DATE:<col>' y 'TYPE:<col>', ver ETL/extract/extract.py:INVALID_DATES e
+INVALID_VALUES). Las filas que fallan no siguen al
+DW: quedan en la tabla 'quarantine' con los códigos de motivo (p.ej.
+'FK:product_id').
+"""
+import threading
+import numpy as np
+import pandas as pd
+
+from ETL.extract.extract import INVALID_DATES, INVALID_VALUES
+from ETL.validation_rules import LINE_TOTAL_TOL, REF_KEYS, RULES, referenced_tables
+
+QUARANTINE_TABLE = "quarantine"
+QUARANTINE_COLS = ["table", "row_key", "reasons", "record"]
+
+
+def reference_keys(table: str, df: pd.DataFrame | None) -> pd.Index:
+    """Conjunto de claves de una tabla referenciada (vacío si no vino)."""
+    if df is None or REF_KEYS[table] not in df.columns:
+        return pd.Index([])
+    return pd.Index(pd.unique(df[REF_KEYS[table]].dropna()))
+
+
+def _failures(df: pd.DataFrame, rule: tuple, refs: dict[str, pd.Index]) -> tuple[str, np.ndarray] | None:
+    kind = rule[0]
+    if kind == "line_total":
+        cols = ["quantity", "unit_price", "discount_amount", "line_total"]
+        if not set(cols).issubset(df.columns):
+            return None
+        q, p, d, lt = (pd.to_numeric(df[c], errors="coerce").to_numpy(dtype="float64") for c in cols)
+        expected = q * p - np.nan_to_num(d)
+        return "LINE_TOTAL", ~np.isnan(lt) & ~np.isnan(expected) & (np.abs(expected - lt) > LINE_TOTAL_TOL)
+
+    col = rule[1]
+    if col not in df.columns:
+        return None
+    s = df[col]
+    if kind == "not_null":
+        return f"NULL:{col}", s.isna().to_numpy()
+    if kind == "fk":
+        keys = refs.get(rule[2])
+        if keys is None:
+            return None
+        return f"FK:{col}", (s.notna() & ~s.isin(keys)).to_numpy()
+    if kind == "range":
+        v = pd.to_numeric(s, errors="coerce")
+        lo, hi = rule[2], rule[3]
+        bad = np.zeros(len(v), dtype=bool)
+        # con Int64 la comparación da <NA> en los nulos: no fallan por rango
+        if lo is not None:
+            bad |= (v < lo).to_numpy(dtype=bool, na_value=False)
+        if hi is not None:
+            bad |= (v > hi).to_numpy(dtype=bool, na_value=False)
+        return f"RANGE:{col}", bad
+    raise ValueError(f"Tipo de regla desconocido: '{kind}'.")
+
+
+def validate_table(table: str, df: pd.DataFrame,
+                   refs: dict[str, pd.Index]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Aplica las reglas de 'table' y devuelve (filas válidas, filas en
+    cuarentena con sus motivos). 'refs' trae las claves de las tablas
+    referenciadas; las reglas fk sin referencia disponible se omiten.
+    """
+    rules = RULES.get(table, [])
+    # valores que la extracción no pudo leer (quedaron vacíos)
+    unreadable = {(code, col): df.index.isin(rows)
+                  for attr, code in ((INVALID_DATES, "DATE"), (INVALID_VALUES, "TYPE"))
+                  for col, rows in df.attrs.get(attr, {}).items()}
+    bad = np.zeros(len(df), dtype=bool)
+    masks = []
+    for rule in rules:
+        found = _failures(df, rule, refs)
+        if found is not None and rule[0] == "not_null" and ("TYPE", rule[1]) in unreadable:
+            # el valor vino, pero no es un número: el motivo es TYPE, no NULL
+            found = (found[0], found[1] & ~unreadable[("TYPE", rule[1])])
+        if found is not None and found[1].any():
+            masks.append(found)
+            bad |= found[1]
+    for (code, col), mask in unreadable.items():
+        if mask.any():
+            masks.append((f"{code}:{col}", mask))
+            bad |= mask
+
+    if not bad.any():
+        return df, pd.DataFrame(columns=QUARANTINE_COLS)
+
+    # Los motivos se arman solo sobre las filas que fallan
+    reasons = pd.Series("", index=np.flatnonzero(bad), dtype=object)
+    for code, mask in masks:
+        hit = np.flatnonzero(mask)
+        reasons.loc[hit] = reasons.loc[hit] + code + "|"
+    failed = df.iloc[np.flatnonzero(bad)]
+    pk = next((r[1] for r in rules if r[0] == "not_null"), None)
+    quarantine = pd.DataFrame({
+        "table": table,
+        "row_key": failed[pk].astype(str).to_numpy() if pk in failed.columns else "",
+        "reasons": reasons.str.rstrip("|").to_numpy(),
+        "record": failed.to_json(orient="records", lines=True, date_format="iso").splitlines(),
+    })
+    valid = df.iloc[np.flatnonzero(~bad)].reset_index(drop=True)
+    valid.attrs = {}
+    return valid, quarantine
+
+
+class Quarantine:
+    """
+    Acumula las filas en cuarentena de una corrida (seguro entre threads).
+    """
+    def __init__(self):
+        self._frames: dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def add(self, table: str, rows: pd.DataFrame) -> None:
+        with self._lock:
+            self._frames[table] = pd.concat([self._frames[table], rows], ignore_index=True) \
+                if table in self._frames else rows
+        if len(rows):
+            print(f" -> ⚠️ {table}: {len(rows)} filas en cuarentena.")
+
+    @property
+    def tables(self) -> list[str]:
+        return list(self._frames)
+
+    def merge_into(self, previous: pd.DataFrame | None, replace: bool = True,
+                   loaded: dict[str, pd.Series] | None = None) -> pd.DataFrame:
+        """
+        Combina con la cuarentena anterior. Con replace=True las filas de las
+        tablas validadas en esta corrida reemplazan a las que tenían (las
+        tablas no revalidadas conservan lo suyo); con replace=False se anexan,
+        como en la carga incremental: una fila que se volvió a validar
+        reemplaza su entrada anterior y las de 'loaded' ({tabla: claves} que
+        ya entraron al DW) salen de la cuarentena.
+        """
+        current = [df for df in self._frames.values() if len(df)]
+        if previous is not None and not previous.empty:
+            if replace:
+                keep = previous[~previous["table"].isin(self.tables)]
+            else:
+                seen = [df[["table", "row_key"]] for df in current]
+                seen += [pd.DataFrame({"table": t, "row_key": keys}) for t, keys in (loaded or {}).items()]
+                keep = previous[~_row_ids(previous).isin(pd.concat([_row_ids(df) for df in seen])
+                                                         if seen else pd.Index([]))]
+            if not keep.empty:
+                current.insert(0, keep)
+        if not current:
+            return pd.DataFrame(columns=QUARANTINE_COLS)
+        return pd.concat(current, ignore_index=True)[QUARANTINE_COLS]
+
+
+def _row_ids(df: pd.DataFrame) -> pd.Series:
+    # tabla + clave de la fila, como texto (la cuarentena leída del DW trae las claves como números)
+    return df["table"].astype(str) + "|" + df["row_key"].astype(str)
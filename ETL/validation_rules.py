@@ -0,0 +1,72 @@
+# ETL/validation_rules.py
+"""
+Reglas de validación de las tablas raw, solo declaraciones (sin pandas):
+las usa el armado del grafo y del plan, y ETL/validation.py las evalúa.
+"""
+
+# tabla referenciada -> columna clave
+REF_KEYS = {
+    "sales_order": "order_id",
+    "customer": "customer_id",
+    "channel": "channel_id",
+    "store": "store_id",
+    "address": "address_id",
+    "product": "product_id",
+}
+
+# Tolerancia para comparar line_total con quantity * unit_price - discount_amount
+LINE_TOTAL_TOL = 0.01
+
+# tabla raw -> reglas:
+#   ("not_null", col)          la clave no puede faltar
+#   ("fk", col, tabla)         si no es nula, debe existir en REF_KEYS[tabla]
+#   ("range", col, min, max)   si no es nula, min <= valor <= max (None = sin límite)
+#   ("line_total",)            line_total == quantity * unit_price - discount_amount
+# La primera regla not_null de cada tabla es su clave primaria.
+RULES = {
+    "sales_order": [
+        ("not_null", "order_id"),
+        ("not_null", "customer_id"),
+        ("not_null", "order_date"),
+        ("fk", "customer_id", "customer"),
+        ("fk", "channel_id", "channel"),
+        ("fk", "store_id", "store"),
+        ("fk", "billing_address_id", "address"),
+        ("fk", "shipping_address_id", "address"),
+        ("range", "subtotal", 0, None),
+        ("range", "total_amount", 0, None),
+    ],
+    "sales_order_item": [
+        ("not_null", "order_item_id"),
+        ("not_null", "order_id"),
+        ("not_null", "product_id"),
+        ("fk", "order_id", "sales_order"),
+        ("fk", "product_id", "product"),
+        ("range", "quantity", 1, None),
+        ("range", "unit_price", 0, None),
+        ("range", "discount_amount", 0, None),
+        ("line_total",),
+    ],
+    "payment": [
+        ("not_null", "payment_id"),
+        ("not_null", "order_id"),
+        ("fk", "order_id", "sales_order"),
+        ("range", "amount", 0, None),
+    ],
+    "shipment": [
+        ("not_null", "shipment_id"),
+        ("not_null", "order_id"),
+        ("fk", "order_id", "sales_order"),
+    ],
+    "nps_response": [
+        ("not_null", "nps_id"),
+        ("fk", "customer_id", "customer"),
+        ("fk", "channel_id", "channel"),
+        ("range", "score", 0, 10),
+    ],
+}
+
+
+def referenced_tables(table: str) -> list[str]:
+    """Tablas raw cuyas claves necesita validar 'table'."""
+    return sorted({rule[2] for rule in RULES.get(table, []) if rule[0] == "fk"})
@@ -0,0 +1,370 @@
+# bench/generate_data.py
+"""
+Generador de datasets raw sintéticos a escala.
+
+Replica el esquema y las distribuciones de la muestra de raw/ multiplicando
+los volúmenes por un factor de escala (1x = ~12k órdenes). Mantiene la
+integridad referencial entre customer, address, sales_order,
+sales_order_item, payment, shipment, nps_response y web_event, con sesgo
+realista: pocos clientes concentran muchas órdenes y la demanda crece en el
+tiempo. Las órdenes se generan y escriben por lotes y el log de eventos web
+(la tabla más grande) por semanas, así que 1000x no necesita tener todo en
+memoria.
+
+Uso:
+    python -m bench.generate_data --scale 10 --out bench/.data/x10
+"""
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+BASE_CUSTOMERS = 1_500
+BASE_ORDERS = 12_000
+BASE_PRODUCTS = 2
+ORDER_BATCH = 500_000
+
+START = np.datetime64("2024-01-01T00:00:00")
+END = np.datetime64("2025-09-30T23:59:59")
+
+PROVINCES = pd.DataFrame({
+    "province_id": [1, 2, 3, 4],
+    "name": ["Buenos Aires", "Córdoba", "Santa Fe", "Mendoza"],
+    "code": ["BA", "CBA", "SF", "MZA"],
+})
+CITIES = {
+    1: ["CABA", "La Plata", "Mar del Plata"],
+    2: ["Córdoba", "Villa Carlos Paz", "Río Cuarto"],
+    3: ["Rosario", "Santa Fe", "Rafaela"],
+    4: ["Mendoza", "Godoy Cruz", "San Rafael"],
+}
+PROVINCE_WEIGHTS = [0.54, 0.20, 0.14, 0.12]
+
+CHANNELS = pd.DataFrame({
+    "channel_id": [1, 2],
+    "code": ["ONLINE", "OFFLINE"],
+    "name": ["Tienda Online", "Tiendas Físicas"],
+})
+STORES = pd.DataFrame({
+    "store_id": [1, 2, 3, 4],
+    "name": ["Tienda BA", "Tienda CBA", "Tienda SF", "Tienda MZA"],
+    "address_id": [1, 2, 3, 4],
+})
+CATEGORIES = pd.DataFrame({
+    "category_id": [1, 2, 3],
+    "name": ["Bottles", "Classic", "Sport"],
+    "parent_id": [np.nan, 1.0, 1.0],
+})
+
+ORDER_STATUS = (["FULFILLED", "PAID", "CANCELLED", "REFUNDED", "CREATED"],
+                [0.698, 0.152, 0.080, 0.049, 0.021])
+PAYMENT_STATUS = {"FULFILLED": "PAID", "PAID": "PAID", "CANCELLED": "FAILED",
+                  "REFUNDED": "REFUNDED", "CREATED": "PENDING"}
+SHIPMENT_STATUS = {"FULFILLED": "DELIVERED", "PAID": "SHIPPED", "CANCELLED": "CANCELLED",
+                   "REFUNDED": "DELIVERED", "CREATED": "READY"}
+PAYMENT_METHODS = (["CARD", "GATEWAY", "CASH", "TRANSFER"], [0.51, 0.25, 0.18, 0.06])
+NPS_SCORES = np.array([67, 72, 86, 104, 113, 154, 224, 413, 522, 526, 411], dtype=float)
+NPS_COMMENTS = ["Entrega rápida y producto excelente", "Todo perfecto",
+                "Podría mejorar el empaque", "Muy conforme con la calidad",
+                "Atención muy buena", "Volvería a comprar",
+                "Tardó un poco más de lo esperado"]
+SOURCES = (["google", "direct", "instagram", "email", "facebook"], [0.38, 0.25, 0.2, 0.1, 0.07])
+DEVICES = (["mobile", "desktop", "tablet"], [0.62, 0.31, 0.07])
+EVENT_TYPES = (["page_view", "product_view", "add_to_cart", "checkout"], [0.55, 0.30, 0.10, 0.05])
+
+# Log web: sesiones por orden, proporción de sesiones con login y visitantes
+# anónimos distintos por cliente
+SESSIONS_PER_ORDER = 2
+LOGGED_IN_SESSIONS = 0.5
+ANON_VISITORS_PER_CUSTOMER = 3
+
+
+def _fmt_ts(ts: np.ndarray) -> np.ndarray:
+    """datetime64 -> 'AAAA-MM-DD HH:MM:SS' (NaT -> '') sin strftime fila a fila."""
+    out = np.char.replace(np.datetime_as_string(ts.astype("datetime64[s]"), unit="s"), "T", " ")
+    out = out.astype(object)
+    out[np.isnat(ts)] = ""
+    return out
+
+
+def _zipf_weights(n: int, s: float, rng: np.random.Generator) -> np.ndarray:
+    w = 1.0 / np.arange(1, n + 1) ** s
+    rng.shuffle(w)
+    return w / w.sum()
+
+
+def _random_ts(rng, n, start=START, end=END, growth=0.85) -> np.ndarray:
+    # u**growth concentra más órdenes hacia el final del período
+    span = (end - start).astype("int64")
+    return start + (rng.random(n) ** growth * span).astype("timedelta64[s]")
+
+
+def _static_tables(out: Path, n_products: int, rng) -> pd.DataFrame:
+    PROVINCES.to_csv(out / "province.csv", index=False)
+    CHANNELS.to_csv(out / "channel.csv", index=False)
+    STORES.to_csv(out / "store.csv", index=False)
+    CATEGORIES.to_csv(out / "product_category.csv", index=False)
+
+    lines = np.array(["Classic", "Sport"])[np.arange(n_products) % 2]
+    products = pd.DataFrame({
+        "product_id": np.arange(1, n_products + 1),
+        "sku": [f"ECO-{l.upper()}-{i:04d}" for i, l in enumerate(lines, 1)],
+        "name": [f"{l} {i} Bottle" for i, l in enumerate(lines, 1)],
+        "category_id": np.where(lines == "Classic", 2, 3),
+        "list_price": rng.choice([12000.0, 13500.0, 15000.0, 16500.0], n_products),
+        "status": np.where(rng.random(n_products) < 0.95, "A", "I"),
+        "created_at": "2024-01-01 00:00:00",
+    })
+    products.to_csv(out / "product.csv", index=False)
+    return products
+
+
+def _customers_and_addresses(out: Path, n_customers: int, rng) -> np.ndarray:
+    ids = np.arange(1, n_customers + 1)
+    first = rng.choice(["María", "Sofía", "Lucía", "Juan", "Martín", "Emma", "Mateo", "Valentina"], n_customers)
+    last = rng.choice(["González", "Silva", "García", "Flores", "Pérez", "Rodríguez", "López"], n_customers)
+    pd.DataFrame({
+        "customer_id": ids,
+        "email": [f"{f.lower()}.{l.lower()}.{i}@example.com" for f, l, i in zip(first, last, ids)],
+        "first_name": first,
+        "last_name": last,
+        "phone": [f"+54 9 11 {a:04d}-{b:04d}" for a, b in rng.integers(1000, 9999, (n_customers, 2))],
+        "status": np.where(rng.random(n_customers) < 0.944, "A", "I"),
+        "created_at": _fmt_ts(_random_ts(rng, n_customers, np.datetime64("2023-06-01T00:00:00"), END, 1.0)),
+    }).to_csv(out / "customer.csv", index=False)
+
+    # 1 a 3 direcciones por cliente; las 4 primeras son de las tiendas
+    per_customer = rng.choice([1, 2, 3], n_customers, p=[0.35, 0.45, 0.20])
+    owner = np.repeat(ids, per_customer)
+    n_addr = len(owner)
+    prov = rng.choice(PROVINCES["province_id"].to_numpy(), n_addr, p=PROVINCE_WEIGHTS)
+    city = np.array([CITIES[p][k] for p, k in zip(prov, rng.integers(0, 3, n_addr))], dtype=object)
+    addr = pd.DataFrame({
+        "address_id": np.arange(1001, 1001 + n_addr),
+        "line1": [f"Calle {n}" for n in rng.integers(1, 9999, n_addr)],
+        "line2": np.where(rng.random(n_addr) < 0.5, None,
+                          np.char.add("Piso ", rng.integers(1, 20, n_addr).astype(str))),
+        "city": city,
+        "province_id": prov,
+        "postal_code": rng.integers(1000, 9999, n_addr),
+        "country_code": "AR",
+        "created_at": _fmt_ts(_random_ts(rng, n_addr, np.datetime64("2023-06-01T00:00:00"), END, 1.0)),
+    })
+    stores = pd.DataFrame({
+        "address_id": [1, 2, 3, 4],
+        "line1": [f"Sucursal {n} - Av. Principal {100 + i}" for i, n in enumerate(PROVINCES["name"], 1)],
+        "line2": None,
+        "city": ["Buenos Aires", "Córdoba", "Santa Fe", "Mendoza"],
+        "province_id": [1, 2, 3, 4],
+        "postal_code": [1001, 1002, 1003, 1004],
+        "country_code": "AR",
+        "created_at": "2023-06-01 00:00:00",
+    })
+    pd.concat([stores, addr], ignore_index=True).to_csv(out / "address.csv", index=False)
+
+    # por cliente: rango [inicio, fin) de sus direcciones dentro de 'addr'
+    starts = np.concatenate([[0], np.cumsum(per_customer)[:-1]])
+    return np.stack([starts, per_customer], axis=1), addr["address_id"].to_numpy()
+
+
+def _order_batch(rng, first_order: int, n: int, first_item: int, cust_w, addr_ranges,
+                 addr_ids, products, prod_w) -> dict[str, pd.DataFrame]:
+    order_id = 1_000_000_000 + first_order + np.arange(n)
+    customer_id = rng.choice(len(cust_w), n, p=cust_w) + 1
+    channel_id = rng.choice([1, 2], n, p=[0.6, 0.4])
+    store_id = np.where(channel_id == 2, rng.integers(1, 5, n).astype(float), np.nan)
+    order_ts = _random_ts(rng, n)
+
+    start, count = addr_ranges[customer_id - 1].T
+    ship_addr = addr_ids[start + rng.integers(0, 1 << 30, n) % count]
+    bill_addr = addr_ids[start + rng.integers(0, 1 << 30, n) % count].astype(float)
+    bill_addr[rng.random(n) < 0.1] = np.nan
+    status = rng.choice(ORDER_STATUS[0], n, p=ORDER_STATUS[1])
+
+    # ítems: 1-3 por orden, productos con popularidad sesgada
+    n_items = rng.choice([1, 2, 3], n, p=[0.70, 0.25, 0.05])
+    item_order = np.repeat(np.arange(n), n_items)
+    m = len(item_order)
+    prod_idx = rng.choice(len(products), m, p=prod_w)
+    qty = rng.integers(1, 4, m)
+    unit = products["list_price"].to_numpy()[prod_idx] * rng.choice([1.0, 0.9, 1.05, 1.1], m, p=[0.7, 0.1, 0.1, 0.1])
+    disc = rng.choice([0.0, 600.0, 1200.0, 1500.0, 2400.0], m, p=[0.55, 0.12, 0.13, 0.12, 0.08])
+    disc = np.minimum(disc, qty * unit)
+    line_total = qty * unit - disc
+    items = pd.DataFrame({
+        "order_item_id": 5_000_000_000 + first_item + np.arange(m),
+        "order_id": order_id[item_order],
+        "product_id": products["product_id"].to_numpy()[prod_idx],
+        "quantity": qty,
+        "unit_price": unit.round(2),
+        "discount_amount": disc,
+        "line_total": line_total.round(2),
+    })
+
+    subtotal = np.bincount(item_order, weights=line_total, minlength=n).round(2)
+    tax = (subtotal * 0.21).round(2)
+    fee = np.where(channel_id == 1, rng.choice([900.0, 1200.0, 1500.0], n), 0.0)
+    orders = pd.DataFrame({
+        "order_id": order_id,
+        "customer_id": customer_id,
+        "channel_id": channel_id,
+        "store_id": store_id,
+        "order_date": _fmt_ts(order_ts),
+        "billing_address_id": bill_addr,
+        "shipping_address_id": ship_addr,
+        "status": status,
+        "currency_code": "ARS",
+        "subtotal": subtotal,
+        "tax_amount": tax,
+        "shipping_fee": fee,
+        "total_amount": (subtotal + tax + fee).round(2),
+    })
+
+    pay_status = pd.Series(status).map(PAYMENT_STATUS).to_numpy()
+    paid = np.isin(pay_status, ["PAID", "REFUNDED"])
+    paid_at = np.where(paid, order_ts + rng.integers(60, 2 * 86400, n).astype("timedelta64[s]"),
+                       np.datetime64("NaT"))
+    payments = pd.DataFrame({
+        "payment_id": 7_000_000_000 + first_order + np.arange(n),
+        "order_id": order_id,
+        "method": rng.choice(PAYMENT_METHODS[0], n, p=PAYMENT_METHODS[1]),
+        "status": pay_status,
+        "amount": orders["total_amount"].to_numpy(),
+        "paid_at": _fmt_ts(paid_at),
+        "transaction_ref": np.where(paid, np.char.add("TX-", rng.integers(10**11, 10**12, n).astype(str)), ""),
+    })
+
+    ship_status = pd.Series(status).map(SHIPMENT_STATUS).to_numpy()
+    shipped = ship_status != "CANCELLED"
+    shipped_at = np.where(shipped, order_ts + np.timedelta64(86400, "s"), np.datetime64("NaT"))
+    delivered_at = np.where(shipped, shipped_at + rng.integers(1, 6, n).astype("timedelta64[D]"),
+                            np.datetime64("NaT"))
+    online = channel_id == 1
+    shipments = pd.DataFrame({
+        "shipment_id": 9_000_000_000 + first_order + np.arange(n),
+        "order_id": order_id,
+        "carrier": np.where(online, "Correo Argentino", "PICKUP"),
+        "tracking_number": np.where(online & shipped,
+                                    np.char.add("TRK-", rng.integers(10**9, 10**10, n).astype(str)), ""),
+        "status": ship_status,
+        "shipped_at": _fmt_ts(shipped_at),
+        "delivered_at": _fmt_ts(delivered_at),
+    })
+
+    # NPS: ~22% de las órdenes reciben respuesta, días después de la compra
+    responds = rng.random(n) < 0.224
+    k = int(responds.sum())
+    comments = np.array(NPS_COMMENTS + [""], dtype=object)
+    nps = pd.DataFrame({
+        "customer_id": customer_id[responds],
+        "channel_id": channel_id[responds],
+        "score": rng.choice(11, k, p=NPS_SCORES / NPS_SCORES.sum()),
+        "comment": comments[rng.choice(len(comments), k, p=[0.124] * 7 + [0.132])],
+        "responded_at": _fmt_ts(order_ts[responds] + rng.integers(1, 30 * 86400, k).astype("timedelta64[s]")),
+    })
+
+    return {"sales_order": orders, "sales_order_item": items, "payment": payments,
+            "shipment": shipments, "nps_response": nps}
+
+
+def _web_events(out: Path, n_sessions: int, cust_w, rng) -> int:
+    """
+    Escribe raw/web_event.csv semana a semana, en orden de event_at (como un
+    log real). Cada sesión tiene de 1 a ~30 eventos separados por segundos o
+    minutos; la mitad de las sesiones son de clientes identificados y el
+    resto de visitantes anónimos. Devuelve la cantidad de eventos.
+    """
+    week = np.timedelta64(7 * 86400, "s")
+    edges = START + np.arange(int(np.ceil((END - START) / week)) + 1) * week
+    # misma curva de crecimiento que las órdenes (ver _random_ts)
+    share = np.diff(np.clip((edges - START) / (END - START), 0, 1) ** (1 / 0.85))
+    per_week = rng.multinomial(n_sessions, share / share.sum())
+
+    pending, written = None, 0
+    for w, k in enumerate(per_week):
+        started = np.minimum(edges[w] + rng.integers(0, int(week.astype("int64")), k).astype("timedelta64[s]"), END)
+        logged = rng.random(k) < LOGGED_IN_SESSIONS
+        customer = np.where(logged, rng.choice(len(cust_w), k, p=cust_w) + 1, 0)
+        visitor = np.where(logged, np.char.add("c", customer.astype(str)),
+                           np.char.add("a", rng.integers(0, ANON_VISITORS_PER_CUSTOMER * len(cust_w), k).astype(str)))
+
+        n_events = np.minimum(rng.geometric(0.2, k), 30)
+        sess = np.repeat(np.arange(k), n_events)
+        first = np.concatenate([[0], np.cumsum(n_events)[:-1]])
+        gaps = rng.exponential(90, len(sess)).astype("int64")
+        gaps[first] = 0
+        offset = np.cumsum(gaps)
+        offset -= np.repeat(offset[first], n_events)
+        events = pd.DataFrame({
+            "visitor_id": visitor[sess],
+            "customer_id": pd.arrays.IntegerArray(customer[sess], ~logged[sess]),
+            "event_type": rng.choice(EVENT_TYPES[0], len(sess), p=EVENT_TYPES[1]),
+            "event_at": started[sess] + offset.astype("timedelta64[s]"),
+            "source": rng.choice(SOURCES[0], k, p=SOURCES[1])[sess],
+            "device": rng.choice(DEVICES[0], k, p=DEVICES[1])[sess],
+        })
+
+        # los eventos que caen después de la semana esperan a la siguiente
+        if pending is not None:
+            events = pd.concat([pending, events], ignore_index=True)
+        events = events.sort_values("event_at", kind="stable", ignore_index=True)
+        last = w == len(per_week) - 1
+        ready = np.ones(len(events), dtype=bool) if last else (events["event_at"] < edges[w + 1]).to_numpy()
+        pending = events[~ready]
+        batch = events[ready]
+        batch.insert(0, "event_id", 30_000_000_000 + written + np.arange(len(batch)))
+        batch.assign(event_at=_fmt_ts(batch["event_at"].to_numpy())).to_csv(
+            out / "web_event.csv", index=False, mode="w" if w == 0 else "a", header=w == 0)
+        written += len(batch)
+    return written
+
+
+def generate(scale: float, out_dir: str, seed: int = 42) -> Path:
+    """
+    Genera en 'out_dir' un dataset raw completo a 'scale' veces el volumen
+    de la muestra. Devuelve la carpeta generada.
+    """
+    rng = np.random.default_rng(seed)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    n_customers = max(10, int(BASE_CUSTOMERS * scale))
+    n_orders = max(10, int(BASE_ORDERS * scale))
+    n_products = max(BASE_PRODUCTS, int(BASE_PRODUCTS * np.sqrt(scale)))
+
+    products = _static_tables(out, n_products, rng)
+    addr_ranges, addr_ids = _customers_and_addresses(out, n_customers, rng)
+    cust_w = _zipf_weights(n_customers, 0.3, rng)
+    prod_w = _zipf_weights(n_products, 1.1, rng)
+
+    written = 0
+    items_written = 0
+    nps_written = 0
+    while written < n_orders:
+        n = min(ORDER_BATCH, n_orders - written)
+        batch = _order_batch(rng, written, n, items_written, cust_w, addr_ranges,
+                             addr_ids, products, prod_w)
+        batch["nps_response"].insert(0, "nps_id", 13_000_000_000 + nps_written + np.arange(len(batch["nps_response"])))
+
+        for table, df in batch.items():
+            df.to_csv(out / f"{table}.csv", index=False, mode="w" if written == 0 else "a",
+                      header=written == 0)
+
+        written += n
+        items_written += len(batch["sales_order_item"])
+        nps_written += len(batch["nps_response"])
+
+    events = _web_events(out, SESSIONS_PER_ORDER * n_orders, cust_w, rng)
+
+    print(f" -> Dataset x{scale:g} generado en '{out}': {n_orders} órdenes, "
+          f"{items_written} ítems, {events} eventos web, {n_customers} clientes.")
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=float, default=1.0, help="Factor de escala (1, 10, 100, 1000).")
+    parser.add_argument("--out", required=True, help="Carpeta destino de los CSV raw.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate(args.scale, args.out, args.seed)
@@ -0,0 +1,210 @@
+# bench/run_benchmark.py
+"""
+Benchmark del pipeline sobre datasets sintéticos a escala.
+
+Por cada factor de escala genera (o reutiliza) un dataset con
+bench.generate_data y mide cada etapa por separado: extracción, cada
+dimensión, cada hecho, la OBT, los rollups y la carga al DW. Cada etapa
+corre en un proceso propio para que el pico de RSS sea el de esa etapa;
+sus dependencias se calculan antes de empezar a medir.
+
+Registra tiempo de reloj, filas/s y pico de RSS, y compara contra un
+baseline guardado: si una etapa es más lenta o usa más memoria que el
+baseline más la tolerancia, se marca como regresión y el proceso termina
+con código 1.
+
+Uso:
+    python -m bench.run_benchmark --scales 1 10 --save-baseline
+    python -m bench.run_benchmark --scales 1 10
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent
+DATA_DIR = BENCH_DIR / ".data"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+# Diferencias menores a esto se consideran ruido (segundos / MB)
+MIN_WALL_DELTA = 0.05
+MIN_RSS_DELTA = 16.0
+
+
+def _stage_names() -> list[str]:
+    from ETL.transform import DIMENSIONS, FACTS, OBT, ROLLUPS
+    return ["extract", *DIMENSIONS, *FACTS, *OBT, *ROLLUPS, "load"]
+
+
+def _reset_peak_rss() -> None:
+    # En Linux, escribir '5' en clear_refs reinicia VmHWM (pico de RSS)
+    with contextlib.suppress(OSError):
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+
+
+def _peak_rss_mb() -> float:
+    with contextlib.suppress(OSError):
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    # Fallback: pico de todo el proceso (KB en Linux, bytes en macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _rows(obj) -> int:
+    # las tablas que se recorren en streaming (RawStream) no se cuentan
+    if obj is None or not hasattr(obj, "__len__"):
+        return 0
+    if isinstance(obj, dict):
+        return sum(_rows(v) for v in obj.values())
+    return len(obj)
+
+
+def measure_stage(stage: str, raw_dir: str) -> dict:
+    """
+    Prepara las entradas de 'stage' y mide solo la ejecución de la etapa.
+    Pensado para correr en un proceso dedicado (ver '--child').
+    """
+    import gc
+    from ETL.executor import STAGES, RAW_PREFIX, run_node, run_stages
+    from ETL.extract.extract import extract_raw_data, open_raw_table
+    from ETL.load.load import load_data_to_dw
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if stage == "extract":
+            inputs = None
+            # el catálogo es perezoso: se fuerza la lectura de todas las tablas
+            run = lambda: dict(extract_raw_data(raw_dir))
+        elif stage == "load":
+            inputs = run_stages(list(STAGES), raw_dir)
+            dw_dir = tempfile.mkdtemp(prefix="bench_dw_")
+
+            def run():
+                load_data_to_dw(inputs, dw_dir)
+                return inputs
+        else:
+            _, raw_tables, deps = STAGES[stage]
+            raw = {t: open_raw_table(raw_dir, t) for t in raw_tables}
+            inputs = {RAW_PREFIX + t: df for t, df in raw.items()}
+            if deps:
+                inputs.update(run_stages(list(deps), raw_dir,
+                                         raw={t: df for t, df in raw.items() if df is not None}))
+            run = lambda: run_node(stage, inputs, raw_dir)
+
+        gc.collect()
+        _reset_peak_rss()
+        start = time.perf_counter()
+        out = run()
+        wall = time.perf_counter() - start
+        if stage == "load":
+            shutil.rmtree(dw_dir, ignore_errors=True)
+
+    rows_out = _rows(out)
+    return {
+        "wall_s": round(wall, 4),
+        "rows_in": _rows(inputs) if stage != "load" else rows_out,
+        "rows_out": rows_out,
+        "rows_per_s": round(rows_out / wall, 1) if wall > 0 else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _run_child(stage: str, raw_dir: Path) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-m", "bench.run_benchmark", "--child", stage, "--raw", str(raw_dir)],
+        cwd=BENCH_DIR.parent, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"La etapa '{stage}' falló:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(scales: list[float], stages: list[str] | None = None,
+                  data_dir: Path = DATA_DIR, seed: int = 42) -> dict:
+    from bench.generate_data import generate
+
+    results = {}
+    for scale in scales:
+        label = f"x{scale:g}"
+        raw_dir = Path(data_dir) / label
+        if not (raw_dir / "sales_order.csv").exists():
+            generate(scale, raw_dir, seed)
+        results[label] = {}
+        for stage in stages or _stage_names():
+            m = _run_child(stage, raw_dir)
+            results[label][stage] = m
+            print(f"   {label:>6} {stage:<34} {m['wall_s']:>9.3f}s {m['rows_per_s'] or 0:>13,.0f} filas/s "
+                  f"{m['peak_rss_mb']:>9.1f} MB")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compara 'results' contra 'baseline' y devuelve las regresiones detectadas.
+    """
+    regressions = []
+    for label, stages in results.items():
+        for stage, m in stages.items():
+            base = baseline.get(label, {}).get(stage)
+            if base is None:
+                continue
+            if (m["wall_s"] > base["wall_s"] * (1 + tolerance)
+                    and m["wall_s"] - base["wall_s"] > MIN_WALL_DELTA):
+                regressions.append(f"{label} {stage}: tiempo {base['wall_s']:.3f}s -> {m['wall_s']:.3f}s")
+            if (m["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance)
+                    and m["peak_rss_mb"] - base["peak_rss_mb"] > MIN_RSS_DELTA):
+                regressions.append(f"{label} {stage}: RSS {base['peak_rss_mb']:.1f}MB -> {m['peak_rss_mb']:.1f}MB")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10],
+                        help="Factores de escala a medir (1, 10, 100, 1000).")
+    parser.add_argument("--stages", nargs="+", default=None,
+                        help="Etapas a medir (default: todas).")
+    parser.add_argument("--data-dir", default=str(DATA_DIR),
+                        help="Carpeta donde se generan/reutilizan los datasets.")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE))
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Guarda los resultados como nuevo baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Margen relativo antes de marcar una regresión (default: 0.2).")
+    parser.add_argument("--output", default=None, help="Archivo JSON con los resultados.")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--raw", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_stage(args.child, args.raw)))
+        sys.exit(0)
+
+    results = run_benchmark(args.scales, args.stages, Path(args.data_dir))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True), encoding="utf-8")
+        print(f"✅ Baseline guardado en '{baseline_path}'.")
+    elif baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+        for r in regressions:
+            print(f"⚠️ Regresión: {r}")
+        if regressions:
+            sys.exit(1)
+        print("✅ Sin regresiones contra el baseline.")
+    else:
+        print(f"ℹ️ No hay baseline en '{baseline_path}'; usá --save-baseline para crearlo.")
@@ -1,13 +1,93 @@
 # main.py (reemplazá el contenido por esto si querés simple y claro)
+# El pipeline (pandas y los builders) se importa recién al correr: --help y
+# --plan responden sin cargarlo.
 import argparse
-from ETL.pipeline import run_all, run_dimensions, run_facts, run_obt
+
+from ETL.planning import STAGES, STEP_TARGETS
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--step", choices=["dims", "facts", "obt", "all"], default="all")
+    parser.add_argument("--step", choices=["dims", "facts", "obt", "all", "incremental", "rollups"], default=None,
+                        help="Paso a ejecutar (default: all).")
+    parser.add_argument("--tables", default=None,
+                        help="Tablas a regenerar, p.ej. fact_payment,dim_channel (solo se arma lo que necesitan).")
+    parser.add_argument("--plan", action="store_true",
+                        help="Muestra qué archivos raw y builders se ejecutarían, sin ejecutar nada.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Cantidad de threads para etapas independientes (default: CPUs).")
+    parser.add_argument("--format", choices=["csv", "parquet", "feather"], default="csv",
+                        help="Formato de salida de las tablas del DW.")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Con --step facts: procesa los hechos grandes en streaming, de a N filas.")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignora el cache de build y recalcula todas las tablas.")
+    parser.add_argument("--months", default=None,
+                        help="Con --step rollups: meses a refrescar, p.ej. 2025-09,2025-10.")
+    parser.add_argument("--profile", default=None, metavar="ETAPA",
+                        help="Vuelca un perfil cProfile de la etapa indicada (p.ej. one_big_table) en DW/_runs/.")
+    parser.add_argument("--sqlite", action="store_true",
+                        help="Además carga las tablas generadas en DW/warehouse.sqlite (con índices).")
+    parser.add_argument("--compress", choices=["gzip"], default=None,
+                        help="Comprime las tablas del DW (CSV -> .csv.gz; en Parquet, códec gzip).")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="Con --step all: reparte hechos y OBT por order_id en N procesos.")
+    parser.add_argument("--no-validate", action="store_true",
+                        help="Desactiva la validación de integridad (y la tabla de cuarentena).")
     args = parser.parse_args()
 
-    {"dims": run_dimensions,
-     "facts": run_facts,
-     "obt":  run_obt,
-     "all":  run_all}[args.step]()
\ No newline at end of file
+    tables = [t for t in args.tables.split(",") if t] if args.tables else None
+    if tables is not None:
+        if args.step is not None:
+            parser.error("--tables reemplaza a --step: usá uno de los dos.")
+        unknown = [t for t in tables if t not in STAGES]
+        if unknown:
+            parser.error(f"Tablas desconocidas: {unknown}. Opciones: {sorted(STAGES)}")
+        if args.chunksize is not None or args.shards is not None:
+            parser.error("--tables no se puede combinar con --chunksize ni --shards.")
+    args.step = args.step or "all"
+    if args.plan and tables is None and args.step not in STEP_TARGETS:
+        parser.error(f"--plan solo está disponible para --tables o --step {'/'.join(STEP_TARGETS)}.")
+    if args.chunksize is not None and args.step != "facts":
+        parser.error("--chunksize solo se puede usar con --step facts.")
+    if args.shards is not None and (args.step != "all" or args.shards < 1):
+        parser.error("--shards solo se puede usar con --step all y debe ser >= 1.")
+    if args.step == "rollups" and not args.months:
+        parser.error("--step rollups requiere --months.")
+    if args.compress and args.format == "feather":
+        parser.error("--compress no está disponible para --format feather.")
+    if args.compress and args.step == "incremental":
+        parser.error("--compress no se puede usar con --step incremental (anexa sobre CSV sin comprimir).")
+
+    if args.plan:
+        from ETL.cache import BuildCache
+        from ETL.planning import build_plan, print_plan
+        targets = tables or STEP_TARGETS[args.step]
+        validate = not args.no_validate
+        cache = None if args.force else BuildCache("DW", "raw", args.format, validate, args.compress)
+        print_plan(targets, build_plan(targets, validate, cache))
+        raise SystemExit(0)
+
+    from ETL.pipeline import run_all, run_dimensions, run_facts, run_obt, run_incremental, run_rollups, run_tables
+
+    if tables is not None:
+        run_tables(tables, max_workers=args.workers, fmt=args.format, force=args.force, profile=args.profile,
+                   sqlite=args.sqlite, validate=not args.no_validate, compression=args.compress)
+    elif args.step == "rollups":
+        run_rollups(args.months.split(","), fmt=args.format, profile=args.profile, sqlite=args.sqlite,
+                    compression=args.compress)
+    else:
+        kwargs = {"chunksize": args.chunksize} if args.chunksize is not None else {}
+        kwargs["profile"] = args.profile
+        kwargs["sqlite"] = args.sqlite
+        kwargs["validate"] = not args.no_validate
+        if args.step != "incremental":
+            kwargs["force"] = args.force
+            kwargs["compression"] = args.compress
+        if args.shards is not None:
+            kwargs["shards"] = args.shards
+
+        {"dims": run_dimensions,
+         "facts": run_facts,
+         "obt":  run_obt,
+         "all":  run_all,
+         "incremental": run_incremental}[args.step](max_workers=args.workers, fmt=args.format, **kwargs)
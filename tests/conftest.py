@@ -0,0 +1,75 @@
+# tests/conftest.py
+"""
+Fixtures comunes: un dataset raw chico generado con bench/generate_data.py y
+carpetas de trabajo con raw/ y DW/ (el pipeline usa rutas relativas).
+"""
+import shutil
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench.generate_data import generate  # noqa: E402
+
+# 1.200 órdenes, 150 clientes, ~12.000 eventos web
+SCALE = 0.1
+
+# tablas hijas de sales_order (llegan con su orden)
+ORDER_CHILDREN = ["sales_order_item", "payment", "shipment"]
+
+# tablas que llegan por su propia fecha
+TIMED_TABLES = {"nps_response": "responded_at", "web_event": "event_at"}
+
+
+@pytest.fixture(scope="session")
+def raw_dataset(tmp_path_factory) -> Path:
+    out = tmp_path_factory.mktemp("dataset")
+    generate(SCALE, str(out))
+    return out
+
+
+def make_workspace(root: Path, raw: Path | None = None) -> Path:
+    """Carpeta 'root' con DW/ vacío y raw/ (copia de 'raw', si se indica)."""
+    (root / "DW").mkdir(parents=True)
+    if raw is not None:
+        shutil.copytree(raw, root / "raw")
+    return root
+
+
+def replace_raw(root: Path, raw: Path) -> None:
+    """Reemplaza root/raw por una copia de 'raw'."""
+    shutil.rmtree(root / "raw", ignore_errors=True)
+    shutil.copytree(raw, root / "raw")
+
+
+def slice_raw(src: Path, dst: Path, cutoff: str) -> None:
+    """
+    Lo que habría en raw/ antes de 'cutoff': las órdenes anteriores con sus
+    ítems, pagos y envíos, y las respuestas NPS y eventos web anteriores.
+    El resto de las tablas se copia completo.
+    """
+    dst.mkdir(parents=True, exist_ok=True)
+    for f in src.glob("*.csv"):
+        shutil.copy(f, dst / f.name)
+
+    def read(table):
+        return pd.read_csv(src / f"{table}.csv", dtype=str, keep_default_na=False)
+
+    orders = read("sales_order")
+    orders = orders[orders["order_date"] < cutoff]
+    orders.to_csv(dst / "sales_order.csv", index=False)
+    for table in ORDER_CHILDREN:
+        df = read(table)
+        df[df["order_id"].isin(orders["order_id"])].to_csv(dst / f"{table}.csv", index=False)
+    for table, col in TIMED_TABLES.items():
+        if (src / f"{table}.csv").exists():
+            df = read(table)
+            df[df[col] < cutoff].to_csv(dst / f"{table}.csv", index=False)
+
+
+def read_sorted(dw: Path, table: str, key: str) -> pd.DataFrame:
+    """Tabla CSV del DW ordenada por 'key' (las cargas incrementales anexan al final)."""
+    return pd.read_csv(dw / f"{table}.csv").sort_values(key, ignore_index=True)
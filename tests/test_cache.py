@@ -0,0 +1,83 @@
+# tests/test_cache.py
+"""
+Cache de etapas (DW/_manifest.json): una segunda corrida sin cambios no
+reconstruye nada, un archivo raw modificado invalida las etapas que dependen
+de él y el calendario depende solo del rango de fechas de sus fuentes.
+"""
+import pandas as pd
+import pytest
+
+from ETL import pipeline
+from ETL.cache import BuildCache
+from ETL.planning import STEP_TARGETS, build_plan
+from ETL.transform import OBT, ROLLUPS
+
+from conftest import make_workspace
+
+TARGETS = STEP_TARGETS["all"]
+
+
+@pytest.fixture
+def workspace(raw_dataset, tmp_path, monkeypatch):
+    root = make_workspace(tmp_path, raw_dataset)
+    monkeypatch.chdir(root)
+    pipeline.run_all()
+    return root
+
+
+def _plan():
+    # mismas opciones que run_all por defecto (csv, con validación)
+    return build_plan(TARGETS, True, BuildCache("DW", "raw", "csv", True))
+
+
+def _edit_raw(root, table, edit):
+    path = root / "raw" / f"{table}.csv"
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    edit(df).to_csv(path, index=False)
+
+
+def _outputs(root):
+    return {f.name: f.stat().st_mtime_ns for f in (root / "DW").glob("*.csv") if f.name != "quarantine.csv"}
+
+
+def test_second_run_skips_every_table(workspace):
+    assert (workspace / "DW" / "_manifest.json").exists()
+    plan = _plan()
+    assert plan["build"] == []
+    assert sorted(plan["skip"]) == sorted(TARGETS)
+
+    before = _outputs(workspace)
+    pipeline.run_all()
+    assert _outputs(workspace) == before
+
+
+def test_nps_change_inside_date_range_keeps_calendar_and_obt(workspace):
+    def drop_middle_response(df):
+        # una respuesta que no es ni la primera ni la última: el rango no cambia
+        dates = df["responded_at"]
+        middle = dates[(dates > dates.min()) & (dates < dates.max())].index[0]
+        return df.drop(index=middle)
+
+    _edit_raw(workspace, "nps_response", drop_middle_response)
+    plan = _plan()
+    assert "fact_nps_response" in plan["build"]
+    for table in ["dim_calendar", *OBT, *ROLLUPS]:
+        assert table not in plan["build"]
+        assert table in plan["skip"]
+
+
+def test_changed_raw_file_invalidates_its_dependents(workspace):
+    def change_amount(df):
+        df.loc[0, "total_amount"] = str(float(df.loc[0, "total_amount"]) + 1)
+        return df
+
+    _edit_raw(workspace, "sales_order", change_amount)
+    plan = _plan()
+    for table in ["fact_sales_order", "fact_order_snapshot", "customer_snapshot", *OBT, *ROLLUPS]:
+        assert table in plan["build"]
+    # sales_order no entra en las sesiones web ni en las dimensiones
+    for table in ["fact_web_session", "dim_customer", "dim_product"]:
+        assert table in plan["skip"]
+
+    pipeline.run_all()
+    assert _plan()["build"] == []
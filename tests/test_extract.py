@@ -0,0 +1,77 @@
+# tests/test_extract.py
+"""
+Lectura de raw con esquema: los valores que no entran en el tipo declarado
+se informan con tabla y columna, y las fechas ilegibles llegan a la
+validación como 'DATE:<columna>' (los números ilegibles, como 'TYPE:<columna>').
+"""
+import pandas as pd
+import pytest
+
+from ETL.extract.extract import INVALID_DATES, INVALID_VALUES, extract_raw_table, iter_raw_table
+from ETL.validation import validate_table
+
+PAYMENT_HEADER = "payment_id,order_id,method,status,amount,paid_at,transaction_ref\n"
+
+
+def test_unparseable_dates_go_to_quarantine(tmp_path):
+    (tmp_path / "payment.csv").write_text(
+        PAYMENT_HEADER
+        + "1,10,CARD,PAID,5.0,2025-01-02 10:00:00,TX-1\n"
+        + "2,10,CARD,PAID,5.0,2025-13-45 10:00:00,TX-2\n"
+        + "3,10,CARD,PENDING,5.0,,TX-3\n"
+    )
+    df = extract_raw_table(str(tmp_path), "payment")
+    assert list(df.attrs[INVALID_DATES]["paid_at"]) == [1]
+
+    valid, rejected = validate_table("payment", df, {"sales_order": pd.Index([10])})
+    # la fecha vacía (pago pendiente) no es un error
+    assert valid["payment_id"].tolist() == [1, 3]
+    assert rejected["reasons"].tolist() == ["DATE:paid_at"]
+    assert not valid.attrs
+
+
+def test_int_column_with_nulls_reads_as_nullable(tmp_path):
+    (tmp_path / "payment.csv").write_text(PAYMENT_HEADER + "1,,CARD,PAID,5.0,,TX-1\n2,10,CARD,PAID,5.0,,TX-2\n")
+    df = extract_raw_table(str(tmp_path), "payment")
+    assert str(df["order_id"].dtype) == "Int64"
+    assert df["order_id"].isna().tolist() == [True, False]
+
+
+def test_non_numeric_values_go_to_quarantine(tmp_path):
+    (tmp_path / "payment.csv").write_text(
+        PAYMENT_HEADER + "1,10,CARD,PAID,cinco,,TX-1\n2,diez,CARD,PAID,5.0,,TX-2\n3,10,CARD,PAID,5.0,,TX-3\n")
+    df = extract_raw_table(str(tmp_path), "payment")
+    assert df["amount"].isna().tolist() == [True, False, False]
+    assert {c: list(rows) for c, rows in df.attrs[INVALID_VALUES].items()} == {"amount": [0], "order_id": [1]}
+
+    valid, rejected = validate_table("payment", df, {"sales_order": pd.Index([10])})
+    assert valid["payment_id"].tolist() == [3]
+    assert rejected["reasons"].tolist() == ["TYPE:amount", "TYPE:order_id"]
+
+
+def test_non_numeric_values_go_to_quarantine_in_chunks(tmp_path):
+    rows = [f"{i},10,CARD,PAID,5.0,,TX-{i}\n" for i in range(1, 8)]
+    rows[5] = "6,seis,CARD,PAID,5.0,,TX-6\n"
+    (tmp_path / "payment.csv").write_text(PAYMENT_HEADER + "".join(rows))
+    chunks = list(iter_raw_table(str(tmp_path), "payment", 2))
+    # el error aparece en el tercer chunk: los anteriores no se repiten
+    assert pd.concat(chunks)["payment_id"].tolist() == list(range(1, 8))
+    assert list(chunks[2].attrs[INVALID_VALUES]["order_id"]) == [5]
+
+    rejected = [validate_table("payment", c, {"sales_order": pd.Index([10])})[1] for c in chunks]
+    rejected = pd.concat(rejected, ignore_index=True)
+    assert rejected["row_key"].tolist() == ["6"]
+    assert rejected["reasons"].tolist() == ["TYPE:order_id"]
+
+
+def test_unreadable_quantity_fails_only_by_type(tmp_path):
+    (tmp_path / "sales_order_item.csv").write_text(
+        "order_item_id,order_id,product_id,quantity,unit_price,discount_amount,line_total\n"
+        "1,10,2,dos,5.0,0.0,10.0\n2,10,2,2,5.0,0.0,10.0\n"
+    )
+    df = extract_raw_table(str(tmp_path), "sales_order_item")
+    valid, rejected = validate_table("sales_order_item", df, {"sales_order": pd.Index([10]),
+                                                              "product": pd.Index([2])})
+    # la cantidad vacía no falla por rango ni por line_total
+    assert valid["order_item_id"].tolist() == [2]
+    assert rejected["reasons"].tolist() == ["TYPE:quantity"]
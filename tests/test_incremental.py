@@ -0,0 +1,171 @@
+# tests/test_incremental.py
+"""
+La carga incremental tiene que dejar el DW igual que una corrida completa:
+se arma el DW con las órdenes anteriores a CUTOFF, se corre un incremental
+(el primero, que fija las marcas de agua) y después otro con raw/ completo.
+"""
+import warnings
+
+import pandas as pd
+import pytest
+
+from ETL import pipeline
+from ETL.extract.extract import extract_raw_table
+from ETL.extract.schema import RAW_SCHEMAS
+from ETL.load.incremental import filter_new_rows, read_watermarks, write_watermarks
+from ETL.transform import FACTS, SNAPSHOT_COLUMNS, transform_dimensions, transform_facts
+from ETL.transform.build_customer_snapshot import CustomerState, merge_state, order_state
+from ETL.transform.build_fact_order_snapshot import PARTS, OrderSnapshot
+from ETL.validation import Quarantine
+
+from conftest import make_workspace, read_sorted, replace_raw, slice_raw
+
+CUTOFF = "2025-03-01"
+
+# tabla -> clave para comparar sin depender del orden de las filas
+COMPARED = {
+    "fact_sales_order": "order_id",
+    "fact_sales_order_item": "order_item_id",
+    "fact_payment": "payment_id",
+    "fact_shipment": "shipment_id",
+    "fact_nps_response": "nps_id",
+    "fact_order_snapshot": "order_id",
+    "dim_calendar": "date_sk",
+    "customer_snapshot": "customer_id",
+}
+
+
+@pytest.fixture(scope="module")
+def builds(raw_dataset, tmp_path_factory):
+    root = tmp_path_factory.mktemp("incremental")
+    full = make_workspace(root / "full", raw_dataset)
+    inc = make_workspace(root / "inc")
+    slice_raw(raw_dataset, inc / "raw", CUTOFF)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(full)
+        pipeline.run_all(force=True)
+
+        mp.chdir(inc)
+        pipeline.run_all(force=True)
+        pipeline.run_incremental()
+        replace_raw(inc, raw_dataset)
+        pipeline.run_incremental()
+    return full / "DW", inc / "DW"
+
+
+@pytest.mark.parametrize("table", list(COMPARED))
+def test_incremental_matches_full_build(builds, table):
+    full, inc = builds
+    key = COMPARED[table]
+    pd.testing.assert_frame_equal(read_sorted(inc, table, key), read_sorted(full, table, key), check_dtype=False)
+
+
+def test_rows_without_watermark_or_late_are_new():
+    df = pd.DataFrame({
+        "payment_id": [1, 2, 3, 4],
+        "paid_at": pd.to_datetime(["2025-01-01", None, "2024-06-01", "2025-03-01"]),
+    })
+    marks = {"paid_at": pd.Timestamp("2025-02-01")}
+    new, new_marks = filter_new_rows(df, ["paid_at"], marks, "payment_id", pd.Index([1]))
+    # 2 sin fecha y 3 atrasado no están en el DW; 4 es posterior a la marca
+    assert new["payment_id"].tolist() == [2, 3, 4]
+    assert new_marks["paid_at"] == pd.Timestamp("2025-03-01")
+
+
+def test_interrupted_watermark_write_keeps_previous_marks(tmp_path, monkeypatch):
+    write_watermarks({"fact_payment": {"paid_at": pd.Timestamp("2025-01-01")}}, tmp_path)
+
+    def crash(*args):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr("ETL.load.incremental.os.replace", crash)
+    with pytest.raises(OSError):
+        write_watermarks({"fact_payment": {"paid_at": pd.Timestamp("2025-02-01")}}, tmp_path)
+    assert read_watermarks(tmp_path) == {"fact_payment": {"paid_at": pd.Timestamp("2025-01-01")}}
+
+
+def test_incremental_stops_on_a_compressed_dw(raw_dataset, tmp_path, monkeypatch):
+    root = make_workspace(tmp_path, raw_dataset)
+    monkeypatch.chdir(root)
+    pipeline.run_all(force=True, compression="gzip")
+    before = sorted(p.name for p in (root / "DW").iterdir())
+    with pytest.raises(ValueError, match="fact_sales_order.csv.gz"):
+        pipeline.run_incremental()
+    # no dejó copias sin comprimir ni marcas de agua
+    assert sorted(p.name for p in (root / "DW").iterdir()) == before
+
+
+def test_rows_of_tables_without_watermark_are_new_only_by_key():
+    df = pd.DataFrame({"order_item_id": [1, 2, 3]})
+    new, new_marks = filter_new_rows(df, [], None, "order_item_id", pd.Index([1, 2]))
+    assert new["order_item_id"].tolist() == [3]
+    assert new_marks == {}
+
+
+def test_order_snapshot_does_not_depend_on_chunks(builds):
+    full, _ = builds
+    facts = {t: pd.read_csv(full / f"{t}.csv", usecols=cols) for t, cols in SNAPSHOT_COLUMNS.items()}
+    whole = OrderSnapshot(facts["fact_sales_order"])
+    chunked = OrderSnapshot(facts["fact_sales_order"])
+    for fact in PARTS:
+        whole.add(fact, facts[fact])
+        for start in range(0, len(facts[fact]), 97):
+            chunked.add(fact, facts[fact].iloc[start:start + 97])
+    pd.testing.assert_frame_equal(chunked.finish(), whole.finish())
+
+
+def test_streaming_order_snapshot_ignores_other_formats(builds, raw_dataset, tmp_path, monkeypatch):
+    # un DW con copias Parquet viejas (de antes de CUTOFF): el snapshot en
+    # streaming tiene que armarse con los CSV que acaba de escribir
+    full, _ = builds
+    root = make_workspace(tmp_path)
+    slice_raw(raw_dataset, root / "raw", CUTOFF)
+    monkeypatch.chdir(root)
+    pipeline.run_all(fmt="parquet", force=True)
+    replace_raw(root, raw_dataset)
+    pipeline.run_dimensions(force=True)
+    pipeline.run_facts(chunksize=500, force=True)
+    pd.testing.assert_frame_equal(read_sorted(root / "DW", "fact_order_snapshot", "order_id"),
+                                  read_sorted(full, "fact_order_snapshot", "order_id"), check_dtype=False)
+
+
+def test_transform_facts_builds_snapshots_after_base_facts(raw_dataset):
+    raw = {t: extract_raw_table(str(raw_dataset), t) for t in RAW_SCHEMAS}
+    facts = transform_facts(raw, transform_dimensions(raw))
+    assert list(facts) == [n for n, (_, _, deps) in FACTS.items() if not deps] + \
+        [n for n, (_, _, deps) in FACTS.items() if deps]
+    assert len(facts["fact_order_snapshot"]) == len(facts["fact_sales_order"])
+
+
+def test_incremental_quarantine_keeps_one_entry_per_row():
+    previous = pd.DataFrame({
+        "table": ["payment", "payment", "shipment"],
+        "row_key": [10, 11, 10],
+        "reasons": ["FK:order_id"] * 3,
+        "record": ["{}"] * 3,
+    })
+    q = Quarantine()
+    q.add("payment", pd.DataFrame({"table": ["payment"], "row_key": ["10"],
+                                   "reasons": ["FK:order_id"], "record": ["{}"]}))
+    merged = q.merge_into(previous, replace=False, loaded={"shipment": pd.Series([10])})
+    # 10 se volvió a validar (una sola entrada), 11 sigue y shipment 10 ya entró al DW
+    assert sorted(zip(merged["table"], merged["row_key"].astype(str))) == [("payment", "10"), ("payment", "11")]
+
+
+def test_customer_state_merges_without_dtype_warnings(tmp_path):
+    orders = pd.DataFrame({"order_id": [1], "customer_id": [5], "channel_id": [1], "store_id": [2],
+                           "order_date_id": [20250101], "status": ["PAID"], "total_amount": [3.0]})
+    nps = pd.DataFrame({"customer_id": [6], "score": [9], "responded_at": pd.to_datetime(["2025-01-01"])})
+    batches = [order_state(None, None, None), order_state(orders, None, 20250101),
+               order_state(None, nps, None), order_state(orders, nps, 20250101)]
+    store = CustomerState(tmp_path)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        for previous in batches:
+            # el estado guardado vuelve de CSV: uno vacío se lee con columnas object
+            store.save(previous, {})
+            saved, _ = store.load()
+            for delta in batches:
+                merged = merge_state(saved, delta, 20250101)
+                assert set(merged["customers"]["customer_id"]) == \
+                    set(saved["customers"]["customer_id"]) | set(delta["customers"]["customer_id"])
@@ -0,0 +1,31 @@
+# tests/test_sessionize.py
+"""
+La sesionización en streaming no depende del tamaño de chunk: las sesiones
+que cruzan el borde entre chunks quedan abiertas y se completan con el
+chunk siguiente.
+"""
+import pandas as pd
+import pytest
+
+from ETL.extract.extract import iter_raw_table
+from ETL.transform.sessionize import sessionize
+
+
+def _sessions(raw_dir, chunksize):
+    parts = list(sessionize(iter_raw_table(str(raw_dir), "web_event", chunksize)))
+    return pd.concat(parts, ignore_index=True).sort_values(["started_at", "session_id"], ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def single_chunk(raw_dataset):
+    return _sessions(raw_dataset, 10**9)
+
+
+@pytest.mark.parametrize("chunksize", [97, 1000, 4999])
+def test_sessions_do_not_depend_on_chunksize(raw_dataset, single_chunk, chunksize):
+    pd.testing.assert_frame_equal(_sessions(raw_dataset, chunksize), single_chunk)
+
+
+def test_sessions_cover_every_event(raw_dataset, single_chunk):
+    events = pd.read_csv(raw_dataset / "web_event.csv", usecols=["visitor_id"])
+    assert single_chunk["event_count"].sum() == len(events)
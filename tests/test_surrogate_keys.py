@@ -0,0 +1,41 @@
+# tests/test_surrogate_keys.py
+"""
+Registro de claves sustitutas: las dimensiones dan de alta claves con
+'assign' y los hechos las resuelven con 'lookup', que nunca agrega claves.
+"""
+import pandas as pd
+
+from ETL import pipeline
+from ETL.transform.surrogate_keys import SurrogateKeyRegistry
+
+from conftest import make_workspace
+
+
+def test_lookup_never_grows_the_registry(tmp_path):
+    keys = SurrogateKeyRegistry(tmp_path)
+    keys.assign("dim_customer", [10, 20])
+    keys.save()
+
+    keys = SurrogateKeyRegistry(tmp_path)
+    found = keys.lookup("dim_customer", [20, 30, 10])
+    assert found.tolist() == [2, pd.NA, 1]
+    assert keys.lookup("dim_product", [1]).isna().all()
+    keys.save()
+
+    assert pd.read_csv(tmp_path / "dim_customer.csv")["bk"].tolist() == [10, 20]
+    assert not (tmp_path / "dim_product.csv").exists()
+    # 30 sigue sin clave: la próxima alta le da el siguiente número
+    assert keys.assign("dim_customer", [30]).tolist() == [3]
+
+
+def test_customer_snapshot_resolves_surrogates_from_the_registry(raw_dataset, tmp_path, monkeypatch):
+    root = make_workspace(tmp_path, raw_dataset)
+    monkeypatch.chdir(root)
+    pipeline.run_all(force=True)
+
+    dim = pd.read_csv(root / "DW" / "dim_customer.csv", usecols=["customer_sk", "customer_bk"])
+    snapshot = pd.read_csv(root / "DW" / "customer_snapshot.csv", usecols=["customer_id", "customer_sk"])
+    expected = snapshot["customer_id"].map(dim.set_index("customer_bk")["customer_sk"])
+    pd.testing.assert_series_equal(snapshot["customer_sk"], expected, check_names=False, check_dtype=False)
+    # los hechos no agregan claves al registro
+    assert len(pd.read_csv(root / "DW" / "_keys" / "dim_customer.csv")) == dim["customer_bk"].nunique()
@@ -0,0 +1,55 @@
+# tests/test_validation.py
+"""
+Una orden en cuarentena arrastra a sus ítems, pagos y envíos: las claves
+foráneas a órdenes se validan contra las órdenes ya validadas, en todos los
+modos (completo, streaming e incremental).
+"""
+import pandas as pd
+import pytest
+
+from ETL import pipeline
+
+from conftest import make_workspace
+
+CHILDREN = {"sales_order_item": "fact_sales_order_item", "payment": "fact_payment", "shipment": "fact_shipment"}
+
+
+@pytest.fixture
+def workspace(raw_dataset, tmp_path, monkeypatch):
+    root = make_workspace(tmp_path, raw_dataset)
+    orders = pd.read_csv(root / "raw" / "sales_order.csv", dtype=str, keep_default_na=False)
+    orders.loc[0, "customer_id"] = "999999999"  # cliente inexistente
+    orders.to_csv(root / "raw" / "sales_order.csv", index=False)
+    monkeypatch.chdir(root)
+    return root, int(orders.loc[0, "order_id"])
+
+
+def _check_cascade(root, order_id):
+    quarantine = pd.read_csv(root / "DW" / "quarantine.csv")
+    assert set(quarantine["table"]) == {"sales_order", *CHILDREN}
+    for table, fact in CHILDREN.items():
+        assert (quarantine.loc[quarantine["table"] == table, "reasons"] == "FK:order_id").all()
+        assert order_id not in set(pd.read_csv(root / "DW" / f"{fact}.csv", usecols=["order_id"])["order_id"])
+
+
+def test_quarantined_order_cascades_to_children(workspace):
+    root, order_id = workspace
+    pipeline.run_all(force=True)
+    _check_cascade(root, order_id)
+
+
+def test_quarantined_order_cascades_in_streaming(workspace):
+    root, order_id = workspace
+    pipeline.run_dimensions(force=True)
+    pipeline.run_facts(chunksize=500)
+    _check_cascade(root, order_id)
+
+
+def test_quarantined_order_cascades_in_incremental(workspace):
+    root, order_id = workspace
+    pipeline.run_all(force=True)
+    pipeline.run_incremental()
+    pipeline.run_incremental()
+    _check_cascade(root, order_id)
+    quarantine = pd.read_csv(root / "DW" / "quarantine.csv")
+    assert len(quarantine) == 1 + len(CHILDREN)